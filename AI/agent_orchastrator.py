@@ -5,10 +5,18 @@ from enum import Enum
 from google import genai
 from utils.file_converter import FileConverter
 from utils.conversation_manager import ConversationManager
+from utils.redaction import Redactor
+from utils.page_index import PageIndex
 from agents.docu_agent.agent import DocuAgent
 from agents.sherlock_agent.agent import SherlockAgent
 from agents.client_coms_agent.agent import ClientCommunicationAgent
 
+# Converted text and page indexes, keyed by file content hash. Holds unredacted text, so it
+# lives outside the repository's tracked files (see .gitignore) and can be moved with
+# CONVERSION_CACHE_DIR.
+CONVERSION_CACHE_DIR = os.getenv("CONVERSION_CACHE_DIR",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversion_cache"))
+
 
 class AgentType(Enum):
     COMS = "client_coms"
@@ -18,7 +26,8 @@ class AgentType(Enum):
 
 
 class AIOrchestrator:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, conversion_cache_dir: Optional[str] = CONVERSION_CACHE_DIR,
+                 with_layout: bool = True):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY environment variable or api_key parameter required")
@@ -28,11 +37,16 @@ class AIOrchestrator:
         self.model_id = "gemini-2.5-flash"
         
         # Initialize utilities
-        self.file_converter = FileConverter()
+        # Layout runs let citations point at a line on the page; they are cached with the text,
+        # so the extra extraction work is paid once per file
+        self.file_converter = FileConverter(cache_dir=conversion_cache_dir, with_layout=with_layout)
         self.conversation_manager = ConversationManager()
+        # PII is masked before any text reaches a prompt, and model output is restored with the
+        # same reversible token map (self.redactor.vault), which never leaves the server
+        self.redactor = Redactor()
         
         # Initialize agents
-        self.docu_agent = DocuAgent()
+        self.docu_agent = DocuAgent(redactor=self.redactor)
         self.sherlock_agent = SherlockAgent(docu_agent=self.docu_agent)
         self.coms_agent = ClientCommunicationAgent()
         
@@ -114,6 +128,13 @@ Respond with ONLY ONE WORD: either "COMS" or "ANALYSIS"
         for url in file_urls:
             try:
                 result = self.file_converter.convert_to_text(url)
+                page_index = PageIndex.from_result(result)
+                if page_index:
+                    # Redact page by page so the page offset table still lines up with the text
+                    result['text'], page_index = page_index.transform_pages(result['text'], self.redactor.redact)
+                    result['page_index'] = page_index.to_dict()
+                else:
+                    result['text'] = self.redactor.redact(result.get('text', ''))
                 file_contents.append(result)
             except Exception as e:
                 print(f"Error converting {url}: {e}")
@@ -349,6 +370,7 @@ Return ONLY the JSON array, no other text."""
     
     async def process_request(self, user_request: str, file_urls: List[str], return_address: Optional[str] = None):
         print(f"🎭 Orchestrator: Processing request with {len(file_urls)} files")
+        user_request = self.redactor.redact(user_request)
         
         # Step 1: Convert files to text
         print("📄 Converting files to text...")
@@ -425,8 +447,22 @@ Create a clear, professional response."""
             result["response"] = final_response
             result["workflow"] = "API → Orchestrator → Doc → Sherlock → Com → Out"
         
+        # Drafts and answers go back to the user with the real values in place of the tokens
+        for key in ("response", "analysis"):
+            if key in result:
+                result[key] = self._restore_output(result[key])
+        
         print("✅ Request processing complete!")
         return result
+    
+    def _restore_output(self, value: Any):
+        if isinstance(value, str):
+            return self.redactor.restore(value)
+        if isinstance(value, dict):
+            return {key: self._restore_output(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._restore_output(item) for item in value]
+        return value
 
 
 async def main():
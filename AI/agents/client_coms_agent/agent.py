@@ -1,11 +1,21 @@
 import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from transformers import pipeline
 import asyncio
 from google.genai import types
+from typing import List
+from AI.utils.sentiment import get_sentiment_analyzer
+from AI.utils.comms_text import analyze_text
+from AI.utils.live_call import LiveCallAnalyzer
 
 
 load_dotenv(".env")
@@ -13,11 +23,16 @@ load_dotenv(".env")
 MODEL_ID = "gemini-2.5-flash"
 
 class ClientCommunicationAgent:
-    def __init__(self):
+    def __init__(self, warm_up_sentiment: bool = False):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not set")
 
+        # One sentiment model and result cache per process, shared by every agent instance
+        self.sentiment = get_sentiment_analyzer()
+        if warm_up_sentiment:
+            self.sentiment.warm_up()
+
         self.agent = Agent(
             name="client_communication_agent",
             model=MODEL_ID,
@@ -25,6 +40,7 @@ class ClientCommunicationAgent:
             instruction=self.get_instruction(),
             tools=[
                 self.analyze_emotion,
+                self.analyze_emotions,
                 self.draft_response,
                 self.draft_email,
                 self.draft_text_message,
@@ -103,15 +119,15 @@ Always remember: You draft - humans approve. Client satisfaction is paramount.
 """
     
     def analyze_emotion(self, message: str):
-        pipe = pipeline("text-classification", model="tabularisai/multilingual-sentiment-analysis", truncation=True, max_length=512)
-        # Truncate message to avoid exceeding model's max sequence length
-        # Using 400 tokens worth of chars (~1600 chars) to be safe
-        truncated_message = message[:1600] if len(message) > 1600 else message
-        result = pipe(truncated_message)[0]
+        # Messages are truncated to ~400 tokens inside the analyzer
+        return self.sentiment.analyze(message)
     
+    def analyze_emotions(self, messages: List[str]):
+        # Batch form for inbox triage: one batched model pass for every message not seen before
         return {
-            "primary_emotion": result['label'],
-            "confidence": result['score'],
+            "results": self.sentiment.analyze_many(messages),
+            "count": len(messages),
+            "sentiment_stats": self.sentiment.stats
         }
     
     def draft_response(self, client_message: str, context: str = "", case_update: str = ""):
@@ -205,11 +221,13 @@ Always remember: You draft - humans approve. Client satisfaction is paramount.
         print(f"\n=== Analyzing Call Transcript ===")
         
         try:
-            emotion_analysis = self.analyze_emotion(transcript)
-            action_items = self.extract_action_items(transcript)
-            urgency = self.detect_urgency_level(transcript)
-            
-            questions = [line for line in transcript.split('\n') if '?' in line]
+            # Whole call in overlapping windows: frustration usually builds toward the end
+            emotion_analysis = self.sentiment.analyze_transcript(transcript)
+            # Urgency, action items, questions and keywords in one pass over the transcript
+            text_analysis = analyze_text(transcript)
+            action_items = [item['text'] for item in text_analysis['action_items']]
+            urgency = text_analysis['urgency_level']
+            questions = [question['text'] for question in text_analysis['questions']]
             
             participants_list = [p.strip() for p in participant_names.split(',') if p.strip()] if participant_names else []
             
@@ -218,12 +236,12 @@ Always remember: You draft - humans approve. Client satisfaction is paramount.
                 "call_duration_minutes": call_duration,
                 "participants": participants_list,
                 "emotion_analysis": emotion_analysis,
-                "key_topics": self._extract_keywords(transcript),
+                "key_topics": text_analysis['keywords'],
                 "questions_asked": questions,
                 "action_items": action_items,
                 "urgency_level": urgency,
                 "follow_up_required": len(action_items) > 0 or urgency in ["high", "urgent"],
-                "summary_length": len(transcript.split()),
+                "summary_length": text_analysis['word_count'],
                 "requires_attorney_review": urgency == "urgent" or len(questions) > 3,
                 "suggested_next_steps": []
             }
@@ -248,36 +266,18 @@ Always remember: You draft - humans approve. Client satisfaction is paramount.
                 "error": str(e)
             }
     
+    def start_live_call(self, call_id: str):
+        # Streaming counterpart of analyze_call_transcript, fed segment by segment while the call runs
+        return LiveCallAnalyzer(call_id, sentiment=self.sentiment)
+    
     def detect_urgency_level(self, message: str):
-        urgent_keywords = ['urgent', 'emergency', 'asap', 'immediately', 'critical', 'now']
-        high_keywords = ['soon', 'quickly', 'important', 'concerned', 'worried']
-        
-        message_lower = message.lower()
-        
-        if any(keyword in message_lower for keyword in urgent_keywords):
-            return "urgent"
-        elif any(keyword in message_lower for keyword in high_keywords):
-            return "high"
-        else:
-            return "normal"
+        return analyze_text(message)['urgency_level']
     
     def extract_action_items(self, text: str):
-        action_keywords = ['need to', 'should', 'must', 'will', 'going to', 'plan to']
-        action_items = []
-        
-        for line in text.split('\n'):
-            if any(keyword in line.lower() for keyword in action_keywords):
-                action_items.append(line.strip())
-        
-        return action_items
+        return [item['text'] for item in analyze_text(text)['action_items']]
     
     def _extract_keywords(self, text: str):
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'was', 'are', 'be'}
-        words = text.lower().split()
-        keywords = [word for word in words if len(word) > 3 and word not in common_words]
-        # Return top 10 most frequent
-        from collections import Counter
-        return [word for word, count in Counter(keywords).most_common(10)]
+        return analyze_text(text)['keywords']
     
     def _get_email_closing(self, tone: str):
         closings = {
@@ -1,4 +1,11 @@
 import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.runners import Runner
@@ -9,21 +16,44 @@ import cv2
 import asyncio
 import re
 import json
-from pathlib import Path
 import PyPDF2
+from typing import Dict, List, Optional
 import speech_recognition as sr
 from pydub import AudioSegment
+from AI.utils.summarizer import DocumentSummarizer, SummaryCache, extractive_summary
+from AI.utils.document_classifier import HybridClassifier
+from AI.utils.page_index import PageIndex, extract_pdf_pages
+from AI.utils.text_index import CaseTextIndex, TEXT_INDEX_FILENAME, text_index_path
 
 load_dotenv(".env")
 
 MODEL_ID = "gemini-2.5-flash"
+# Chunk summaries survive restarts, so unchanged pages are never sent to the model twice
+SUMMARY_CACHE_PATH = project_root / "AI" / "data" / "summary_cache" / "summaries.json"
+SUMMARY_TIMEOUT_SECONDS = 60.0
+# Full-text indexes of processed case folders; kept out of the client's case folder
+TEXT_INDEX_DIR = os.getenv("TEXT_INDEX_DIR", str(project_root / "AI" / "data" / "text_index"))
 
 class DocuAgent:
-    def __init__(self):
+    # llm_classification=True sends low-confidence documents to Gemini in batches during folder
+    # processing; classification_backend injects any other generate() backend for that pass.
+    # Without either, classification is keyword-only and never opens an LLM client.
+    def __init__(self, llm_classification: bool = False, classification_backend=None,
+                 text_index_dir: str = TEXT_INDEX_DIR, redactor=None):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not set")
         
+        # LLM-backed helpers are built lazily so keyword-only paths never open an LLM client
+        self.llm_classification = llm_classification or classification_backend is not None
+        self.classification_backend = classification_backend
+        self.backend = None
+        self.redactor = redactor  # Shared with the orchestrator so prompts and answers use one token map
+        self.summarizer = None
+        self.classifier = None
+        self.text_index = None  # Full-text index of the last processed case folder
+        self.text_index_dir = text_index_dir
+        
         self.agent = Agent(
             name="docu_agent",
             model=MODEL_ID,
@@ -117,21 +147,18 @@ Always maintain confidentiality and accuracy in all document processing tasks.
             }
         
         try:
-            text = ""
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 num_pages = len(pdf_reader.pages)
-                
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
+                text, page_index = extract_pdf_pages(pdf_reader)
             
             return {
                 "success": True,
                 "text": text,
                 "pdf_path": pdf_path,
                 "num_pages": num_pages,
-                "word_count": len(text.split())
+                "word_count": len(text.split()),
+                "page_index": page_index.to_dict()
             }
         except Exception as e:
             return {
@@ -217,23 +244,66 @@ Always maintain confidentiality and accuracy in all document processing tasks.
             }
 
     
+    def _get_backend(self):
+        if self.backend is None:
+            from AI.utils.llm_backend import GeminiBackend
+            self.backend = GeminiBackend(api_key=self.api_key, model_id=MODEL_ID, redactor=self.redactor)
+        return self.backend
+    
+    def _get_summarizer(self) -> DocumentSummarizer:
+        if self.summarizer is None:
+            self.summarizer = DocumentSummarizer(self._get_backend(), cache=SummaryCache(path=str(SUMMARY_CACHE_PATH)),
+                                                 timeout_seconds=SUMMARY_TIMEOUT_SECONDS)
+        return self.summarizer
+    
+    def _get_classifier(self) -> HybridClassifier:
+        if self.classifier is None:
+            backend = None
+            if self.llm_classification:
+                backend = self.classification_backend or self._get_backend()
+            self.classifier = HybridClassifier(self.classify_document, backend=backend)
+        return self.classifier
+    
     def summarize_document(self, document_text: str, document_type: str = "general"):
         word_count = len(document_text.split())
+        key_info = self.extract_key_information(document_text)
         
         summary_template = {
             "document_type": document_type,
             "word_count": word_count,
             "summary_sections": {
-                "overview": "Brief overview will be generated",
+                "overview": "",
                 "key_points": [],
                 "action_items": [],
-                "dates_mentioned": [],
-                "amounts_mentioned": [],
+                "dates_mentioned": key_info['dates'],
+                "amounts_mentioned": key_info['amounts'],
             },
             "requires_attorney_review": True,
             "priority": "normal"
         }
         
+        try:
+            result = self._get_summarizer().summarize(document_text, document_type=document_type)
+        except Exception as e:
+            # No backend at all (missing key, client error): still return the opening sentences
+            summary_template['error'] = f"Failed to summarize document: {str(e)}"
+            result = {"summary": extractive_summary(document_text), "chunk_count": 0, "cache_hits": 0, "fallbacks": 1}
+        
+        lines = [line.strip() for line in result['summary'].split('\n') if line.strip()]
+        overview = [line for line in lines if not line.startswith(('-', '*'))]
+        key_points = [line.lstrip('-* ').strip() for line in lines if line.startswith(('-', '*'))]
+        action_keywords = ['must', 'deadline', 'required', 'request', 'respond', 'submit']
+        
+        summary_template['summary_sections']['overview'] = " ".join(overview) or result['summary']
+        summary_template['summary_sections']['key_points'] = key_points
+        summary_template['summary_sections']['action_items'] = [
+            point for point in key_points if any(keyword in point.lower() for keyword in action_keywords)
+        ]
+        summary_template['chunk_count'] = result['chunk_count']
+        summary_template['cache_hits'] = result['cache_hits']
+        # Parts the model did not answer in time are extractive; flag them for the reviewer
+        summary_template['fallback_chunks'] = result.get('fallbacks', 0)
+        
         return summary_template
     
     def classify_document(self, document_text: str, filename: str = ""):
@@ -266,29 +336,45 @@ Always maintain confidentiality and accuracy in all document processing tasks.
             "suggested_category": primary_type.replace("_", " ").title()
         }
     
-    def extract_key_information(self, document_text: str):
+    def classify_documents(self, documents: List[Dict[str, str]]):
+        # Keyword scorer settles confident documents; the rest go to the LLM in one request
+        return self._get_classifier().classify_batch(documents)
+    
+    def extract_key_information(self, document_text: str, page_index: Optional[Dict] = None):
         date_pattern = r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b'
-        dates = re.findall(date_pattern, document_text, re.IGNORECASE)
+        dates = list(re.finditer(date_pattern, document_text, re.IGNORECASE))
         amount_pattern = r'\$\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?'
-        amounts = re.findall(amount_pattern, document_text)
+        amounts = list(re.finditer(amount_pattern, document_text))
         
         email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, document_text)
+        emails = list(re.finditer(email_pattern, document_text))
         
         phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b|\(\d{3}\)\s*\d{3}[-.]?\d{4}'
-        phones = re.findall(phone_pattern, document_text)
+        phones = list(re.finditer(phone_pattern, document_text))
         
-        return {
-            "dates": dates[:10],  # Limit to first 10
-            "amounts": amounts[:10],
-            "emails": emails[:5],
-            "phones": phones[:5],
+        key_info = {
+            "dates": [m.group(0) for m in dates[:10]],  # Limit to first 10
+            "amounts": [m.group(0) for m in amounts[:10]],
+            "emails": [m.group(0) for m in emails[:5]],
+            "phones": [m.group(0) for m in phones[:5]],
             "extracted_count": {
                 "dates": len(dates),
                 "amounts": len(amounts),
                 "contacts": len(emails) + len(phones)
             }
         }
+        
+        if page_index:
+            # Page number for each returned entity, aligned with the lists above
+            index = PageIndex.from_dict(page_index)
+            key_info['pages'] = {
+                "dates": [index.page_of(m.start()) for m in dates[:10]],
+                "amounts": [index.page_of(m.start()) for m in amounts[:10]],
+                "emails": [index.page_of(m.start()) for m in emails[:5]],
+                "phones": [index.page_of(m.start()) for m in phones[:5]]
+            }
+        
+        return key_info
 
     def process_file(self, file_path: str):
         if not os.path.exists(file_path):
@@ -321,17 +407,49 @@ Always maintain confidentiality and accuracy in all document processing tasks.
         
         if result.get('success') and result.get('text'):
             result['classification'] = self.classify_document(result['text'], Path(file_path).name)
-            result['key_info'] = self.extract_key_information(result['text'])
+            result['key_info'] = self.extract_key_information(result['text'], result.get('page_index'))
         
         return result
     
-    def process_case_folder(self, folder_path: str):
+    def _text_index_path(self, folder_path: str) -> str:
+        return text_index_path(folder_path, self.text_index_dir)
+    
+    def _save_text_index(self, folder_path: str, index_path: str, text_index: CaseTextIndex) -> bool:
+        try:
+            text_index.save(index_path)
+        except OSError as e:
+            print(f"  ⚠️  Could not save text index: {e}")
+            return False
+        # Indexes used to be written into the case folder; don't leave that copy of the text behind
+        legacy_path = os.path.join(folder_path, TEXT_INDEX_FILENAME)
+        if os.path.exists(legacy_path):
+            try:
+                os.remove(legacy_path)
+            except OSError as e:
+                print(f"  ⚠️  Could not remove old text index {legacy_path}: {e}")
+        return True
+    
+    def _load_text_index(self, index_path: str) -> CaseTextIndex:
+        if os.path.exists(index_path):
+            try:
+                text_index = CaseTextIndex.load(index_path)
+                if text_index is not None:
+                    return text_index
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️  Rebuilding text index ({e})")
+        return CaseTextIndex()
+    
+    def process_case_folder(self, folder_path: str, build_index: bool = True):
         if not os.path.exists(folder_path):
             return {
                 "success": False,
                 "error": f"Folder not found: {folder_path}"
             }
         
+        # Indexed as each file is converted; unchanged documents from a previous run are kept as-is
+        index_path = self._text_index_path(folder_path)
+        text_index = self._load_text_index(index_path) if build_index else None
+        
         results = {
             "case_folder": folder_path,
             "case_name": Path(folder_path).name,
@@ -360,6 +478,8 @@ Always maintain confidentiality and accuracy in all document processing tasks.
                 
                 results['files_processed'].append(file_result)
                 results['summary']['total_files'] += 1
+                if text_index is not None:
+                    text_index.add_file_result(file_result)
                 
                 if file_result.get('success'):
                     results['summary']['successful'] += 1
@@ -369,8 +489,73 @@ Always maintain confidentiality and accuracy in all document processing tasks.
                 file_type = file_result.get('file_type', 'unknown')
                 results['summary']['by_type'][file_type] = results['summary']['by_type'].get(file_type, 0) + 1
         
+        classified = [r for r in results['files_processed'] if 'classification' in r]
+        if classified and self.llm_classification:
+            # process_file already keyword-scored every document; only the uncertain ones reach the LLM
+            labels = self.classify_documents([
+                {"text": r['text'], "filename": r['filename'], "keyword_result": r['classification']}
+                for r in classified
+            ])
+            for file_result, label in zip(classified, labels):
+                file_result['classification'] = label
+        
+        if text_index is not None:
+            current = set()
+            for file_result in results['files_processed']:
+                if file_result.get('success') and file_result.get('text'):
+                    current.add(file_result['relative_path'])
+                    text_index.set_document_type(file_result['relative_path'], file_result.get('classification', {}).get('primary_type'))
+            for name in [name for name in text_index.doc_ids if name not in current]:
+                text_index.remove_document(name)
+            
+            if self._save_text_index(folder_path, index_path, text_index):
+                results['text_index_path'] = index_path
+            self.text_index = text_index
+        
         return results
 
+    def process_case_file(self, folder_path: str, file_path: str, build_index: bool = True):
+        # One new or changed file in an already processed case folder; same result shape as an
+        # entry of process_case_folder's files_processed
+        if not os.path.isabs(file_path):
+            file_path = os.path.join(folder_path, file_path)
+        relative_path = os.path.relpath(file_path, folder_path)
+        print(f"  Processing: {relative_path}")
+        
+        file_result = self.process_file(file_path)
+        file_result['filename'] = os.path.basename(file_path)
+        file_result['relative_path'] = relative_path
+        if 'classification' in file_result and self.llm_classification:
+            file_result['classification'] = self.classify_documents([
+                {"text": file_result['text'], "filename": file_result['filename'],
+                 "keyword_result": file_result['classification']}
+            ])[0]
+        
+        if build_index:
+            index_path = self._text_index_path(folder_path)
+            text_index = self._load_text_index(index_path)
+            if file_result.get('success') and file_result.get('text'):
+                text_index.add_file_result(file_result)
+            elif relative_path in text_index:
+                text_index.remove_document(relative_path)
+            self._save_text_index(folder_path, index_path, text_index)
+            self.text_index = text_index
+        
+        return file_result
+    
+    def remove_case_file(self, folder_path: str, relative_path: str):
+        # Drops a deleted file from the case folder's persisted text index
+        index_path = self._text_index_path(folder_path)
+        if not os.path.exists(index_path):
+            return False
+        text_index = self._load_text_index(index_path)
+        if relative_path not in text_index:
+            return False
+        text_index.remove_document(relative_path)
+        self._save_text_index(folder_path, index_path, text_index)
+        self.text_index = text_index
+        return True
+
     async def process_document(self, input_data):
         print(f"\n{'='*60}")
         print("Document Agent Initialized")
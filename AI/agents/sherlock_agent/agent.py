@@ -15,18 +15,136 @@ from google.adk.tools import google_search
 import pytesseract
 import cv2
 import asyncio
+import logging
+import time
 import re
 import json
+import numpy as np
 from AI.agents.docu_agent import DocuAgent
+from AI.utils.case_facts import FACT_KINDS, CaseFactsStore
+from AI.utils.case_features import CaseFeatures
+from AI.utils.analysis_graph import AnalysisGraph, AnalysisStep
+from AI.utils.text_index import CaseTextIndex
+from AI.utils.damages import DAMAGE_CATEGORIES
+from AI.utils.settlement_sim import SettlementSimulator
+from AI.utils.intervals import IntervalIndex, add_years, deadline_status, extract_date_ranges, today
+from AI.utils.tool_cache import ToolCache, fingerprint
+from AI.utils.case_similarity import CaseVectorIndex, embed_case, outcome_summary
+from AI.utils.search_cache import SearchCache, search_backend_from_env
+from AI.utils.case_analysis import CaseAnalysis
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 
 load_dotenv(".env")
 
+logger = logging.getLogger(__name__)
+
 MODEL_ID = "gemini-2.5-flash"
 
+CLEAR_FAULT_KEYWORDS = ['at fault', 'negligent', 'violated', 'failed to', 'breach']
+DISPUTED_KEYWORDS = ['dispute', 'deny', 'contest', 'disagree']
+LEGAL_ISSUE_KEYWORDS = {
+    "negligence": ["negligent", "duty", "breach", "reasonable care"],
+    "causation": ["caused by", "resulted from", "due to"],
+    "damages": ["injury", "harm", "loss", "suffering"],
+    "statute_of_limitations": ["deadline", "time limit", "statute"],
+    "comparative_fault": ["also at fault", "contributory", "comparative"],
+    "premises_liability": ["property owner", "hazard", "maintenance"],
+    "product_liability": ["defective", "manufacturer", "design flaw"]
+}
+# Output section -> analysis step that produces it
+ANALYSIS_SECTIONS = {
+    "timeline_analysis": "timeline",
+    "inconsistencies": "inconsistencies",
+    "missing_evidence": "missing_evidence",
+    "damage_calculation": "damages",
+    "liability_analysis": "liability",
+    "legal_issues": "legal_issues",
+    "settlement_evaluation": "settlement",
+    "case_strategy": "strategy",
+    "next_steps": "next_steps",
+    "case_strength_score": "case_strength",
+    "treatment_gaps": "treatment_gaps",
+    "deadlines": "deadlines",
+    "parties_and_entities": "entities"
+}
+ANALYSIS_MESSAGES = {
+    "timeline": lambda r: f"Identified {r['total_events']} dated events",
+    "inconsistencies": lambda r: f"Found {r['total_inconsistencies']} potential issues",
+    "missing_evidence": lambda r: f"{r['completion_percentage']:.1f}% evidence completeness",
+    "damages": lambda r: f"Total economic damages: ${r['economic_damages']['total']:,.2f}",
+    "liability": lambda r: r['recommendation'],
+    "legal_issues": lambda r: f"Identified {r['total_issues']} legal issues",
+    "settlement": lambda r: f"Settlement range: ${r['settlement_range']['low']:,.2f} - ${r['settlement_range']['high']:,.2f}",
+    "strategy": lambda r: f"Strategy developed with {len(r['recommendations'])} recommendations",
+    "next_steps": lambda r: f"{r['total_actions']} action items prioritized",
+    "treatment_gaps": lambda r: f"{r['total_gaps']} treatment gaps over {r['min_gap_days']} days",
+    "deadlines": lambda r: f"{len(r['deadlines'])} deadlines tracked",
+    "entities": lambda r: f"Mapped {r['total_entities']} entities and {r['total_relationships']} relationships"
+}
+MAX_DAMAGE_ITEMS = 50  # Per category in damage_breakdown; totals always cover every amount
+MAX_SIMULATION_DRAWS = 5_000_000
+INCIDENT_KEYWORDS = ['accident', 'incident', 'crash', 'collision', 'police']
+INITIAL_TREATMENT_WINDOW_DAYS = 14  # PIP-style "treat within 14 days" rule
+KEYWORD_GROUPS = {
+    "clear_fault": CLEAR_FAULT_KEYWORDS,
+    "disputed": DISPUTED_KEYWORDS,
+    **LEGAL_ISSUE_KEYWORDS
+}
+# Evidence inferred from filenames on top of the classified document types
+EVIDENCE_FILENAME_TAGS = {
+    "photos": ['photo', 'image'],
+    "wage_statements": ['wage', 'pay'],
+    "witness_statements": ['witness', 'statement']
+}
+# Case aggregates each analysis step reads. When a document is added or removed, steps whose
+# aggregates did not change keep their cached output; steps not listed (deadlines) always rerun.
+STEP_AGGREGATES = {
+    "features": set(),
+    "timeline": {"dates"},
+    "inconsistencies": {"amounts", "types", "damages"},
+    "missing_evidence": {"evidence"},
+    "damages": {"damages"},
+    "liability": {"keywords:clear_fault", "keywords:disputed"},
+    "legal_issues": {f"keywords:{issue}" for issue in LEGAL_ISSUE_KEYWORDS},
+    "settlement": set(),
+    "strategy": {"documents", "types"},
+    "next_steps": set(),
+    "case_strength": set(),
+    "treatment_gaps": {"treatment", "incident"},
+    "entities": {"entities"}
+}
+# Deterministic in their arguments; check_deadlines depends on today's date and
+# evaluate_settlement_value may draw unseeded samples, so neither is cached
+MEMOIZED_TOOLS = [
+    "analyze_case_timeline",
+    "query_timeline",
+    "identify_inconsistencies",
+    "find_amount_discrepancies",
+    "find_missing_evidence",
+    "calculate_damages",
+    "generate_case_strategy",
+    "cross_reference_documents",
+    "find_treatment_gaps",
+    "check_coverage_periods",
+    "analyze_liability",
+    "identify_legal_issues",
+    "map_case_entities",
+    "find_entity_documents",
+    "query_case_facts"
+]
+TOOL_CACHE_SIZE = 256
+MAX_DISCREPANCIES = 25
+MAX_FACT_ROWS = 50
+# Embeddings and outcomes of closed cases, grown by record_case_outcome
+CASE_INDEX_PATH = project_root / "AI" / "data" / "case_index" / "closed_cases.npz"
+MAX_SIMILAR_CASES = 20
+SEARCH_CACHE_PATH = project_root / "AI" / "data" / "search_cache" / "search_cache.json"
+MAX_SEARCH_RESULTS = 10
+MAX_ENTITY_SUMMARY = 40  # Entities and relationships in the prompt-sized party map
+
 class SherlockAgent:
-    def __init__(self, docu_agent: Optional['DocuAgent'] = None):
+    def __init__(self, docu_agent: Optional['DocuAgent'] = None, search_backend=None):
         self.API_KEY = os.getenv("GOOGLE_API_KEY")
         if not self.API_KEY:
             raise ValueError("GOOGLE_API_KEY environment variable not set.")
@@ -34,6 +152,26 @@ class SherlockAgent:
         self.docu_agent_name = "docu_agent"
         self.docu_agent = docu_agent
         self.case_data = None  # Store case data received from DocuAgent
+        self.case_facts = None  # Columnar dates/amounts/contacts, built on the first query_case_facts call
+        self._case_facts_case = None
+        self.case_features = None  # Per-document features shared by all analysis tools
+        self.analysis_workers = 4
+        self.text_index = None
+        self._text_index_case = None
+        self.analysis_cache = {}  # Step results of the last full analysis, kept across document updates
+        self._analysis_case = None
+        self.case_index = None  # Closed-case vectors, loaded on first similarity query
+        
+        # With a search backend configured (see utils.search_cache), research goes through a
+        # persistent cache instead of ADK's built-in google_search
+        search_backend = search_backend or search_backend_from_env()
+        self.search_cache = SearchCache(search_backend, path=str(SEARCH_CACHE_PATH)) if search_backend else None
+        search_tools = [self.research_legal_topic] if self.search_cache else [google_search]
+        
+        # Repeated tool calls on the same case data are served from here instead of recomputed
+        self.tool_cache = ToolCache(max_entries=TOOL_CACHE_SIZE)
+        for name in MEMOIZED_TOOLS:
+            setattr(self, name, self.tool_cache.memoize(getattr(self, name)))
         
         self.agent = Agent(
             name="sherlock_agent",
@@ -41,14 +179,26 @@ class SherlockAgent:
             description="Advanced analytical agent that investigates case data, identifies patterns, finds inconsistencies, and helps attorneys develop legal strategies and solutions. Can request document processing from DocuAgent.",
             instruction=self.get_instruction(),
             tools=[
-                google_search,
+                *search_tools,
                 self.request_document_processing,
+                self.add_case_document,
+                self.remove_case_document,
                 self.analyze_case_timeline,
+                self.query_timeline,
                 self.identify_inconsistencies,
+                self.find_amount_discrepancies,
+                self.query_case_facts,
+                self.find_similar_cases,
+                self.record_case_outcome,
                 self.find_missing_evidence,
                 self.calculate_damages,
                 self.generate_case_strategy,
                 self.cross_reference_documents,
+                self.map_case_entities,
+                self.find_entity_documents,
+                self.find_treatment_gaps,
+                self.check_coverage_periods,
+                self.check_deadlines,
                 self.analyze_liability,
                 self.evaluate_settlement_value,
                 self.identify_legal_issues,
@@ -65,12 +215,18 @@ Your core mission is to help attorneys and paralegals develop winning case strat
    - If you don't have case data yet, use request_document_processing tool to get it from DocuAgent
    - DocuAgent will process all documents in the case folder and return structured data
    - Wait for the processed case data before performing analysis
+   - When a single document arrives or is withdrawn later, use add_case_document or
+     remove_case_document instead of reprocessing the whole folder
 
 1. COMPREHENSIVE ANALYSIS
    - Scan all case documents processed by the Doc Agent
    - Build complete timelines of events
    - Identify all parties, witnesses, and entities involved
+     (map_case_entities gives a compact map of insurers, claim numbers, adjusters, providers
+     and parties; find_entity_documents lists every document and page mentioning one of them)
    - Map relationships and connections between evidence
+   - Use query_case_facts for every dollar amount, date, email or phone number in the case,
+     filtered by document type, date range or amount range and totalled by category or source
 
 2. PATTERN RECOGNITION & INCONSISTENCIES
    - Find contradictions in witness statements, reports, or documentation
@@ -98,12 +254,15 @@ Your core mission is to help attorneys and paralegals develop winning case strat
 
 6. STRATEGIC RECOMMENDATIONS
    - Suggest negotiation strategies and settlement ranges
+   - Use find_similar_cases to anchor settlement ranges on comparable closed cases, and
+     record_case_outcome when a case closes so later cases can be compared against it
    - Recommend legal arguments and theories
    - Identify weaknesses to address proactively
    - Propose case development action items
 
 7. LEGAL RESEARCH INTEGRATION
-   - Use Google Search to find relevant case law and statutes
+   - Use Google Search (or research_legal_topic, whose results are cached across cases and
+     sessions) to find relevant case law and statutes
    - Identify applicable legal standards and precedents
    - Research similar cases and outcomes
    - Stay current on jurisdiction-specific rules
@@ -125,33 +284,43 @@ OUTPUT STYLE:
 You are the critical thinking partner that helps legal teams build stronger cases and achieve better outcomes for clients.
 """
 
+    def reset_case_state(self):
+        self.case_data = None
+        self.case_facts = None
+        self._case_facts_case = None
+        self.case_features = None
+        self.text_index = None
+        self._text_index_case = None
+        self.analysis_cache = {}
+        self._analysis_case = None
+        self.tool_cache.invalidate()
+    
+    def get_case_features(self, case_data: Dict[str, Any]) -> CaseFeatures:
+        # Built once per case and then updated per document; every tool reads from it instead
+        # of rescanning raw text
+        if self.case_features is None or not self.case_features.is_for(case_data):
+            self.case_features = CaseFeatures(case_data, KEYWORD_GROUPS, EVIDENCE_FILENAME_TAGS)
+        return self.case_features
+    
     def analyze_case_timeline(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
-        timeline = []
-        all_dates = []
-        
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if file_result.get('success') and 'key_info' in file_result:
-                    dates = file_result['key_info'].get('dates', [])
-                    for date_str in dates:
-                        timeline.append({
-                            'date': date_str,
-                            'source': file_result.get('filename', 'Unknown'),
-                            'document_type': file_result.get('classification', {}).get('primary_type', 'general')
-                        })
-                        all_dates.append(date_str)
-        
-        timeline.sort(key=lambda x: x['date'])
+        timeline = self.get_case_features(case_data).timeline
+        result = timeline.summary()
+        result["critical_dates"] = self.identify_critical_dates(result["timeline"])
+        return result
+    
+    def query_timeline(self, case_data: Dict[str, Any], start: str = "", end: str = "") -> Dict[str, Any]:
+        # start/end are dates or keywords such as "accident" or "demand"
+        try:
+            events = self.get_case_features(case_data).timeline.between(start, end)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
         
         return {
-            "timeline": timeline,
-            "total_events": len(timeline),
-            "date_range": {
-                "earliest": timeline[0]['date'] if timeline else None,
-                "latest": timeline[-1]['date'] if timeline else None
-            },
-            "documents_with_dates": len(set(event['source'] for event in timeline)),
-            "critical_dates": self.identify_critical_dates(timeline)
+            "success": True,
+            "start": start,
+            "end": end,
+            "events": events,
+            "total_events": len(events)
         }
     
     def identify_critical_dates(self, timeline: List[Dict]) -> List[Dict]:
@@ -159,7 +328,8 @@ You are the critical thinking partner that helps legal teams build stronger case
         keywords = ['incident', 'accident', 'injury', 'treatment', 'demand', 'offer', 'deadline', 'filing']
         
         for event in timeline:
-            if any(keyword in event.get('source', '').lower() for keyword in keywords):
+            sources = ' '.join(event.get('sources', [event.get('source', '')])).lower()
+            if any(keyword in sources for keyword in keywords):
                 critical.append({
                     'date': event['date'],
                     'event': event['source'],
@@ -198,6 +368,7 @@ You are the critical thinking partner that helps legal teams build stronger case
         if case_data.get('summary', {}).get('successful', 0) > 0:
             # Store the case data for analysis
             self.case_data = case_data
+            self.tool_cache.invalidate()
             
             return {
                 "success": True,
@@ -213,37 +384,148 @@ You are the critical thinking partner that helps legal teams build stronger case
                 "details": case_data.get('summary', {})
             }
     
+    def add_case_document(self, file_path: str) -> Dict[str, Any]:
+        # Process one new (or changed) file and fold it into the loaded case without touching
+        # the other documents
+        if self.case_data is None or not self.docu_agent:
+            return {
+                "success": False,
+                "error": "No case loaded. Use request_document_processing on the case folder first."
+            }
+        
+        case_folder = self.case_data.get('case_folder', '')
+        if not os.path.isabs(file_path):
+            file_path = os.path.join(case_folder, file_path)
+        if not os.path.exists(file_path):
+            return {"success": False, "error": f"File not found: {file_path}"}
+        
+        print(f"\n🔄 Adding document to {self.case_data.get('case_name', 'case')}...")
+        file_result = self.docu_agent.process_case_file(case_folder, file_path)
+        relative_path = file_result['relative_path']
+        
+        changes = self._remove_file_result(relative_path)
+        changes |= self._add_file_result(file_result)
+        stale = self._invalidate_analysis(changes)
+        
+        return {
+            "success": bool(file_result.get('success')),
+            "document": relative_path,
+            "document_type": file_result.get('classification', {}).get('primary_type'),
+            "error": file_result.get('error'),
+            "changed": sorted(changes),
+            "sections_to_refresh": stale,
+            "summary": self.case_data['summary']
+        }
+    
+    def remove_case_document(self, relative_path: str) -> Dict[str, Any]:
+        if self.case_data is None:
+            return {"success": False, "error": "No case loaded."}
+        
+        changes = self._remove_file_result(relative_path)
+        if not changes:
+            return {"success": False, "error": f"Document not in case: {relative_path}"}
+        if self.docu_agent:
+            self.docu_agent.remove_case_file(self.case_data.get('case_folder', ''), relative_path)
+        stale = self._invalidate_analysis(changes)
+        
+        return {
+            "success": True,
+            "document": relative_path,
+            "changed": sorted(changes),
+            "sections_to_refresh": stale,
+            "summary": self.case_data['summary']
+        }
+    
+    def _update_summary(self, file_result: Dict[str, Any], sign: int):
+        summary = self.case_data['summary']
+        summary['total_files'] += sign
+        summary['successful' if file_result.get('success') else 'failed'] += sign
+        file_type = file_result.get('file_type', 'unknown')
+        summary['by_type'][file_type] = summary['by_type'].get(file_type, 0) + sign
+        if not summary['by_type'][file_type]:
+            del summary['by_type'][file_type]
+    
+    def _document_changes(self, doc, changes: Set[str]) -> Set[str]:
+        # Treatment and incident dates depend on rules that live here rather than in the aggregates
+        if doc.success and doc.classification == 'medical' and len(doc.text_dates):
+            changes.add("treatment")
+        if doc.success and len(doc.dates) and (doc.classification == 'police_report'
+                                               or any(keyword in doc.filename_lower for keyword in INCIDENT_KEYWORDS)):
+            changes.add("incident")
+        return changes
+    
+    def _add_file_result(self, file_result: Dict[str, Any]) -> Set[str]:
+        case_data = self.case_data
+        features = self.get_case_features(case_data)
+        case_data['files_processed'].append(file_result)
+        self._update_summary(file_result, 1)
+        
+        changes = features.add_document(file_result)
+        changes = self._document_changes(features.documents[-1], changes)
+        if self.case_facts is not None and self._case_facts_case is case_data:
+            self.case_facts.add_file_result(case_data.get('case_name', 'Unknown'), file_result)
+        if self.text_index is not None and self._text_index_case is case_data:
+            self.text_index.add_file_result(file_result)
+        self.tool_cache.update_fingerprint(case_data, ("add", fingerprint(file_result)))
+        return changes
+    
+    def _remove_file_result(self, relative_path: str) -> Set[str]:
+        case_data = self.case_data
+        features = self.get_case_features(case_data)
+        files = case_data['files_processed']
+        position = next((i for i, fr in enumerate(files)
+                         if (fr.get('relative_path') or fr.get('filename')) == relative_path), None)
+        if position is None:
+            return set()
+        file_result = files.pop(position)
+        self._update_summary(file_result, -1)
+        
+        doc = features.by_key.get(relative_path)
+        changes = features.remove_document(relative_path)
+        if doc is not None:
+            changes = self._document_changes(doc, changes)
+        if self.case_facts is not None and self._case_facts_case is case_data:
+            self.case_facts.remove_document(case_data.get('case_name', 'Unknown'), relative_path)
+        if self.text_index is not None and self._text_index_case is case_data and relative_path in self.text_index:
+            self.text_index.remove_document(relative_path)
+        self.tool_cache.update_fingerprint(case_data, ("remove", relative_path))
+        return changes
+    
+    def _invalidate_analysis(self, changes: Set[str]) -> List[str]:
+        # Drops cached steps that read a changed aggregate, plus everything downstream of them
+        stale = {step for step, reads in STEP_AGGREGATES.items() if reads & changes}
+        stale |= self.build_analysis_graph(self.case_data).dependents(stale)
+        for step in stale:
+            self.analysis_cache.pop(step, None)
+        return sorted(section for section, step in ANALYSIS_SECTIONS.items()
+                      if step in stale or step not in STEP_AGGREGATES)
+    
     def identify_inconsistencies(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
         inconsistencies = []
-        all_amounts = []
-        amount_sources = {}
+        features = self.get_case_features(case_data)
+        aggregates = features.aggregates
         
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if file_result.get('success') and 'key_info' in file_result:
-                    amounts = file_result['key_info'].get('amounts', [])
-                    source = file_result.get('filename', 'Unknown')
-                    
-                    for amount in amounts:
-                        if amount not in amount_sources:
-                            amount_sources[amount] = []
-                        amount_sources[amount].append(source)
-                        all_amounts.append(amount)
-        
-        unique_amounts = set(all_amounts)
-        if len(unique_amounts) > 1 and len(all_amounts) > len(unique_amounts):
+        unique_amounts = len(aggregates.amount_documents)
+        if unique_amounts > 1 and aggregates.amount_mentions > unique_amounts:
             inconsistencies.append({
                 'type': 'amount_discrepancy',
                 'severity': 'medium',
-                'description': f'Found {len(unique_amounts)} different dollar amounts across documents',
-                'details': dict(list(amount_sources.items())[:5])
+                'description': f'Found {unique_amounts} different dollar amounts across documents',
+                'details': aggregates.amount_sources(limit=5)
             })
         
-        doc_types = set()
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if 'classification' in file_result:
-                    doc_types.add(file_result['classification']['primary_type'])
+        # Near-equal amounts under the same label (e.g. two different lien figures)
+        for conflict in self.find_amount_discrepancies(case_data)['conflicts'][:5]:
+            lower, higher = conflict['lower'], conflict['higher']
+            inconsistencies.append({
+                'type': 'amount_conflict',
+                'severity': 'medium',
+                'description': f"{conflict['label'].title()} amounts differ by {conflict['difference_pct']}%: "
+                               f"{lower['amount']} in {lower['source']} vs {higher['amount']} in {higher['source']}",
+                'details': conflict
+            })
+        
+        doc_types = features.document_types
         
         expected_docs = {'medical', 'police_report', 'insurance', 'financial'}
         missing_docs = expected_docs - doc_types
@@ -267,6 +549,126 @@ You are the critical thinking partner that helps legal teams build stronger case
             "requires_investigation": len([i for i in inconsistencies if i['severity'] == 'high']) > 0
         }
     
+    def find_amount_discrepancies(self, case_data: Dict[str, Any], tolerance_pct: float = 10.0,
+                                  min_difference: float = 1.0) -> Dict[str, Any]:
+        # Same-label amounts (offer, lien, bill, limit, ...) in different documents that nearly match
+        index = self.get_case_features(case_data).amount_index
+        result = index.conflicts(tolerance_pct, int(round(min_difference * 100)), limit=MAX_DISCREPANCIES)
+        
+        return {
+            "tolerance_pct": tolerance_pct,
+            "min_difference": min_difference,
+            "amounts_indexed": len(index),
+            "total_conflicts": result['total'],
+            "by_label": result['by_label'],
+            "conflicts": result['pairs'],
+            "recommendations": [
+                f"Reconcile {c['label']} amount {c['lower']['amount']} ({c['lower']['source']}) "
+                f"with {c['higher']['amount']} ({c['higher']['source']})"
+                for c in result['pairs'][:5]
+            ]
+        }
+    
+    def get_case_facts(self, case_data: Dict[str, Any]) -> CaseFactsStore:
+        # Parsed on first use, then kept current by add_case_document/remove_case_document
+        if self.case_facts is None or self._case_facts_case is not case_data:
+            self.case_facts = CaseFactsStore.from_case_data(case_data)
+            self._case_facts_case = case_data
+        return self.case_facts
+    
+    def query_case_facts(self, case_data: Dict[str, Any], kind: str = "amount", category: str = "",
+                         start: str = "", end: str = "", min_amount: float = 0.0, max_amount: float = 0.0,
+                         group_by: str = "") -> Dict[str, Any]:
+        # Every amount, date, email or phone in the case, filtered by document category, date range
+        # or amount range; amounts can be totalled by category, source or value
+        if kind not in FACT_KINDS:
+            return {"success": False, "error": f"kind must be one of {', '.join(FACT_KINDS)}"}
+        if group_by and group_by not in ("category", "source", "value"):
+            return {"success": False, "error": "group_by must be category, source or value"}
+        store = self.get_case_facts(case_data)
+        case_id = case_data.get('case_name', 'Unknown')
+        filters = {"case": case_id, "category": category or None, "start": start or None, "end": end or None,
+                   "min_cents": int(round(min_amount * 100)) if min_amount else None,
+                   "max_cents": int(round(max_amount * 100)) if max_amount else None}
+        try:
+            mask = store.mask(kind=kind, **filters)
+        except ValueError as e:
+            return {"success": False, "error": f"Invalid date: {e}"}
+        
+        # Sources are stored as "<case>/<relative path>"
+        prefix = f"{case_id}/"
+        rows = store.rows(mask)
+        for row in rows:
+            row['source'] = row['source'][len(prefix):]
+            del row['case']
+        if kind == "date":
+            rows.sort(key=lambda row: row['date'] or "9999")
+        result = {
+            "success": True,
+            "kind": kind,
+            "total_matches": len(rows),
+            "facts": rows[:MAX_FACT_ROWS]
+        }
+        if kind == "amount":
+            result["total"] = store.total_cents(**filters) / 100
+        else:
+            contacts: Dict[str, Set[str]] = {}
+            for row in rows:
+                contacts.setdefault(row['raw'], set()).add(row['source'])
+            result["distinct_values"] = [{"value": value, "sources": sorted(sources)}
+                                         for value, sources in contacts.items()][:MAX_FACT_ROWS]
+        if group_by:
+            if kind == "amount":
+                groups = {label: total / 100 for label, total in store.group_sum(by=group_by, **filters).items()}
+            else:
+                groups = store.group_count(by=group_by, kind=kind, **filters)
+            result["groups"] = {label[len(prefix):] if group_by == "source" else label: value
+                                for label, value in groups.items()}
+        return result
+    
+    def get_case_index(self) -> CaseVectorIndex:
+        if self.case_index is None:
+            loaded = CaseVectorIndex.load(str(CASE_INDEX_PATH)) if CASE_INDEX_PATH.exists() else None
+            self.case_index = loaded or CaseVectorIndex()
+        return self.case_index
+    
+    def find_similar_cases(self, case_data: Dict[str, Any], k: int = 5,
+                           case_type: str = "personal_injury") -> Dict[str, Any]:
+        # Nearest closed cases by injury, treatment, insurer, damages and liability profile
+        features = self.get_case_features(case_data)
+        index = self.get_case_index()
+        start = time.perf_counter()
+        neighbors = index.search(embed_case(features, case_type), k=max(1, min(int(k), MAX_SIMILAR_CASES)),
+                                 exclude=case_data.get('case_name'))
+        economic_damages = sum(features.aggregates.damage_totals.values()) / 100
+        
+        return {
+            "indexed_cases": len(index),
+            "similar_cases": neighbors,
+            "outcomes": outcome_summary(neighbors, economic_damages),
+            "economic_damages": economic_damages,
+            "search_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    
+    def record_case_outcome(self, case_data: Dict[str, Any], outcome: str, settlement_amount: float = 0.0,
+                            case_type: str = "personal_injury", closed_date: str = "") -> Dict[str, Any]:
+        # Adds (or replaces) this case in the closed-case index and saves it
+        features = self.get_case_features(case_data)
+        case_id = case_data.get('case_name') or fingerprint(case_data)
+        index = self.get_case_index()
+        index.add(case_id, embed_case(features, case_type), {
+            "case_name": case_data.get('case_name', case_id),
+            "case_type": case_type,
+            "outcome": outcome,
+            "settlement": float(settlement_amount) if settlement_amount else None,
+            "economic_damages": sum(features.aggregates.damage_totals.values()) / 100,
+            "closed_date": closed_date or str(today())
+        })
+        index.save(str(CASE_INDEX_PATH))
+        print(f"📚 Recorded outcome for {case_id}: {outcome} ({len(index)} closed cases indexed)")
+        
+        return {"case_id": case_id, "indexed_cases": len(index), "status": "recorded"}
+    
     def find_missing_evidence(self, case_data: Dict[str, Any], case_type: str = "personal_injury") -> Dict[str, Any]:
         evidence_checklists = {
             "personal_injury": [
@@ -281,20 +683,7 @@ You are the critical thinking partner that helps legal teams build stronger case
         }
         
         expected = evidence_checklists.get(case_type, evidence_checklists["personal_injury"])
-        found = set()
-        
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if 'classification' in file_result:
-                    found.add(file_result['classification']['primary_type'])
-                
-                filename_lower = file_result.get('filename', '').lower()
-                if 'photo' in filename_lower or 'image' in filename_lower:
-                    found.add('photos')
-                if 'wage' in filename_lower or 'pay' in filename_lower:
-                    found.add('wage_statements')
-                if 'witness' in filename_lower or 'statement' in filename_lower:
-                    found.add('witness_statements')
+        found = self.get_case_features(case_data).aggregates.evidence_found()
         
         missing = [item for item in expected if item not in found]
         
@@ -311,68 +700,20 @@ You are the critical thinking partner that helps legal teams build stronger case
         }
     
     def calculate_damages(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
-        damages = {
-            "medical_expenses": [],
-            "property_damage": [],
-            "lost_wages": [],
-            "other_expenses": []
-        }
-        
-        total_amounts = []
+        features = self.get_case_features(case_data)
+        ledger = features.damage_ledger
+        totals = features.aggregates.damage_totals
         
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if not file_result.get('success'):
-                    continue
-                
-                classification = file_result.get('classification', {}).get('primary_type', 'general')
-                amounts = file_result.get('key_info', {}).get('amounts', [])
-                source = file_result.get('filename', 'Unknown')
-                
-                for amount in amounts:
-                    clean_amount = float(amount.replace('$', '').replace(',', ''))
-                    total_amounts.append(clean_amount)
-                    
-                    if classification == 'medical':
-                        damages['medical_expenses'].append({
-                            'amount': amount,
-                            'source': source,
-                            'value': clean_amount
-                        })
-                    elif 'property' in classification or 'damage' in source.lower():
-                        damages['property_damage'].append({
-                            'amount': amount,
-                            'source': source,
-                            'value': clean_amount
-                        })
-                    elif 'wage' in source.lower() or 'pay' in source.lower():
-                        damages['lost_wages'].append({
-                            'amount': amount,
-                            'source': source,
-                            'value': clean_amount
-                        })
-                    else:
-                        damages['other_expenses'].append({
-                            'amount': amount,
-                            'source': source,
-                            'value': clean_amount
-                        })
-        
-        medical_total = sum(item['value'] for item in damages['medical_expenses'])
-        property_total = sum(item['value'] for item in damages['property_damage'])
-        wages_total = sum(item['value'] for item in damages['lost_wages'])
-        other_total = sum(item['value'] for item in damages['other_expenses'])
-        
-        economic_damages = medical_total + property_total + wages_total + other_total
+        economic_damages = sum(totals.values()) / 100
         pain_suffering_low = economic_damages * 1.5
         pain_suffering_high = economic_damages * 5.0
         
         return {
             "economic_damages": {
-                "medical_expenses": medical_total,
-                "property_damage": property_total,
-                "lost_wages": wages_total,
-                "other_expenses": other_total,
+                "medical_expenses": totals['medical_expenses'] / 100,
+                "property_damage": totals['property_damage'] / 100,
+                "lost_wages": totals['lost_wages'] / 100,
+                "other_expenses": totals['other_expenses'] / 100,
                 "total": economic_damages
             },
             "non_economic_damages_estimate": {
@@ -384,7 +725,11 @@ You are the critical thinking partner that helps legal teams build stronger case
                 "low": economic_damages + pain_suffering_low,
                 "high": economic_damages + pain_suffering_high
             },
-            "damage_breakdown": damages
+            "damage_breakdown": {
+                category: ledger.items(category, MAX_DAMAGE_ITEMS) for category in DAMAGE_CATEGORIES
+            },
+            "distribution": ledger.distributions(),
+            "deduplication": ledger.summary()
         }
     
     def generate_case_strategy(self, case_data: Dict[str, Any], analysis_results: Dict[str, Any]) -> Dict[str, Any]:
@@ -404,11 +749,7 @@ You are the critical thinking partner that helps legal teams build stronger case
             else:
                 strategy['weaknesses'].append("Limited documentation - gather more evidence")
         
-        has_medical = any(
-            file_result.get('classification', {}).get('primary_type') == 'medical'
-            for file_result in case_data.get('files_processed', [])
-            if file_result.get('success')
-        )
+        has_medical = self.get_case_features(case_data).has_successful_type('medical')
         
         if has_medical:
             strategy['strengths'].append("Medical documentation supports injury claims")
@@ -440,26 +781,50 @@ You are the critical thinking partner that helps legal teams build stronger case
         
         return strategy
     
+    def get_text_index(self, case_data: Dict[str, Any]) -> CaseTextIndex:
+        # Prefer the index DocuAgent persisted next to the case; build one in memory otherwise
+        if self.text_index is None or self._text_index_case is not case_data:
+            text_index = None
+            index_path = case_data.get('text_index_path')
+            if index_path and os.path.exists(index_path):
+                try:
+                    text_index = CaseTextIndex.load(index_path)
+                except (OSError, ValueError):
+                    text_index = None
+            self.text_index = text_index or CaseTextIndex.from_case_data(case_data)
+            self._text_index_case = case_data
+        return self.text_index
+    
     def cross_reference_documents(self, case_data: Dict[str, Any], search_term: str) -> Dict[str, Any]:
         matches = []
+        hits = self.get_text_index(case_data).search(search_term, limit=None, phrase=True)
+        
+        for hit in hits:
+            matches.append({
+                'filename': os.path.basename(hit['name']),
+                'document_type': hit['document_type'],
+                'context': hit['snippet'],
+                'position': hit['position'],
+                'page': hit['page'],
+                'score': hit['score'],
+                'fuzzy': hit['fuzzy']
+            })
         
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if not file_result.get('success'):
-                    continue
-                
-                text = file_result.get('text', '')
-                if search_term.lower() in text.lower():
-                    index = text.lower().find(search_term.lower())
+        if not hits:
+            # Nothing in the index matched (e.g. "$" or part of a word); fall back to a substring scan
+            term = search_term.lower()
+            for doc in self.get_case_features(case_data).successful:
+                index = doc.text_lower.find(term) if term else -1
+                if index >= 0:
                     start = max(0, index - 100)
-                    end = min(len(text), index + len(search_term) + 100)
-                    context = text[start:end]
+                    end = min(len(doc.text), index + len(search_term) + 100)
                     
                     matches.append({
-                        'filename': file_result.get('filename'),
-                        'document_type': file_result.get('classification', {}).get('primary_type'),
-                        'context': context,
-                        'position': index
+                        'filename': doc.filename,
+                        'document_type': doc.classification,
+                        'context': doc.text[start:end],
+                        'position': index,
+                        'page': doc.page_index.page_of(index) if doc.page_index else None
                     })
         
         return {
@@ -469,6 +834,139 @@ You are the critical thinking partner that helps legal teams build stronger case
             "matches": matches[:10]
         }
     
+    def map_case_entities(self, case_data: Dict[str, Any], max_entities: int = MAX_ENTITY_SUMMARY) -> Dict[str, Any]:
+        # Prompt-sized map of who and what the documents mention and which appear together
+        return self.get_case_features(case_data).entity_graph.summary(max_entities, MAX_ENTITY_SUMMARY)
+    
+    def find_entity_documents(self, case_data: Dict[str, Any], name: str) -> Dict[str, Any]:
+        graph = self.get_case_features(case_data).entity_graph
+        matches = [graph.describe(entity) for entity in graph.lookup(name)]
+        
+        return {
+            "query": name,
+            "found": bool(matches),
+            "matches": matches,
+            "document_count": len({d['document'] for match in matches for d in match['documents']})
+        }
+    
+    def research_legal_topic(self, query: str, num_results: int = 5) -> Dict[str, Any]:
+        # Statute and case-law searches repeat across cases; equivalent phrasings share a cache entry
+        result = self.search_cache.search(query, max(1, min(int(num_results), MAX_SEARCH_RESULTS)))
+        result["cache"] = self.search_cache.stats
+        return result
+    
+    def _incident_date(self, case_data: Dict[str, Any]) -> Optional[np.datetime64]:
+        # Earliest date in police reports or in documents named after the accident
+        candidates = [
+            doc.dates.min() for doc in self.get_case_features(case_data).successful
+            if len(doc.dates) and (doc.classification == 'police_report'
+                                   or any(keyword in doc.filename_lower for keyword in INCIDENT_KEYWORDS))
+        ]
+        return min(candidates) if candidates else None
+    
+    def _treatment_index(self, case_data: Dict[str, Any], since: Optional[np.datetime64] = None) -> IntervalIndex:
+        # Dates in medical records; earlier ones (birth dates, prior history) are dropped when `since` is known
+        days, sources = [], []
+        for doc in self.get_case_features(case_data).successful:
+            if doc.classification == 'medical':
+                dates = doc.text_dates if since is None else doc.text_dates[doc.text_dates >= since]
+                days.extend(dates)
+                sources.extend([doc.filename] * len(dates))
+        return IntervalIndex.from_days(days, sources)
+    
+    def find_treatment_gaps(self, case_data: Dict[str, Any], min_gap_days: int = 30) -> Dict[str, Any]:
+        incident = self._incident_date(case_data)
+        treatment = self._treatment_index(case_data, since=incident)
+        gaps = treatment.gaps(min_gap_days)
+        
+        days_to_first_treatment = None
+        if incident is not None and len(treatment):
+            days_to_first_treatment = int((treatment.starts[0] - incident).astype(int))
+        
+        recommendations = [
+            f"Explain {gap['days']}-day treatment gap ({gap['gap_start']} to {gap['gap_end']})"
+            for gap in gaps[:5]
+        ]
+        if days_to_first_treatment is not None and days_to_first_treatment > INITIAL_TREATMENT_WINDOW_DAYS:
+            recommendations.insert(0, f"First treatment came {days_to_first_treatment} days after the incident")
+        
+        return {
+            "min_gap_days": min_gap_days,
+            "treatment_dates": len(treatment),
+            "first_treatment": str(treatment.starts[0]) if len(treatment) else None,
+            "last_treatment": str(treatment.ends.max()) if len(treatment) else None,
+            "incident_date": str(incident) if incident is not None else None,
+            "days_to_first_treatment": days_to_first_treatment,
+            "gaps": gaps,
+            "total_gaps": len(gaps),
+            "longest_gap_days": max((gap['days'] for gap in gaps), default=0),
+            "recommendations": recommendations
+        }
+    
+    def check_coverage_periods(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
+        periods = []
+        for doc in self.get_case_features(case_data).successful:
+            if doc.classification == 'insurance' or 'policy' in doc.filename_lower:
+                periods.extend((start, end, {'source': doc.filename, 'period': raw})
+                               for start, end, raw in extract_date_ranges(doc.text))
+        coverage = IntervalIndex(periods)
+        
+        overlaps = [{
+            'first': coverage.labels[a],
+            'second': coverage.labels[b],
+            'overlap_start': str(coverage.starts[b]),
+            'overlap_end': str(min(coverage.ends[a], coverage.ends[b]))
+        } for a, b in coverage.overlaps()]
+        
+        incident = self._incident_date(case_data)
+        incident_covered = None
+        if incident is not None and len(coverage):
+            incident_covered = [coverage.labels[i] for i in coverage.covering(incident)]
+        
+        return {
+            "coverage_periods": [
+                {**label, 'start': str(start), 'end': str(end)}
+                for start, end, label in zip(coverage.starts, coverage.ends, coverage.labels)
+            ],
+            "overlaps": overlaps,
+            "coverage_gaps": coverage.gaps(),
+            "incident_date": str(incident) if incident is not None else None,
+            "policies_covering_incident": incident_covered
+        }
+    
+    def check_deadlines(self, case_data: Dict[str, Any], limitation_years: int = 2, as_of: str = "") -> Dict[str, Any]:
+        as_of_day = np.datetime64(as_of, 'D') if as_of else today()
+        incident = self._incident_date(case_data)
+        if incident is None:
+            return {
+                "incident_date": None,
+                "deadlines": [],
+                "warning": "No incident date found; calendar the statute of limitations manually"
+            }
+        
+        deadlines = [{
+            'deadline': 'statute_of_limitations',
+            'description': f"{limitation_years}-year limitation period from the incident",
+            **deadline_status(add_years(incident, limitation_years), as_of_day)
+        }]
+        
+        treatment = self._treatment_index(case_data, since=incident)
+        window_end = incident + np.timedelta64(INITIAL_TREATMENT_WINDOW_DAYS, 'D')
+        treated_in_window = bool(len(treatment.overlapping(incident, window_end)))
+        deadlines.append({
+            'deadline': 'initial_treatment',
+            'description': f"Treatment within {INITIAL_TREATMENT_WINDOW_DAYS} days of the incident",
+            'due_date': str(window_end),
+            'status': 'met' if treated_in_window else ('missed' if window_end < as_of_day else 'open')
+        })
+        
+        return {
+            "incident_date": str(incident),
+            "as_of": str(as_of_day),
+            "deadlines": deadlines,
+            "urgent": [d for d in deadlines if d['status'] in ('urgent', 'expired', 'missed')]
+        }
+    
     def analyze_liability(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
         liability_indicators = {
             "clear_liability": [],
@@ -476,21 +974,9 @@ You are the critical thinking partner that helps legal teams build stronger case
             "disputed_liability": []
         }
         
-        clear_fault_keywords = ['at fault', 'negligent', 'violated', 'failed to', 'breach']
-        disputed_keywords = ['dispute', 'deny', 'contest', 'disagree']
-        
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if not file_result.get('success'):
-                    continue
-                
-                text = file_result.get('text', '').lower()
-                
-                if any(keyword in text for keyword in clear_fault_keywords):
-                    liability_indicators['clear_liability'].append(file_result.get('filename'))
-                
-                if any(keyword in text for keyword in disputed_keywords):
-                    liability_indicators['disputed_liability'].append(file_result.get('filename'))
+        aggregates = self.get_case_features(case_data).aggregates
+        liability_indicators['clear_liability'] = aggregates.documents_in_group('clear_fault')
+        liability_indicators['disputed_liability'] = aggregates.documents_in_group('disputed')
         
         return {
             "liability_assessment": liability_indicators,
@@ -499,7 +985,9 @@ You are the critical thinking partner that helps legal teams build stronger case
             "recommendation": "Strong liability case" if len(liability_indicators['clear_liability']) > len(liability_indicators['disputed_liability']) else "Liability may be contested"
         }
     
-    def evaluate_settlement_value(self, damages: Dict[str, Any], liability_strength: str = "strong") -> Dict[str, Any]:
+    def evaluate_settlement_value(self, damages: Dict[str, Any], liability_strength: str = "strong",
+                                  simulate: bool = False, draws: int = 1_000_000, seed: Optional[int] = None,
+                                  policy_limits: Optional[List[float]] = None) -> Dict[str, Any]:
         if 'total_case_value_range' in damages:
             low_value = damages['total_case_value_range']['low']
             high_value = damages['total_case_value_range']['high']
@@ -518,7 +1006,7 @@ You are the critical thinking partner that helps legal teams build stronger case
         settlement_low = low_value * low_mult
         settlement_high = high_value * high_mult
         
-        return {
+        result = {
             "full_case_value": {
                 "low": low_value,
                 "high": high_value
@@ -535,35 +1023,23 @@ You are the critical thinking partner that helps legal teams build stronger case
                 "realistic_settlement": settlement_high * 0.85
             }
         }
+        
+        if simulate:
+            # Distribution over liability, comparative fault, collectability and policy limits
+            economic = damages.get('economic_damages', {}).get('total', 0)
+            result["monte_carlo"] = SettlementSimulator(seed).simulate(
+                economic, draws=max(1, min(int(draws), MAX_SIMULATION_DRAWS)),
+                liability_strength=liability_strength, policy_limits=policy_limits
+            )
+        
+        return result
     
     def identify_legal_issues(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
-        legal_issues = []
-        
-        issue_keywords = {
-            "negligence": ["negligent", "duty", "breach", "reasonable care"],
-            "causation": ["caused by", "resulted from", "due to"],
-            "damages": ["injury", "harm", "loss", "suffering"],
-            "statute_of_limitations": ["deadline", "time limit", "statute"],
-            "comparative_fault": ["also at fault", "contributory", "comparative"],
-            "premises_liability": ["property owner", "hazard", "maintenance"],
-            "product_liability": ["defective", "manufacturer", "design flaw"]
-        }
-        
-        if 'files_processed' in case_data:
-            for file_result in case_data['files_processed']:
-                if not file_result.get('success'):
-                    continue
-                
-                text = file_result.get('text', '').lower()
-                
-                for issue, keywords in issue_keywords.items():
-                    if any(keyword in text for keyword in keywords):
-                        if issue not in [li['issue'] for li in legal_issues]:
-                            legal_issues.append({
-                                'issue': issue,
-                                'found_in': file_result.get('filename'),
-                                'requires_research': True
-                            })
+        legal_issues = [{
+            'issue': issue,
+            'found_in': filename,
+            'requires_research': True
+        } for issue, filename in self.get_case_features(case_data).aggregates.first_documents(list(LEGAL_ISSUE_KEYWORDS))]
         
         return {
             "identified_issues": legal_issues,
@@ -637,94 +1113,98 @@ You are the critical thinking partner that helps legal teams build stronger case
             "ongoing_actions": [step for step in next_steps if step['priority'] >= 3]
         }
     
-    def perform_full_case_analysis(self, case_data: Dict[str, Any] = None) -> Dict[str, Any]:
-        # Use provided case_data or fall back to stored case_data
+    def build_analysis_graph(self, case_data: Dict[str, Any]) -> AnalysisGraph:
+        # Each step declares the results it needs; independent steps run concurrently
+        return AnalysisGraph([
+            AnalysisStep("features", lambda: self.get_case_features(case_data)),
+            AnalysisStep("timeline", lambda _: self.analyze_case_timeline(case_data), ["features"]),
+            AnalysisStep("inconsistencies", lambda _: self.identify_inconsistencies(case_data), ["features"]),
+            AnalysisStep("missing_evidence", lambda _: self.find_missing_evidence(case_data), ["features"]),
+            AnalysisStep("damages", lambda _: self.calculate_damages(case_data), ["features"]),
+            AnalysisStep("liability", lambda _: self.analyze_liability(case_data), ["features"]),
+            AnalysisStep("legal_issues", lambda _: self.identify_legal_issues(case_data), ["features"]),
+            AnalysisStep("settlement", lambda damages: self.evaluate_settlement_value(damages, "strong"), ["damages"]),
+            AnalysisStep(
+                "strategy",
+                lambda damages, inconsistencies, liability: self.generate_case_strategy(case_data, {
+                    'damages': damages,
+                    'inconsistencies': inconsistencies,
+                    'liability': liability
+                }),
+                ["damages", "inconsistencies", "liability"]
+            ),
+            AnalysisStep(
+                "next_steps",
+                lambda missing_evidence, inconsistencies, settlement, legal_issues: self.recommend_next_steps({
+                    'missing_evidence': missing_evidence,
+                    'inconsistencies': inconsistencies,
+                    'settlement': settlement,
+                    'legal_issues': legal_issues
+                }),
+                ["missing_evidence", "inconsistencies", "settlement", "legal_issues"]
+            ),
+            AnalysisStep("case_strength", self._calculate_case_strength,
+                         ["missing_evidence", "inconsistencies", "damages", "liability"]),
+            AnalysisStep("treatment_gaps", lambda _: self.find_treatment_gaps(case_data), ["features"]),
+            AnalysisStep("deadlines", lambda _: self.check_deadlines(case_data), ["features"]),
+            AnalysisStep("entities", lambda _: self.map_case_entities(case_data), ["features"]),
+        ], max_workers=self.analysis_workers)
+    
+    def _run_analysis_steps(self, case_data: Dict[str, Any], steps: List[str]) -> Dict[str, Any]:
+        def report(step, result, elapsed):
+            message = ANALYSIS_MESSAGES.get(step)
+            if message:
+                logger.info("%s (%.1f ms)", message(result), elapsed * 1000)
+        
+        if self._analysis_case is not case_data:
+            self.analysis_cache = {}
+            self._analysis_case = case_data
+        
+        # Steps untouched by document updates since the last run are reused as they are
+        run = self.build_analysis_graph(case_data).run(steps, on_complete=report, cached=self.analysis_cache)
+        self.analysis_cache.update({step: result for step, result in run['results'].items() if step in STEP_AGGREGATES})
+        logger.info("Analysis of %s completed in %.1f ms (reused: %s)", case_data.get('case_name', 'Unknown'),
+                    run['total_ms'], ", ".join(run['reused']) or "none")
+        return run
+    
+    def _analysis_stats(self) -> Dict[str, Any]:
+        stats = {"tool_cache": self.tool_cache.stats}
+        if self.search_cache is not None:
+            stats["search_cache"] = self.search_cache.stats
+        return stats
+    
+    def get_case_analysis(self, case_data: Dict[str, Any] = None) -> Optional[CaseAnalysis]:
+        # Lazy full analysis: each section is computed the first time it is read. None when
+        # there is no case data yet.
+        case_data = case_data if case_data is not None else self.case_data
         if case_data is None:
-            if self.case_data is None:
-                return {
-                    "success": False,
-                    "error": "No case data available for analysis",
-                    "message": "Please use request_document_processing tool first to process documents."
-                }
-            case_data = self.case_data
-        
-        print(f"\n{'='*80}")
-        print(f"🔍 SHERLOCK AGENT - CASE ANALYSIS")
-        print(f"{'='*80}\n")
-        
-        print("Step 1: Building case timeline...")
-        timeline = self.analyze_case_timeline(case_data)
-        print(f"✅ Identified {timeline['total_events']} dated events\n")
-        
-        # Step 3: Find inconsistencies
-        print("Step 3: Checking for inconsistencies...")
-        inconsistencies = self.identify_inconsistencies(case_data)
-        print(f"✅ Found {inconsistencies['total_inconsistencies']} potential issues\n")
-        
-        # Step 4: Identify missing evidence
-        print("Step 4: Identifying missing evidence...")
-        missing_evidence = self.find_missing_evidence(case_data)
-        print(f"✅ {missing_evidence['completion_percentage']:.1f}% evidence completeness\n")
-        
-        # Step 5: Calculate damages
-        print("Step 5: Calculating damages...")
-        damages = self.calculate_damages(case_data)
-        print(f"✅ Total economic damages: ${damages['economic_damages']['total']:,.2f}\n")
-        
-        # Step 6: Analyze liability
-        print("Step 6: Analyzing liability...")
-        liability = self.analyze_liability(case_data)
-        print(f"✅ {liability['recommendation']}\n")
-        
-        # Step 7: Identify legal issues
-        print("Step 7: Identifying legal issues...")
-        legal_issues = self.identify_legal_issues(case_data)
-        print(f"✅ Identified {legal_issues['total_issues']} legal issues\n")
-        
-        # Step 8: Evaluate settlement
-        print("Step 8: Evaluating settlement value...")
-        settlement = self.evaluate_settlement_value(damages, "strong")
-        print(f"✅ Settlement range: ${settlement['settlement_range']['low']:,.2f} - ${settlement['settlement_range']['high']:,.2f}\n")
-        
-        # Step 9: Generate strategy
-        print("Step 9: Generating case strategy...")
-        analysis_results = {
-            'damages': damages,
-            'inconsistencies': inconsistencies,
-            'liability': liability
-        }
-        strategy = self.generate_case_strategy(case_data, analysis_results)
-        print(f"✅ Strategy developed with {len(strategy['recommendations'])} recommendations\n")
-        
-        print("Step 9: Creating action plan...")
-        full_analysis = {
-            'missing_evidence': missing_evidence,
-            'inconsistencies': inconsistencies,
-            'settlement': settlement,
-            'legal_issues': legal_issues
-        }
-        next_steps = self.recommend_next_steps(full_analysis)
-        print(f"✅ {next_steps['total_actions']} action items prioritized\n")
-        
-        complete_analysis = {
+            return None
+        header = {
             "case_name": case_data.get('case_name', 'Unknown'),
             "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "document_processing": case_data['summary'],
-            "timeline_analysis": timeline,
-            "inconsistencies": inconsistencies,
-            "missing_evidence": missing_evidence,
-            "damage_calculation": damages,
-            "liability_analysis": liability,
-            "legal_issues": legal_issues,
-            "settlement_evaluation": settlement,
-            "case_strategy": strategy,
-            "next_steps": next_steps,
-            "case_strength_score": self._calculate_case_strength(
-                missing_evidence, inconsistencies, damages, liability
-            )
+            "document_processing": case_data.get('summary', {})
         }
+        return CaseAnalysis(header, ANALYSIS_SECTIONS, lambda steps: self._run_analysis_steps(case_data, steps),
+                            self._analysis_stats)
+    
+    def perform_full_case_analysis(self, case_data: Dict[str, Any] = None, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        analysis = self.get_case_analysis(case_data)
+        if analysis is None:
+            return {
+                "success": False,
+                "error": "No case data available for analysis",
+                "message": "Please use request_document_processing tool first to process documents."
+            }
         
-        return complete_analysis
+        unknown = [section for section in sections or [] if section not in ANALYSIS_SECTIONS]
+        if unknown:
+            return {
+                "success": False,
+                "error": f"Unknown analysis sections: {', '.join(unknown)}",
+                "available_sections": list(ANALYSIS_SECTIONS)
+            }
+        
+        return analysis.to_dict(sections)
     
     def _calculate_case_strength(self, missing_evidence, inconsistencies, damages, liability) -> Dict[str, Any]:
         score = 100
@@ -899,6 +1379,11 @@ if __name__ == "__main__":
         json.dump(analysis, f, indent=2)
     
     print(f"💾 Full analysis saved to: {output_file}")
+    
+    facts_file = output_dir / "sherlock_case_facts.npz"
+    case_facts = sherlock_agent.get_case_facts(sherlock_agent.case_data)
+    case_facts.save(str(facts_file))
+    print(f"💾 Case facts ({len(case_facts)} rows) saved to: {facts_file}")
     print(f"\n{'='*80}")
     print("✨ ANALYSIS COMPLETE")
     print(f"{'='*80}\n")
\ No newline at end of file
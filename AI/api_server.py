@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
@@ -6,6 +7,7 @@ import uvicorn
 import asyncio
 from datetime import datetime
 import os
+import time
 
 from agent_orchastrator import AIOrchestrator
 app = FastAPI(
@@ -28,6 +30,23 @@ orchestrator = None
 # In-memory task storage (use Redis/DB in production)
 tasks: Dict[str, Dict[str, Any]] = {}
 
+# Calls in progress, keyed by call id. Calls never ended with DELETE (client crashed, network
+# dropped) are dropped after LIVE_CALL_IDLE_SECONDS without a segment; at most MAX_LIVE_CALLS are kept.
+live_calls: Dict[str, Any] = {}
+# One lock per call: an analyzer's segments are applied one at a time and in arrival order, and
+# snapshots never see a half-applied segment
+live_call_locks: Dict[str, asyncio.Lock] = {}
+LIVE_CALL_IDLE_SECONDS = float(os.getenv("LIVE_CALL_IDLE_SECONDS", "1800"))
+MAX_LIVE_CALLS = int(os.getenv("MAX_LIVE_CALLS", "500"))
+
+# /api/cases/analysis only reads case folders under this root (processing writes index files)
+CASE_ROOT = os.path.realpath(os.getenv("CASE_ROOT", os.path.join(os.path.dirname(__file__), "data", "test")))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The orchestrator has one SherlockAgent, whose loaded case and analysis state are shared;
+# case analysis requests take turns on it
+sherlock_lock = asyncio.Lock()
+
 
 # Request/Response Models
 class ProcessFilesRequest(BaseModel):
@@ -63,6 +82,13 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str]
 
 
+class CallSegmentRequest(BaseModel):
+    text: str = Field(..., description="Transcript text for this segment")
+    start_seconds: Optional[float] = Field(None, description="Segment start, seconds into the call")
+    end_seconds: Optional[float] = Field(None, description="Segment end, seconds into the call")
+    speaker: Optional[str] = Field(None, description="Speaker label from diarization, if any")
+
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
@@ -76,6 +102,11 @@ async def startup_event():
     try:
         orchestrator = AIOrchestrator()
         print("✅ AI Orchestrator initialized")
+        if os.getenv("WARM_SENTIMENT_MODEL", "1") != "0":
+            # Load the sentiment model now rather than on the first client message
+            sentiment = orchestrator.coms_agent.sentiment
+            warm_ms = await asyncio.to_thread(sentiment.warm_up)
+            print(f"✅ Sentiment model warmed up ({'int8' if sentiment.quantize else 'fp32'}, {warm_ms:.0f} ms)")
     except Exception as e:
         print(f"❌ Failed to initialize orchestrator: {e}")
         print("⚠️  Server starting without orchestrator - set GOOGLE_API_KEY environment variable")
@@ -307,6 +338,116 @@ async def orchestrator_analyze(request: ProcessFilesRequest):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@app.get("/api/cases/analysis")
+async def case_analysis(case_folder: str, view: str = "summary", sections: Optional[str] = None):
+    """
+    Sherlock analysis of a case folder.
+    view=summary returns the headline numbers only; view=full streams the report section by
+    section (optionally limited to a comma-separated list of sections).
+    """
+    if orchestrator is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service unavailable: Orchestrator not initialized. Set GOOGLE_API_KEY environment variable."
+        )
+    if view not in ("summary", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'summary' or 'full'")
+    
+    
+    # Relative folders resolve against the project root, as Sherlock resolves them
+    folder = os.path.realpath(os.path.join(PROJECT_ROOT, case_folder))
+    if os.path.commonpath([folder, CASE_ROOT]) != CASE_ROOT:
+        raise HTTPException(status_code=403, detail="case_folder must be inside the configured case root")
+    
+    sherlock = orchestrator.sherlock_agent
+    async with sherlock_lock:
+        # Reprocess only when a different case is asked for
+        loaded = os.path.realpath(sherlock.case_data.get('case_folder', '')) if sherlock.case_data else None
+        if loaded != folder:
+            processing = await asyncio.to_thread(sherlock.request_document_processing, folder)
+            if not processing.get('success'):
+                raise HTTPException(status_code=404, detail=processing.get('error', 'Document processing failed'))
+        
+        analysis = sherlock.get_case_analysis()
+        if view == "summary":
+            return await asyncio.to_thread(analysis.summary)
+    
+    selected = [section.strip() for section in sections.split(",")] if sections else None
+    unknown = [section for section in selected or [] if section not in analysis.sections]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis sections: {', '.join(unknown)}")
+    return StreamingResponse(_stream_analysis(analysis, selected), media_type="application/json")
+
+
+async def _stream_analysis(analysis, selected: Optional[List[str]]):
+    # Sections are computed as they are streamed, so the agent stays locked until the last one.
+    # The analysis already holds its own case data; another case loaded in between does not affect it.
+    async with sherlock_lock:
+        chunks = analysis.iter_json(selected)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+
+def evict_idle_calls():
+    cutoff = time.monotonic() - LIVE_CALL_IDLE_SECONDS
+    for call_id in [call_id for call_id, analyzer in live_calls.items() if analyzer.last_activity < cutoff]:
+        del live_calls[call_id]
+        live_call_locks.pop(call_id, None)
+
+
+@app.post("/api/calls/{call_id}/segments")
+async def add_call_segment(call_id: str, segment: CallSegmentRequest):
+    """
+    Live call analysis: send transcript segments as they are recognized. Returns the events this
+    segment triggered (urgency, escalation, negative_trend, attorney_review) and the call's state.
+    """
+    if orchestrator is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service unavailable: Orchestrator not initialized. Set GOOGLE_API_KEY environment variable."
+        )
+    
+    evict_idle_calls()
+    analyzer = live_calls.get(call_id)
+    if analyzer is None:
+        if len(live_calls) >= MAX_LIVE_CALLS:
+            raise HTTPException(status_code=429, detail=f"Too many calls in progress (limit {MAX_LIVE_CALLS})")
+        analyzer = live_calls[call_id] = orchestrator.coms_agent.start_live_call(call_id)
+    async with live_call_locks.setdefault(call_id, asyncio.Lock()):
+        events = await asyncio.to_thread(analyzer.add_segment, segment.text, segment.start_seconds,
+                                         segment.end_seconds, segment.speaker)
+        return {
+            "call_id": call_id,
+            "segment": analyzer.segments - 1,
+            "events": events,
+            "urgency_level": analyzer.urgency,
+            "requires_attorney_review": analyzer.review_flagged
+        }
+
+
+@app.get("/api/calls/{call_id}")
+async def get_call_analysis(call_id: str):
+    evict_idle_calls()
+    if call_id not in live_calls:
+        raise HTTPException(status_code=404, detail="Call not found")
+    analyzer = live_calls[call_id]
+    async with live_call_locks.setdefault(call_id, asyncio.Lock()):
+        return analyzer.snapshot()
+
+
+@app.delete("/api/calls/{call_id}")
+async def end_call(call_id: str):
+    # Final state of the call; the analyzer is dropped
+    if call_id not in live_calls:
+        raise HTTPException(status_code=404, detail="Call not found")
+    analyzer = live_calls.pop(call_id)
+    async with live_call_locks.pop(call_id, asyncio.Lock()):
+        return analyzer.snapshot()
+
+
 @app.get("/api/test/scenarios")
 async def get_test_scenarios():
     return {
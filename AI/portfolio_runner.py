@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+RESULTS_FILENAME = "portfolio_results.jsonl"
+REPORT_FILENAME = "portfolio_report.json"
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "data" / "out" / "portfolio"  # One subdirectory per run
+RUN_ID_FORMAT = "%Y%m%d-%H%M%S"
+PORTFOLIO_SECTIONS = ["case_strength_score", "damage_calculation", "settlement_evaluation",
+                      "missing_evidence", "inconsistencies", "deadlines"]
+
+_sherlock = None  # One agent pair per worker process
+
+
+def _get_sherlock():
+    global _sherlock
+    if _sherlock is None:
+        from AI.agents.docu_agent.agent import DocuAgent
+        from AI.agents.sherlock_agent.agent import SherlockAgent
+        _sherlock = SherlockAgent(docu_agent=DocuAgent())
+    return _sherlock
+
+
+def analyze_case(case_id: str, case_folder: str) -> Dict[str, Any]:
+    # Runs in a worker; returns a compact record so only small results cross the process boundary
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"case_id": case_id, "case_folder": case_folder, "success": False}
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            sherlock = _get_sherlock()
+            processing = sherlock.request_document_processing(case_folder)
+            if not processing.get('success'):
+                record["error"] = processing.get('error', 'Document processing failed')
+                return record
+            analysis = sherlock.get_case_analysis()
+            if analysis is None:
+                record["error"] = "No case data available for analysis"
+                return record
+            # Only the sections the record uses; timeline, strategy, entities etc. are never computed
+            analysis.prefetch(PORTFOLIO_SECTIONS)
+
+        record.update({
+            "success": True,
+            "case_name": analysis.get('case_name'),
+            "documents": analysis.get('document_processing', {}),
+            "case_strength": analysis['case_strength_score'],
+            "economic_damages": analysis['damage_calculation']['economic_damages'],
+            "case_value_range": analysis['damage_calculation']['total_case_value_range'],
+            "settlement_range": analysis['settlement_evaluation']['settlement_range'],
+            "missing_evidence": analysis['missing_evidence']['missing_evidence'],
+            "evidence_completion": analysis['missing_evidence']['completion_percentage'],
+            "high_severity_issues": analysis['inconsistencies']['severity_breakdown'].get('high', 0),
+            "urgent_deadlines": analysis.get('deadlines', {}).get('urgent', []),
+            "step_timings_ms": analysis.timings_ms
+        })
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if _sherlock is not None:
+            # Drop per-case state before the next case lands on this worker
+            _sherlock.reset_case_state()
+        record["elapsed_s"] = round(time.perf_counter() - start, 2)
+        record["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return record
+
+
+def discover_cases(root: Optional[str] = None, case_ids: Optional[List[str]] = None) -> Dict[str, str]:
+    root_path = Path(root) if root else Path(__file__).parent / "data" / "test"
+    if case_ids:
+        return {case_id: str(root_path / case_id) for case_id in case_ids}
+    return {
+        folder.name: str(folder)
+        for folder in sorted(root_path.iterdir())
+        if folder.is_dir() and not folder.name.startswith('.')
+    }
+
+
+def folder_fingerprint(case_folder: str) -> str:
+    # Hash of every file's relative path, size and mtime; stat calls only, no file contents.
+    # Dotfiles are skipped, as process_case_folder skips them.
+    entries = []
+    for root, dirs, files in os.walk(case_folder):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append(f"{os.path.relpath(path, case_folder)}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    return hashlib.sha256("\n".join(entries).encode('utf-8')).hexdigest()
+
+
+def load_completed(results_path: Path) -> Dict[str, Dict[str, Any]]:
+    # Last successful record per case; a torn final line from an interrupted run is ignored
+    completed = {}
+    if results_path.exists():
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('success'):
+                    completed[record['case_id']] = record
+    return completed
+
+
+def build_report(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    records = list(records)
+    succeeded = [r for r in records if r.get('success')]
+    scores = np.array([r['case_strength']['score'] for r in succeeded], dtype=np.float64)
+
+    ratings: Dict[str, int] = {}
+    for record in succeeded:
+        rating = record['case_strength']['rating']
+        ratings[rating] = ratings.get(rating, 0) + 1
+
+    histogram, edges = np.histogram(scores, bins=[0, 20, 40, 60, 80, 100.0001]) if len(scores) else ([], [])
+    return {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "cases_analyzed": len(succeeded),
+        "cases_failed": [{"case_id": r['case_id'], "error": r.get('error')} for r in records if not r.get('success')],
+        "case_strength": {
+            "by_rating": ratings,
+            "histogram": {f"{int(edges[i])}-{min(int(edges[i + 1]), 100)}": int(count)
+                          for i, count in enumerate(histogram)},
+            "mean": round(float(scores.mean()), 1) if len(scores) else None,
+            "median": round(float(np.median(scores)), 1) if len(scores) else None
+        },
+        "total_exposure": {
+            "economic_damages": round(sum(r['economic_damages']['total'] for r in succeeded), 2),
+            "case_value_low": round(sum(r['case_value_range']['low'] for r in succeeded), 2),
+            "case_value_high": round(sum(r['case_value_range']['high'] for r in succeeded), 2),
+            "settlement_target": round(sum(r['settlement_range']['target'] for r in succeeded), 2)
+        },
+        "cases_with_missing_evidence": sorted(
+            ({"case_id": r['case_id'], "completion": r['evidence_completion'], "missing": r['missing_evidence']}
+             for r in succeeded if r['missing_evidence']),
+            key=lambda entry: entry['completion']
+        ),
+        "cases_with_urgent_deadlines": [
+            {"case_id": r['case_id'], "deadlines": r['urgent_deadlines']} for r in succeeded if r.get('urgent_deadlines')
+        ]
+    }
+
+
+def run_portfolio(cases: Dict[str, str], output_dir: Path, workers: int = 2, max_cases_per_worker: int = 5,
+                  run_id: Optional[str] = None) -> Dict[str, Any]:
+    # Every run writes to its own output_dir/<run_id>, so a nightly re-score always starts fresh.
+    # Naming an existing run resumes it: cases already finished there are kept unless their
+    # folder changed since (different folder_fingerprint), in which case they are re-analyzed.
+    resuming = run_id is not None
+    if resuming:
+        if not (output_dir / run_id).is_dir():
+            raise FileNotFoundError(f"No portfolio run {run_id!r} in {output_dir}")
+    else:
+        started_at = datetime.now().strftime(RUN_ID_FORMAT)
+        run_id, suffix = started_at, 1
+        while (output_dir / run_id).exists():
+            suffix += 1
+            run_id = f"{started_at}-{suffix}"
+    run_dir = output_dir / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    results_path = run_dir / RESULTS_FILENAME
+
+    fingerprints = {case_id: folder_fingerprint(folder) for case_id, folder in cases.items()}
+    completed = {case_id: record for case_id, record in load_completed(results_path).items()
+                 if record.get('fingerprint') == fingerprints.get(case_id)}
+    if results_path.exists() and results_path.stat().st_size:
+        with open(results_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # Terminate a line torn by an interrupted run so the next record starts cleanly
+                f.write(b"\n")
+    pending = [(case_id, folder) for case_id, folder in cases.items() if case_id not in completed]
+    records = {case_id: completed[case_id] for case_id in cases if case_id in completed}
+
+    print(f"📁 Run {run_id}, {len(cases)} cases: {len(records)} already done, {len(pending)} to analyze")
+    started = time.perf_counter()
+    done_count = 0
+
+    # Workers are recycled after a few cases and at most 2x workers cases are in flight,
+    # which keeps per-process memory and queued results bounded
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=max_cases_per_worker) as executor, \
+            open(results_path, 'a') as results_file:
+        queue = iter(pending)
+        running = {}
+
+        def submit_more():
+            while len(running) < workers * 2:
+                try:
+                    case_id, folder = next(queue)
+                except StopIteration:
+                    return
+                running[executor.submit(analyze_case, case_id, folder)] = case_id
+
+        submit_more()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                case_id = running.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:  # Worker crashed (e.g. killed for memory)
+                    record = {"case_id": case_id, "case_folder": cases[case_id], "success": False,
+                              "error": f"{type(e).__name__}: {e}"}
+                record["fingerprint"] = fingerprints[case_id]
+                results_file.write(json.dumps(record) + "\n")
+                results_file.flush()
+                records[case_id] = record
+
+                done_count += 1
+                elapsed = time.perf_counter() - started
+                eta = elapsed / done_count * (len(pending) - done_count)
+                if record.get('success'):
+                    strength = record['case_strength']
+                    status = f"✅ {strength['rating']} ({strength['score']})"
+                else:
+                    status = f"❌ {record.get('error')}"
+                print(f"[{done_count}/{len(pending)}] {case_id}: {status} in {record.get('elapsed_s', 0)}s, ETA {eta:.0f}s")
+            submit_more()
+
+    report = build_report(records.values())
+    report["run_id"] = run_id
+    report_path = run_dir / REPORT_FILENAME
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n💾 Results: {results_path}")
+    print(f"💾 Report: {report_path}")
+    print(f"↩️  Resume this run with --resume {run_id}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score every active case with the Sherlock agent")
+    parser.add_argument("root", nargs="?", help="Directory whose subfolders are case folders (default: data/test)")
+    parser.add_argument("--cases", nargs="+", help="Case ids (subfolder names under root) to analyze")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR), help="Directory holding one subdirectory per run")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument("--max-cases-per-worker", type=int, default=5,
+                        help="Recycle each worker process after this many cases")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run; cases whose folder changed since are re-analyzed")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 80)
+    print("SHERLOCK PORTFOLIO RUN")
+    print("=" * 80 + "\n")
+
+    report = run_portfolio(
+        discover_cases(args.root, args.cases),
+        Path(args.output),
+        workers=args.workers,
+        max_cases_per_worker=args.max_cases_per_worker,
+        run_id=args.resume
+    )
+
+    print(f"\n📊 Cases analyzed: {report['cases_analyzed']} (failed: {len(report['cases_failed'])})")
+    print(f"   Strength: {report['case_strength']['by_rating']}")
+    print(f"   Total exposure (case value): ${report['total_exposure']['case_value_low']:,.2f} - "
+          f"${report['total_exposure']['case_value_high']:,.2f}")
+    print(f"   Cases with missing evidence: {len(report['cases_with_missing_evidence'])}")
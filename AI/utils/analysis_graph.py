@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+class AnalysisStep:
+    def __init__(self, name: str, fn: Callable[..., Any], inputs: Iterable[str] = ()):
+        # fn is called with the results of `inputs`, in the declared order
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+
+
+class AnalysisGraph:
+    def __init__(self, steps: Iterable[AnalysisStep], max_workers: int = 4):
+        self.steps: Dict[str, AnalysisStep] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate analysis step: {step.name}")
+            self.steps[step.name] = step
+        for step in self.steps.values():
+            unknown = [name for name in step.inputs if name not in self.steps]
+            if unknown:
+                raise ValueError(f"Step {step.name} depends on unknown steps: {', '.join(unknown)}")
+        self.max_workers = max_workers
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle in analysis steps: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dependency in self.steps[name].inputs:
+                visit(dependency, path + [name])
+            state[name] = 2
+
+        for name in self.steps:
+            visit(name, [])
+
+    def required_steps(self, targets: Optional[Iterable[str]] = None) -> Set[str]:
+        # Targets plus everything they transitively depend on
+        if targets is None:
+            return set(self.steps)
+
+        required: Set[str] = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.steps:
+                raise ValueError(f"Unknown analysis step: {name}")
+            if name not in required:
+                required.add(name)
+                pending.extend(self.steps[name].inputs)
+        return required
+
+    def dependents(self, names: Iterable[str]) -> Set[str]:
+        # Steps that transitively consume any of `names` (not including them)
+        found: Set[str] = set()
+        pending = set(names)
+        while pending:
+            consumers = {step.name for step in self.steps.values() if pending & set(step.inputs)} - found
+            found |= consumers
+            pending = consumers
+        return found
+
+    def run(self, targets: Optional[Iterable[str]] = None,
+            on_complete: Optional[Callable[[str, Any, float], None]] = None,
+            cached: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # `cached` holds results still valid from an earlier run; those steps are not executed
+        required = self.required_steps(targets)
+        reused = {name: result for name, result in (cached or {}).items() if name in required}
+        results: Dict[str, Any] = dict(reused)
+        timings: Dict[str, float] = {}
+        remaining = {name: set(self.steps[name].inputs) - set(reused) for name in required if name not in reused}
+
+        def execute(step: AnalysisStep):
+            start = time.perf_counter()
+            result = step.fn(*(results[name] for name in step.inputs))
+            return result, time.perf_counter() - start
+
+        total_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+
+            def submit_ready():
+                ready = [name for name, deps in remaining.items() if not deps]
+                for name in ready:
+                    del remaining[name]
+                    running[executor.submit(execute, self.steps[name])] = name
+
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Re-raises the step's exception; pending steps are abandoned
+                    result, elapsed = future.result()
+                    results[name] = result
+                    timings[name] = round(elapsed * 1000, 3)
+                    if on_complete:
+                        on_complete(name, result, elapsed)
+                    for deps in remaining.values():
+                        deps.discard(name)
+                submit_ready()
+
+        return {
+            "results": results,
+            "timings_ms": timings,
+            "reused": sorted(reused),
+            "total_ms": round((time.perf_counter() - total_start) * 1000, 3),
+        }
@@ -0,0 +1,113 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Sections the summary view is built from; everything else is only computed when asked for
+SUMMARY_SECTIONS = ["case_strength_score", "damage_calculation", "settlement_evaluation",
+                    "missing_evidence", "inconsistencies"]
+
+
+class CaseAnalysis:
+    # Full-analysis result whose sections are computed on first access and then kept. `compute`
+    # runs the analysis graph for a list of step names and returns AnalysisGraph.run()'s dict;
+    # asking for several sections at once (prefetch) lets independent steps run in parallel.
+    # Results are a snapshot: a document added afterwards needs a new CaseAnalysis.
+    def __init__(self, header: Dict[str, Any], sections: Dict[str, str],
+                 compute: Callable[[List[str]], Dict[str, Any]],
+                 extras: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.header = header
+        self.sections = sections
+        self._compute = compute
+        self._extras = extras
+        self.results: Dict[str, Any] = {}
+        self.timings_ms: Dict[str, float] = {}
+        self.reused: List[str] = []
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.header or key in self.sections
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.header:
+            return self.header[key]
+        if key not in self.sections:
+            raise KeyError(key)
+        self.prefetch([key])
+        return self.results[self.sections[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self) -> List[str]:
+        return list(self.header) + list(self.sections)
+
+    @property
+    def computed_sections(self) -> List[str]:
+        return [section for section, step in self.sections.items() if step in self.results]
+
+    def prefetch(self, sections: Iterable[str]):
+        unknown = [section for section in sections if section not in self.sections]
+        if unknown:
+            raise KeyError(f"Unknown analysis sections: {', '.join(unknown)}")
+        with self._lock:
+            steps = list(dict.fromkeys(self.sections[section] for section in sections
+                                       if self.sections[section] not in self.results))
+            if not steps:
+                return
+            run = self._compute(steps)
+            self.results.update(run['results'])
+            self.timings_ms.update(run['timings_ms'])
+            self.reused = sorted(set(self.reused) | set(run['reused']))
+            self.total_ms = round(self.total_ms + run['total_ms'], 3)
+
+    def _selected(self, sections: Optional[Iterable[str]]) -> List[str]:
+        wanted = set(sections) if sections else None
+        return [section for section in self.sections if wanted is None or section in wanted]
+
+    def _metadata(self) -> Dict[str, Any]:
+        metadata = {
+            "step_timings_ms": self.timings_ms,
+            "total_time_ms": self.total_ms,
+            "reused_steps": self.reused
+        }
+        if self._extras:
+            metadata.update(self._extras())
+        return metadata
+
+    def to_dict(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        selected = self._selected(sections)
+        self.prefetch(selected)
+        return {
+            **self.header,
+            **{section: self.results[self.sections[section]] for section in selected},
+            **self._metadata()
+        }
+
+    def iter_json(self, sections: Optional[Iterable[str]] = None) -> Iterator[str]:
+        # One chunk per section, each computed just before it is written, so a streaming
+        # response starts with the header instead of waiting for the slowest step
+        yield "{" + json.dumps(self.header, default=str)[1:-1]
+        for section in self._selected(sections):
+            yield f", {json.dumps(section)}: {json.dumps(self[section], default=str)}"
+        yield ", " + json.dumps(self._metadata(), default=str)[1:]
+
+    def summary(self) -> Dict[str, Any]:
+        # The numbers list views and dashboards show; skips timeline, strategy, entities, ...
+        self.prefetch([section for section in SUMMARY_SECTIONS if section in self.sections])
+        strength = self["case_strength_score"]
+        damages = self["damage_calculation"]
+        inconsistencies = self["inconsistencies"]
+        return {
+            "case_name": self.header.get("case_name"),
+            "documents": self.header.get("document_processing", {}).get("total_files"),
+            "case_strength": strength.get("score"),
+            "case_rating": strength.get("rating"),
+            "economic_damages": damages["economic_damages"]["total"],
+            "case_value_range": damages["total_case_value_range"],
+            "settlement_range": self["settlement_evaluation"]["settlement_range"],
+            "evidence_completion": self["missing_evidence"]["completion_percentage"],
+            "missing_evidence": self["missing_evidence"]["missing_evidence"],
+            "issues": inconsistencies["severity_breakdown"],
+            "computed_sections": self.computed_sections
+        }
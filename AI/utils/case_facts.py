@@ -0,0 +1,276 @@
+import re
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .page_index import PageIndex
+
+FACT_KINDS = ["amount", "date", "email", "phone"]
+KIND_CODES = {kind: code for code, kind in enumerate(FACT_KINDS)}
+
+DATE_PATTERN = re.compile(
+    r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}\b',
+    re.IGNORECASE
+)
+AMOUNT_PATTERN = re.compile(r'\$\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?')
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b|\(\d{3}\)\s*\d{3}[-.]?\d{4}')
+
+MONTHS = {name: index + 1 for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+)}
+NUMERIC_DATE = re.compile(r'(\d{1,2})[-/](\d{1,2})[-/](\d{2,4})$')
+NAMED_DATE = re.compile(r'([A-Za-z]{3})[a-z]* (\d{1,2}),? (\d{4})$', re.IGNORECASE)
+
+NAT = np.datetime64('NaT', 'D')
+
+
+def parse_amount_cents(raw: str) -> int:
+    # Integer arithmetic only: "$1,234.5" and "$1,234.50" both become 123450
+    cleaned = raw.replace('$', '').replace(',', '').strip()
+    whole, _, fraction = cleaned.partition('.')
+    return int(whole or 0) * 100 + int((fraction + "00")[:2])
+
+
+def parse_date(raw: str) -> np.datetime64:
+    raw = raw.strip()
+    match = NUMERIC_DATE.match(raw)
+    if match:
+        month, day, year = (int(part) for part in match.groups())
+        if year < 100:
+            year += 2000 if year <= 50 else 1900
+    else:
+        match = NAMED_DATE.match(raw)
+        if not match or match.group(1).lower() not in MONTHS:
+            return NAT
+        month, day, year = MONTHS[match.group(1).lower()], int(match.group(2)), int(match.group(3))
+
+    try:
+        return np.datetime64(date(year, month, day), 'D')
+    except ValueError:
+        return NAT
+
+
+def extract_facts(text: str) -> List[Tuple[str, str, int]]:
+    facts = []
+    for kind, pattern in (("amount", AMOUNT_PATTERN), ("date", DATE_PATTERN),
+                          ("email", EMAIL_PATTERN), ("phone", PHONE_PATTERN)):
+        for match in pattern.finditer(text):
+            facts.append((kind, match.group(0), match.start()))
+    return facts
+
+
+class _Interner:
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        return self.codes.get(value, -1)
+
+
+class CaseFactsStore:
+    COLUMNS = {
+        "case": np.int32,
+        "source": np.int32,
+        "category": np.int16,
+        "kind": np.int8,
+        "cents": np.int64,
+        "date": 'datetime64[D]',
+        "offset": np.int64,
+        "page": np.int32,
+        "value": np.int32,
+    }
+
+    def __init__(self):
+        self.cases = _Interner()
+        self.case_status: Dict[int, str] = {}
+        self.sources = _Interner()
+        self.categories = _Interner()
+        self.values = _Interner()
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._pending: List[Tuple] = []
+
+    def __len__(self):
+        return len(self.columns['kind']) + len(self._pending)
+
+    def add_document(self, case_id: str, source: str, text: Optional[str] = None,
+                     key_info: Optional[Dict[str, Any]] = None, category: str = "general",
+                     page_index: Optional[PageIndex] = None):
+        case_code = self.cases.intern(case_id)
+        self.case_status.setdefault(case_code, "open")
+        source_code = self.sources.intern(f"{case_id}/{source}")
+        category_code = self.categories.intern(category)
+
+        if text:
+            facts = extract_facts(text)
+        else:
+            # key_info lists are capped by extract_key_information; only used when text is gone
+            key_info = key_info or {}
+            facts = [("amount", raw, -1) for raw in key_info.get('amounts', [])]
+            facts += [("date", raw, -1) for raw in key_info.get('dates', [])]
+            facts += [("email", raw, -1) for raw in key_info.get('emails', [])]
+            facts += [("phone", raw, -1) for raw in key_info.get('phones', [])]
+
+        for kind, raw, offset in facts:
+            cents = parse_amount_cents(raw) if kind == "amount" else 0
+            when = parse_date(raw) if kind == "date" else NAT
+            page = page_index.page_of(offset) if page_index and offset >= 0 else 0
+            self._pending.append((case_code, source_code, category_code, KIND_CODES[kind],
+                                  cents, when, offset, page, self.values.intern(raw)))
+
+    def add_file_result(self, case_id: str, file_result: Dict[str, Any]):
+        if not file_result.get('success'):
+            return
+        self.add_document(
+            case_id,
+            file_result.get('relative_path') or file_result.get('filename', 'Unknown'),
+            text=file_result.get('text'),
+            key_info=file_result.get('key_info'),
+            category=file_result.get('classification', {}).get('primary_type', 'general'),
+            page_index=PageIndex.from_result(file_result)
+        )
+
+    def remove_document(self, case_id: str, source: str):
+        source_code = self.sources.lookup(f"{case_id}/{source}")
+        if source_code < 0:
+            return
+        self._flush()
+        keep = self.columns['source'] != source_code
+        self.columns = {name: values[keep] for name, values in self.columns.items()}
+
+    def add_case(self, case_data: Dict[str, Any], case_id: Optional[str] = None, status: str = "open"):
+        case_id = case_id or case_data.get('case_name', 'Unknown')
+        self.case_status[self.cases.intern(case_id)] = status
+
+        for file_result in case_data.get('files_processed', []):
+            self.add_file_result(case_id, file_result)
+        self._flush()
+        return self
+
+    @classmethod
+    def from_case_data(cls, case_data: Dict[str, Any], case_id: Optional[str] = None) -> "CaseFactsStore":
+        return cls().add_case(case_data, case_id)
+
+    def set_case_status(self, case_id: str, status: str):
+        self.case_status[self.cases.intern(case_id)] = status
+
+    def _flush(self):
+        if not self._pending:
+            return
+        rows = list(zip(*self._pending))
+        for (name, dtype), values in zip(self.COLUMNS.items(), rows):
+            self.columns[name] = np.concatenate([self.columns[name], np.array(values, dtype=dtype)])
+        self._pending = []
+
+    def mask(self, kind: Optional[str] = None, case: Optional[str] = None, category: Optional[str] = None,
+             source: Optional[str] = None, status: Optional[str] = None, min_cents: Optional[int] = None,
+             max_cents: Optional[int] = None, start: Optional[str] = None, end: Optional[str] = None) -> np.ndarray:
+        self._flush()
+        cols = self.columns
+        mask = np.ones(len(cols['kind']), dtype=bool)
+
+        if kind is not None:
+            mask &= cols['kind'] == KIND_CODES[kind]
+        if case is not None:
+            mask &= cols['case'] == self.cases.lookup(case)
+        if category is not None:
+            mask &= cols['category'] == self.categories.lookup(category)
+        if source is not None:
+            mask &= cols['source'] == self.sources.lookup(source)
+        if status is not None:
+            codes = [code for code, value in self.case_status.items() if value == status]
+            mask &= np.isin(cols['case'], np.array(codes, dtype=np.int32))
+        if min_cents is not None:
+            mask &= cols['cents'] >= min_cents
+        if max_cents is not None:
+            mask &= cols['cents'] <= max_cents
+        if start is not None:
+            mask &= cols['date'] >= np.datetime64(start, 'D')
+        if end is not None:
+            mask &= cols['date'] <= np.datetime64(end, 'D')
+        return mask
+
+    def total_cents(self, **filters) -> int:
+        mask = self.mask(kind="amount", **filters)
+        return int(self.columns['cents'][mask].sum())
+
+    def _group_codes(self, by: str) -> Tuple[np.ndarray, List[str]]:
+        tables = {"case": self.cases, "source": self.sources, "category": self.categories, "value": self.values}
+        if by == "kind":
+            return self.columns['kind'], FACT_KINDS
+        if by not in tables:
+            raise ValueError(f"Cannot group by {by}")
+        return self.columns[by], tables[by].values
+
+    def group_sum(self, by: str = "category", **filters) -> Dict[str, int]:
+        mask = self.mask(kind="amount", **filters)
+        codes, labels = self._group_codes(by)
+        codes, cents = codes[mask], self.columns['cents'][mask]
+        if len(codes) == 0:
+            return {}
+
+        # Sort + reduceat keeps the sums in exact int64 (bincount would go through float64)
+        order = np.argsort(codes, kind='stable')
+        codes, cents = codes[order], cents[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        sums = np.add.reduceat(cents, starts)
+        return {labels[int(codes[i])]: int(total) for i, total in zip(starts, sums)}
+
+    def group_count(self, by: str = "category", **filters) -> Dict[str, int]:
+        mask = self.mask(**filters)
+        codes, labels = self._group_codes(by)
+        unique, counts = np.unique(codes[mask], return_counts=True)
+        return {labels[int(code)]: int(count) for code, count in zip(unique, counts)}
+
+    def rows(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        self._flush()
+        cols = self.columns
+        indices = np.flatnonzero(mask) if mask is not None else range(len(cols['kind']))
+        return [{
+            "case": self.cases.values[cols['case'][i]],
+            "source": self.sources.values[cols['source'][i]],
+            "category": self.categories.values[cols['category'][i]],
+            "kind": FACT_KINDS[cols['kind'][i]],
+            "raw": self.values.values[cols['value'][i]],
+            "cents": int(cols['cents'][i]),
+            "date": None if np.isnat(cols['date'][i]) else str(cols['date'][i]),
+            "offset": int(cols['offset'][i]),
+            "page": int(cols['page'][i]) or None,
+        } for i in indices]
+
+    def save(self, path: str):
+        self._flush()
+        status_codes = np.array(sorted(self.case_status), dtype=np.int32)
+        np.savez_compressed(
+            path,
+            **{f"col_{name}": values for name, values in self.columns.items()},
+            cases=np.array(self.cases.values, dtype=str),
+            sources=np.array(self.sources.values, dtype=str),
+            categories=np.array(self.categories.values, dtype=str),
+            values=np.array(self.values.values, dtype=str),
+            status_codes=status_codes,
+            status_values=np.array([self.case_status[int(c)] for c in status_codes], dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CaseFactsStore":
+        store = cls()
+        with np.load(path, allow_pickle=False) as data:
+            for name, dtype in cls.COLUMNS.items():
+                store.columns[name] = data[f"col_{name}"].astype(dtype, copy=False)
+            store.cases = _Interner(data['cases'].tolist())
+            store.sources = _Interner(data['sources'].tolist())
+            store.categories = _Interner(data['categories'].tolist())
+            store.values = _Interner(data['values'].tolist())
+            store.case_status = dict(zip(data['status_codes'].tolist(), data['status_values'].tolist()))
+        return store
@@ -0,0 +1,236 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from .case_facts import DATE_PATTERN, parse_amount_cents, parse_date
+from .damages import DamageLedger, amount_mentions, damage_category
+from .discrepancies import AmountIndex
+from .entity_graph import EntityGraph
+from .incremental import CaseAggregates
+from .page_index import PageIndex
+from .timeline import CaseTimeline
+
+
+class DocumentFeatures:
+    def __init__(self, file_result: Dict[str, Any], keywords: Iterable[str]):
+        self.filename = file_result.get('filename', 'Unknown')
+        self.key = file_result.get('relative_path') or self.filename
+        self.seq = 0  # Position in the case, assigned by CaseFeatures
+        self.filename_lower = (file_result.get('filename') or '').lower()
+        self.success = bool(file_result.get('success'))
+        self.file_type = file_result.get('file_type', 'unknown')
+        self.has_classification = 'classification' in file_result
+        self.classification = file_result.get('classification', {}).get('primary_type', 'general')
+        self.page_index = PageIndex.from_result(file_result)
+
+        self.text = file_result.get('text', '') or ''
+        self.text_lower = self.text.lower()
+        self.tokens: Set[str] = set(self.text_lower.split())
+        # Substring counts, matching the `keyword in text` checks the tools used to do
+        self.keyword_hits = {keyword: self.text_lower.count(keyword) for keyword in keywords}
+
+        key_info = file_result.get('key_info', {}) if self.success else {}
+        self.has_key_info = 'key_info' in file_result
+        self.raw_amounts: List[str] = list(key_info.get('amounts', []))
+        self.amount_cents = np.array([parse_amount_cents(a) for a in self.raw_amounts], dtype=np.int64)
+        self.raw_dates: List[str] = list(key_info.get('dates', []))
+        self.dates = np.array([parse_date(d) for d in self.raw_dates], dtype='datetime64[D]')
+        self._text_dates: Optional[np.ndarray] = None
+        self._amount_mentions: Optional[List[Tuple[str, int, str, int]]] = None
+
+    @property
+    def text_dates(self) -> np.ndarray:
+        # Every parseable date in the text, not just the ten kept in key_info
+        if self._text_dates is None:
+            parsed = (parse_date(match.group(0)) for match in DATE_PATTERN.finditer(self.text))
+            self._text_dates = np.array([d for d in parsed if not np.isnat(d)], dtype='datetime64[D]')
+        return self._text_dates
+
+    @property
+    def damage_category(self) -> str:
+        return damage_category(self.classification, self.filename)
+
+    @property
+    def amount_mentions(self) -> List[Tuple[str, int, str, int]]:
+        # Every amount in the text, labelled, for discrepancy checks and damages (key_info's
+        # capped list when there is no text)
+        if self._amount_mentions is None:
+            self._amount_mentions = amount_mentions(self.key, self.text, self.raw_amounts)
+        return self._amount_mentions
+
+    def has_any(self, keywords: Iterable[str]) -> bool:
+        return any(self.keyword_hits.get(keyword, 0) > 0 for keyword in keywords)
+
+
+class CaseFeatures:
+    # Everything the Sherlock tools need from a case, computed in one pass over the corpus and
+    # then kept current one document at a time
+    def __init__(self, case_data: Dict[str, Any], keyword_groups: Optional[Dict[str, List[str]]] = None,
+                 evidence_tags: Optional[Dict[str, List[str]]] = None):
+        self.case_data = case_data
+        self.keyword_groups = keyword_groups or {}
+        self.keywords = sorted({keyword for group in self.keyword_groups.values() for keyword in group})
+
+        self.documents: List[DocumentFeatures] = []
+        self.successful: List[DocumentFeatures] = []
+        self.by_key: Dict[str, DocumentFeatures] = {}
+        self.aggregates = CaseAggregates(self.keyword_groups, evidence_tags)
+        self._next_seq = 0
+        self._timeline: Optional[CaseTimeline] = None
+        self._damage_ledger: Optional[DamageLedger] = None
+        self._amount_index: Optional[AmountIndex] = None
+        self._entity_graph: Optional[EntityGraph] = None
+        for file_result in case_data.get('files_processed', []):
+            self.add_document(file_result)
+
+    def is_for(self, case_data: Dict[str, Any]) -> bool:
+        return self.case_data is case_data
+
+    @property
+    def document_types(self) -> Set[str]:
+        return self.aggregates.document_types
+
+    def add_document(self, file_result: Dict[str, Any]) -> Set[str]:
+        # Returns the names of the aggregates the new document changed
+        doc = DocumentFeatures(file_result, self.keywords)
+        doc.seq = self._next_seq
+        self._next_seq += 1
+        self.documents.append(doc)
+        self.by_key[doc.key] = doc
+        changes = self.aggregates.add(doc)
+        if doc.success:
+            self.successful.append(doc)
+            if self._timeline is not None:
+                self._add_to_timeline(doc)
+            if self._damage_ledger is not None:
+                self._add_to_ledger(doc)
+            if self._amount_index is not None:
+                self._amount_index.add_document(doc.key, doc.text, doc.amount_mentions)
+            if self._entity_graph is not None and self._entity_graph.add_document(doc.key, doc.text, doc.page_index):
+                changes.add("entities")
+        return changes
+
+    def remove_document(self, key: str) -> Set[str]:
+        doc = self.by_key.pop(key, None)
+        if doc is None:
+            return set()
+        self.documents.remove(doc)
+        if doc.success:
+            self.successful.remove(doc)
+            # Timeline, ledger and amount rows are keyed by relative path, so a same-named file
+            # in another folder keeps its own rows
+            if self._timeline is not None:
+                self._timeline.remove_document(doc.key)
+            if self._damage_ledger is not None:
+                self._damage_ledger.remove_document(doc.key)
+            if self._amount_index is not None:
+                self._amount_index.remove_document(doc.key)
+        changes = self.aggregates.remove(doc)
+        if doc.success and self._entity_graph is not None and self._entity_graph.remove_document(doc.key):
+            changes.add("entities")
+        return changes
+
+    def documents_matching(self, keywords: Iterable[str]) -> List[DocumentFeatures]:
+        keywords = list(keywords)
+        return [doc for doc in self.successful if doc.has_any(keywords)]
+
+    def has_successful_type(self, primary_type: str) -> bool:
+        return any(doc.classification == primary_type for doc in self.successful)
+
+    def _add_to_timeline(self, doc: DocumentFeatures):
+        if doc.has_key_info:
+            self._timeline.add_document(doc.key, doc.raw_dates, doc.classification, parsed=doc.dates)
+
+    def _add_to_ledger(self, doc: DocumentFeatures):
+        self._damage_ledger.add_document(doc.key, doc.text, doc.damage_category, doc.raw_amounts,
+                                         mentions=doc.amount_mentions)
+
+    @property
+    def timeline(self) -> CaseTimeline:
+        # Built on first use from the dates already parsed for each document
+        if self._timeline is None:
+            self._timeline = CaseTimeline()
+            for doc in self.successful:
+                self._add_to_timeline(doc)
+        return self._timeline
+
+    @property
+    def damage_ledger(self) -> DamageLedger:
+        # Every amount of every successful document; the ledger leaves out derived lines
+        if self._damage_ledger is None:
+            self._damage_ledger = DamageLedger()
+            for doc in self.successful:
+                self._add_to_ledger(doc)
+        return self._damage_ledger
+
+    @property
+    def amount_index(self) -> AmountIndex:
+        # Amount mentions labelled offer/lien/bill/limit/... for near-match discrepancy checks
+        if self._amount_index is None:
+            self._amount_index = AmountIndex()
+            for doc in self.successful:
+                self._amount_index.add_document(doc.key, doc.text, doc.amount_mentions)
+        return self._amount_index
+
+    @property
+    def entity_graph(self) -> EntityGraph:
+        # Insurers, claim numbers, adjusters, providers and parties linked by co-occurrence
+        if self._entity_graph is None:
+            self._entity_graph = EntityGraph()
+            for doc in self.successful:
+                self._entity_graph.add_document(doc.key, doc.text, doc.page_index)
+        return self._entity_graph
+
+    def amounts(self) -> List[Tuple[DocumentFeatures, str, int]]:
+        return [(doc, raw, int(cents)) for doc in self.successful if doc.has_key_info
+                for raw, cents in zip(doc.raw_amounts, doc.amount_cents)]
+
+
+if __name__ == "__main__":
+    # Benchmark: one shared pass vs. the per-tool rescans full analysis used to do
+    print("=" * 80)
+    print("CASE FEATURES BENCHMARK")
+    print("=" * 80)
+
+    results_path = Path(__file__).parent.parent / "data" / "out" / "docu_agent_test_results.json"
+    with open(results_path) as f:
+        all_results = json.load(f)
+
+    files = [file_result for case in all_results.values() for file_result in case['files_processed']]
+    case_data = {"case_name": "benchmark", "files_processed": files * 25, "summary": {"successful": len(files) * 25}}
+    keyword_groups = {
+        "liability_clear": ['at fault', 'negligent', 'violated', 'failed to', 'breach'],
+        "liability_disputed": ['dispute', 'deny', 'contest', 'disagree'],
+        "negligence": ["negligent", "duty", "breach", "reasonable care"],
+        "causation": ["caused by", "resulted from", "due to"],
+        "damages": ["injury", "harm", "loss", "suffering"],
+    }
+    size_mb = sum(len(fr.get('text', '')) for fr in case_data['files_processed']) / 1_000_000
+    print(f"\nCorpus: {len(case_data['files_processed'])} documents, {size_mb:.1f} MB of text")
+
+    def per_tool_rescans():
+        # What timeline, inconsistencies, evidence, damages, liability, legal issues,
+        # strategy and cross-reference each did independently
+        for _ in range(8):
+            for file_result in case_data['files_processed']:
+                text = file_result.get('text', '').lower()
+                for group in keyword_groups.values():
+                    any(keyword in text for keyword in group)
+                for amount in file_result.get('key_info', {}).get('amounts', []):
+                    float(amount.replace('$', '').replace(',', ''))
+
+    start = time.perf_counter()
+    per_tool_rescans()
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features = CaseFeatures(case_data, keyword_groups)
+    for group in keyword_groups.values():
+        features.documents_matching(group)
+    features.amounts()
+    shared = time.perf_counter() - start
+
+    print(f"Per-tool rescans (8 passes): {legacy * 1000:.1f} ms")
+    print(f"Shared CaseFeatures (1 pass): {shared * 1000:.1f} ms")
+    print(f"Speedup: {legacy / shared:.1f}x")
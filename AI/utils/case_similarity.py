@@ -0,0 +1,304 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+
+INJURY_TERMS = [
+    "fracture", "whiplash", "concussion", "herniat", "laceration", "sprain", "strain", "contusion",
+    "tbi", "spinal", "radiculopathy", "torn", "dislocat", "burn", "scar", "amputat"
+]
+TREATMENT_TERMS = [
+    "physical therapy", "chiropract", "mri", "x-ray", "ct scan", "injection", "surgery", "emergency",
+    "ambulance", "orthopedic", "neurolog", "pain management", "prescription", "follow-up"
+]
+INSURERS = [
+    "geico", "progressive", "state farm", "allstate", "usaa", "liberty mutual", "farmers", "nationwide",
+    "travelers", "american family", "erie", "hartford", "safeco", "esurance", "medicare", "medicaid"
+]
+DOCUMENT_TYPES = ["medical", "police_report", "insurance", "financial", "legal", "correspondence", "evidence", "general"]
+CASE_TYPES = ["personal_injury", "property_damage", "premises_liability", "product_liability"]
+DAMAGE_BLOCK = ["medical_expenses", "property_damage", "lost_wages", "other_expenses"]
+LIABILITY_BLOCK = ["clear_fault", "disputed"]
+
+# Relative weight of each block in the cosine similarity
+BLOCK_WEIGHTS = {
+    "case_type": 1.0,
+    "injury": 1.5,
+    "treatment": 1.0,
+    "insurer": 0.75,
+    "documents": 0.5,
+    "damages": 1.5,
+    "liability": 1.0
+}
+BLOCKS = [
+    ("case_type", len(CASE_TYPES)),
+    ("injury", len(INJURY_TERMS)),
+    ("treatment", len(TREATMENT_TERMS)),
+    ("insurer", len(INSURERS)),
+    ("documents", len(DOCUMENT_TYPES)),
+    ("damages", len(DAMAGE_BLOCK) + 1),
+    ("liability", len(LIABILITY_BLOCK))
+]
+VECTOR_DIM = sum(size for _, size in BLOCKS)
+IVF_MIN_SIZE = 100_000      # below this a brute-force matrix product is already sub-millisecond territory
+DEFAULT_NPROBE = 8
+INDEX_VERSION = 1
+
+
+def _term_counts(texts: Sequence[str], terms: Sequence[str]) -> np.ndarray:
+    # Number of documents mentioning each term
+    return np.array([sum(1 for text in texts if term in text) for term in terms], dtype=np.float32)
+
+
+def _unit(block: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(block))
+    return block / norm if norm else block
+
+
+def embed_case(features, case_type: str = "personal_injury") -> np.ndarray:
+    # Fixed-length profile of a case from its CaseFeatures; each block is normalised and weighted
+    # so that no single block (e.g. a long bill history) dominates the similarity
+    texts = [doc.text_lower for doc in features.successful]
+    aggregates = features.aggregates
+    totals = np.array([aggregates.damage_totals.get(name, 0) for name in DAMAGE_BLOCK], dtype=np.float64) / 100
+    documents = max(len(features.successful), 1)
+
+    blocks = {
+        "case_type": np.array([1.0 if case_type == name else 0.0 for name in CASE_TYPES], dtype=np.float32),
+        "injury": np.log1p(_term_counts(texts, INJURY_TERMS)),
+        "treatment": np.log1p(_term_counts(texts, TREATMENT_TERMS)),
+        "insurer": np.minimum(_term_counts(texts, INSURERS), 1.0),
+        "documents": np.array([aggregates.type_counts.get(name, 0) for name in DOCUMENT_TYPES], dtype=np.float32),
+        # Shape (category mix) plus overall size on a log scale
+        "damages": np.r_[_unit(totals), np.log1p(totals.sum()) / np.log1p(1e7)].astype(np.float32),
+        "liability": np.array([len(aggregates.documents_in_group(group)) / documents
+                               for group in LIABILITY_BLOCK], dtype=np.float32)
+    }
+    vector = np.concatenate([_unit(blocks[name].astype(np.float32)) * BLOCK_WEIGHTS[name] for name, _ in BLOCKS])
+    return _unit(vector).astype(np.float32)
+
+
+class CaseVectorIndex:
+    # Unit vectors in one float32 matrix (cosine = dot product). Small sets are searched with a
+    # single matrix product; large ones through an inverted file of spherical k-means lists.
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.alive = np.empty(0, dtype=bool)
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+        self._size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists: Optional[List[np.ndarray]] = None
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed > len(self.vectors):
+            capacity = max(needed, 2 * len(self.vectors), 1024)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self.vectors[:self._size]
+            self.vectors = grown
+            self.alive = np.r_[self.alive, np.zeros(capacity - len(self.alive), dtype=bool)]
+            self.assignments = np.r_[self.assignments, np.full(capacity - len(self.assignments), -1, dtype=np.int32)]
+
+    def add(self, case_id: str, vector: np.ndarray, metadata: Optional[Dict[str, Any]] = None):
+        self.add_many([case_id], np.asarray(vector, dtype=np.float32)[None, :], [metadata or {}])
+
+    def add_many(self, case_ids: Sequence[str], vectors: np.ndarray, metadata: Optional[Sequence[Dict[str, Any]]] = None):
+        # Re-adding an id replaces its vector; new rows join the nearest IVF list without retraining
+        vectors = np.asarray(vectors, dtype=np.float32)
+        metadata = list(metadata) if metadata is not None else [{} for _ in case_ids]
+        for case_id in case_ids:
+            self.remove(case_id)
+        self._reserve(len(case_ids))
+        rows = np.arange(self._size, self._size + len(case_ids))
+        self.vectors[rows] = vectors
+        self.alive[rows] = True
+        for row, case_id, meta in zip(rows, case_ids, metadata):
+            self.positions[case_id] = int(row)
+            self.ids.append(case_id)
+            self.metadata.append(meta)
+        self._size += len(case_ids)
+
+        if self.centroids is not None:
+            self.assignments[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+            self._lists = None
+            if len(self) > 2 * self._trained_size:
+                self.train()
+        elif len(self) >= IVF_MIN_SIZE:
+            self.train()
+
+    def remove(self, case_id: str) -> bool:
+        row = self.positions.pop(case_id, None)
+        if row is None:
+            return False
+        self.alive[row] = False
+        return True
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, sample: int = 50_000, seed: int = 0):
+        # Spherical k-means on a sample, then every live row is assigned to its closest centroid
+        rows = np.flatnonzero(self.alive[:self._size])
+        nlist = nlist or max(1, int(4 * np.sqrt(len(rows))))
+        rng = np.random.default_rng(seed)
+        training = self.vectors[rng.choice(rows, size=min(sample, len(rows)), replace=False)]
+        centroids = training[rng.choice(len(training), size=min(nlist, len(training)), replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(training @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, training)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        self.centroids = centroids
+        assignments = np.full(len(self.assignments), -1, dtype=np.int32)
+        for start in range(0, len(rows), 65_536):
+            chunk = rows[start:start + 65_536]
+            assignments[chunk] = np.argmax(self.vectors[chunk] @ centroids.T, axis=1)
+        self.assignments = assignments
+        self._lists = None
+        self._trained_size = len(rows)
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            rows = np.flatnonzero(self.assignments[:self._size] >= 0)
+            order = rows[np.argsort(self.assignments[rows], kind='stable')]
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, vector: np.ndarray, k: int = 5, nprobe: int = DEFAULT_NPROBE,
+               exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = np.asarray(vector, dtype=np.float32)
+        if self.centroids is None or len(self) < IVF_MIN_SIZE:
+            candidates = np.flatnonzero(self.alive[:self._size])
+        else:
+            probes = np.argsort(-(self.centroids @ query))[:nprobe]
+            lists = self._inverted_lists()
+            candidates = np.concatenate([lists[p] for p in probes])
+            candidates = candidates[self.alive[candidates]]
+        if exclude is not None and exclude in self.positions:
+            candidates = candidates[candidates != self.positions[exclude]]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.vectors[candidates] @ query
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [{
+            "case_id": self.ids[candidates[i]],
+            "similarity": round(float(scores[i]), 4),
+            **self.metadata[candidates[i]]
+        } for i in top]
+
+    def save(self, path: str):
+        # Compacted to live rows; ids and metadata ride along as JSON
+        rows = np.flatnonzero(self.alive[:self._size])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = {
+            "version": INDEX_VERSION,
+            "dim": self.dim,
+            "ids": [self.ids[row] for row in rows],
+            "metadata": [self.metadata[row] for row in rows],
+            "trained_size": self._trained_size
+        }
+        arrays = {"vectors": self.vectors[rows], "header": np.array(json.dumps(header))}
+        if self.centroids is not None:
+            arrays["centroids"] = self.centroids
+            arrays["assignments"] = self.assignments[rows]
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CaseVectorIndex"]:
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != INDEX_VERSION:
+                return None
+            index = cls(header["dim"])
+            vectors = data["vectors"]
+            index._reserve(len(vectors))
+            index.vectors[:len(vectors)] = vectors
+            index.alive[:len(vectors)] = True
+            index._size = len(vectors)
+            index.ids = header["ids"]
+            index.metadata = header["metadata"]
+            index.positions = {case_id: row for row, case_id in enumerate(index.ids)}
+            if "centroids" in data:
+                index.centroids = data["centroids"]
+                index.assignments[:len(vectors)] = data["assignments"]
+                index._trained_size = header["trained_size"]
+        return index
+
+
+def outcome_summary(neighbors: List[Dict[str, Any]], economic_damages: float) -> Dict[str, Any]:
+    # Settlement anchors from neighbours with a recorded outcome, weighted by similarity
+    settled = [n for n in neighbors if n.get("settlement") is not None]
+    if not settled:
+        return {"comparables": 0}
+    amounts = np.array([n["settlement"] for n in settled], dtype=np.float64)
+    weights = np.array([max(n["similarity"], 0.0) for n in settled], dtype=np.float64) + 1e-9
+    ratios = np.array([n["settlement"] / n["economic_damages"] for n in settled if n.get("economic_damages")])
+    summary = {
+        "comparables": len(settled),
+        "settlement_low": round(float(amounts.min()), 2),
+        "settlement_median": round(float(np.median(amounts)), 2),
+        "settlement_high": round(float(amounts.max()), 2),
+        "weighted_settlement": round(float(np.average(amounts, weights=weights)), 2)
+    }
+    if len(ratios):
+        ratio = float(np.median(ratios))
+        summary["median_settlement_to_damages"] = round(ratio, 2)
+        summary["anchored_estimate"] = round(ratio * economic_damages, 2)
+    return summary
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("CASE SIMILARITY INDEX BENCHMARK")
+    print("=" * 80)
+
+    rng = np.random.default_rng(1)
+    archetypes = rng.normal(size=(200, VECTOR_DIM)).astype(np.float32)
+    for count in (5_000, 200_000):
+        # Historical cases cluster around a few hundred archetypes (soft-tissue rear-end, slip and fall, ...)
+        vectors = archetypes[rng.integers(0, len(archetypes), size=count)] + 0.6 * rng.normal(size=(count, VECTOR_DIM))
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+        ids = [f"case_{i}" for i in range(count)]
+        metadata = [{"settlement": float(s)} for s in rng.uniform(5_000, 250_000, size=count)]
+
+        start = time.perf_counter()
+        index = CaseVectorIndex()
+        index.add_many(ids, vectors, metadata)
+        built = time.perf_counter() - start
+
+        queries = vectors[rng.integers(0, count, size=100)] + 0.05 * rng.normal(size=(100, VECTOR_DIM)).astype(np.float32)
+        start = time.perf_counter()
+        results = [index.search(q, k=10) for q in queries]
+        latency = (time.perf_counter() - start) / len(queries)
+
+        exact = [set(np.argsort(-(vectors @ q))[:10]) for q in queries]
+        recall = np.mean([len({index.positions[r["case_id"]] for r in res} & truth) / 10
+                          for res, truth in zip(results, exact)])
+        mode = "IVF" if index.centroids is not None else "brute force"
+        print(f"\n{count:>7,} cases ({mode}): built in {built * 1000:.0f} ms, "
+              f"query {latency * 1000:.2f} ms, recall@10 {recall:.2f}")
+
+    path = str(Path("/tmp") / "case_index_benchmark.npz")
+    start = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    reloaded = CaseVectorIndex.load(path)
+    loaded = time.perf_counter() - start
+    same = reloaded.search(queries[0], k=10) == index.search(queries[0], k=10)
+    print(f"\nSave {saved * 1000:.0f} ms, load {loaded * 1000:.0f} ms, identical results after reload: {same}")
+    os.remove(path)
@@ -0,0 +1,216 @@
+import heapq
+import re
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+URGENT_TERMS = ['urgent', 'emergency', 'asap', 'immediately', 'critical', 'now']
+HIGH_TERMS = ['soon', 'sooner', 'quickly', 'important', 'concerned', 'worried']
+ACTION_TERMS = ['need to', 'should', 'must', 'will', 'going to', 'plan to']
+# A client talking about leaving the firm or complaining about it is urgent whatever else is said.
+# Not "other lawyer": that is usually opposing counsel.
+ESCALATION_TERMS = ['another lawyer', 'another attorney', 'new lawyer', 'new attorney', 'different lawyer',
+                    'different attorney', 'fire my lawyer', 'fire my attorney', 'bar complaint', 'file a complaint']
+KEYWORD_STOPWORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'was', 'are', 'be'}
+MIN_KEYWORD_LENGTH = 4
+URGENCY_LEVELS = ["normal", "high", "urgent"]
+
+TERM_KINDS = {**{term: "action" for term in ACTION_TERMS},
+              **{term: "high" for term in HIGH_TERMS},
+              **{term: "urgent" for term in URGENT_TERMS},
+              **{term: "escalation" for term in ESCALATION_TERMS}}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class TermMatcher:
+    # Whole-word matcher for a fixed set of lowercase terms: "now" does not fire inside "know",
+    # "should" inside "shoulder" or "will" inside "willing". Each term is located with str.find
+    # and only those hits pay for a boundary check. On an hour-long transcript that is about twice
+    # as fast as a \b-bounded regex alternation (20-40 MB/s here), though far from memory speed:
+    # the Python loop over terms and hits costs more than the scans themselves.
+    def __init__(self, terms: List[str]):
+        self.terms = sorted(set(terms), key=len, reverse=True)
+        # Terms grouped under their longest word: when "lawyer" is absent, no "... lawyer" term is searched
+        self.groups: Dict[str, List[str]] = {}
+        for term in self.terms:
+            self.groups.setdefault(max(term.split(), key=len), []).append(term)
+
+    def find_all(self, lower: str) -> List[Tuple[int, str]]:
+        # (offset, term) for every whole-word occurrence, in text order
+        hits = []
+        length = len(lower)
+        for anchor, terms in self.groups.items():
+            if terms != [anchor] and anchor not in lower:
+                continue
+            for term in terms:
+                size = len(term)
+                i = lower.find(term)
+                while i != -1:
+                    if (i == 0 or not _is_word_char(lower[i - 1])) and \
+                            (i + size == length or not _is_word_char(lower[i + size])):
+                        hits.append((i, term))
+                    i = lower.find(term, i + size)
+        hits.sort()
+        return hits
+
+
+TERM_MATCHER = TermMatcher(list(TERM_KINDS))
+
+
+def urgency_level(terms) -> str:
+    kinds = {TERM_KINDS[term] for term in terms}
+    if "urgent" in kinds or "escalation" in kinds:
+        return "urgent"
+    if "high" in kinds:
+        return "high"
+    return "normal"
+
+
+def top_keywords(counts: Counter, limit: int = 10) -> List[str]:
+    # `counts` holds whitespace tokens of the lowercased text; ties keep first-seen order
+    candidates = ((word, count) for word, count in counts.items()
+                  if len(word) >= MIN_KEYWORD_LENGTH and word not in KEYWORD_STOPWORDS)
+    return [word for word, _ in heapq.nlargest(limit, candidates, key=lambda item: item[1])]
+
+
+def _line_starts(lines: List[str]) -> List[int]:
+    return list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+
+
+def analyze_text(text: str, keyword_limit: int = 10, first_line: int = 0, first_char: int = 0) -> Dict[str, Any]:
+    # Urgency, action items, question lines and keywords from one lowercasing, one term scan and
+    # one token count. Lines are numbered from `first_line` and offsets counted from `first_char`,
+    # so a caller feeding a transcript in pieces can report positions in the whole transcript.
+    lower = text.lower()
+    lines = text.split('\n')
+    starts = _line_starts(lines)
+    # A few characters lowercase to two; line numbers still agree, offsets need their own table
+    lower_starts = starts if len(lower) == len(text) else _line_starts(lower.split('\n'))
+
+    counts = Counter(lower.split())
+    urgency_terms: Dict[str, None] = {}
+    line_actions: Dict[int, Dict[str, None]] = {}
+    for offset, term in TERM_MATCHER.find_all(lower):
+        if TERM_KINDS[term] == "action":
+            line_actions.setdefault(bisect_right(lower_starts, offset) - 1, {})[term] = None
+        else:
+            urgency_terms[term] = None
+
+    return {
+        "urgency_level": urgency_level(urgency_terms),
+        "urgency_terms": list(urgency_terms),
+        "escalation_terms": [term for term in urgency_terms if TERM_KINDS[term] == "escalation"],
+        "action_items": [{
+            "line": first_line + i,
+            "start_char": first_char + starts[i],
+            "text": lines[i].strip(),
+            "terms": list(terms)
+        } for i, terms in sorted(line_actions.items())],
+        "questions": [{
+            "line": first_line + i,
+            "start_char": first_char + starts[i],
+            "text": line
+        } for i, line in enumerate(lines) if '?' in line],
+        "keywords": top_keywords(counts, keyword_limit),
+        "word_count": sum(counts.values())
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import os
+    import time
+
+    print("=" * 80)
+    print("COMMUNICATION TEXT ANALYZER BENCHMARK")
+    print("=" * 80)
+
+    # The previous per-feature scans from ClientCommunicationAgent, for comparison
+    def legacy_urgency(message):
+        message_lower = message.lower()
+        if any(keyword in message_lower for keyword in URGENT_TERMS):
+            return "urgent"
+        elif any(keyword in message_lower for keyword in ['soon', 'quickly', 'important', 'concerned', 'worried']):
+            return "high"
+        return "normal"
+
+    def legacy_analysis(transcript):
+        return {
+            "urgency_level": legacy_urgency(transcript),
+            "action_items": [line.strip() for line in transcript.split('\n')
+                             if any(keyword in line.lower() for keyword in ACTION_TERMS)],
+            "questions": [line for line in transcript.split('\n') if '?' in line],
+            "keywords": [word for word, count in Counter(
+                word for word in transcript.lower().split()
+                if len(word) > 3 and word not in KEYWORD_STOPWORDS).most_common(10)]
+        }
+
+    def current_analysis(transcript):
+        result = analyze_text(transcript)
+        return {
+            "urgency_level": result['urgency_level'],
+            "action_items": [item['text'] for item in result['action_items']],
+            "questions": [question['text'] for question in result['questions']],
+            "keywords": result['keywords']
+        }
+
+    results_path = os.path.join(os.path.dirname(__file__), "..", "data", "out", "docu_agent_test_results.json")
+    with open(results_path, 'r') as f:
+        processed = json.load(f)
+    transcripts = {entry['filename']: entry['text'] for case in processed.values()
+                   for entry in case.get('files_processed', []) if entry.get('audio_path') and entry.get('text')}
+
+    print(f"\n{len(transcripts)} transcribed calls from the sample cases")
+    for name, transcript in transcripts.items():
+        old, new = legacy_analysis(transcript), current_analysis(transcript)
+        changed = [key for key in old if old[key] != new[key]]
+        note = "identical" if not changed else ", ".join(f"{key}: {old[key]!r} -> {new[key]!r}"
+                                                         if key == "urgency_level" else
+                                                         f"{key}: {len(old[key])} -> {len(new[key])}"
+                                                         for key in changed)
+        print(f"  {name:<34} {note}")
+
+    # An hour-long call: ~9,000 words, one utterance per line as a diarized transcript would have
+    sentences = [sentence.strip() for transcript in transcripts.values()
+                 for sentence in re.split(r"(?<=[a-z]) (?=(?:hi|so|oh|okay|well|and|but|I|we|they) )", transcript)]
+    lines, words = [], 0
+    while words < 9000:
+        sentence = sentences[len(lines) % len(sentences)]
+        lines.append(sentence + ("?" if len(lines) % 7 == 0 else ""))
+        words += len(sentence.split())
+    hour_call = "\n".join(lines)
+
+    rounds = 20
+    start = time.perf_counter()
+    for _ in range(rounds):
+        old = legacy_analysis(hour_call)
+    legacy = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = analyze_text(hour_call)
+    current = (time.perf_counter() - start) / rounds
+    megabytes = len(hour_call.encode("utf-8")) / 1e6
+    print(f"\nHour-long transcript ({len(lines):,} lines, {len(hour_call):,} characters)")
+    print(f"Separate scans: {legacy * 1000:.1f} ms")
+    print(f"Combined pass:  {current * 1000:.1f} ms ({megabytes / current:.0f} MB/s)")
+
+    lower = hour_call.lower()
+    alternation = re.compile(r"\b(?:%s)\b" % "|".join(re.escape(term) for term in TERM_MATCHER.terms))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        hits = TERM_MATCHER.find_all(lower)
+    matcher = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        regex_hits = [(match.start(), match.group()) for match in alternation.finditer(lower)]
+    regex = (time.perf_counter() - start) / rounds
+    print(f"Term matching:  {matcher * 1000:.1f} ms ({megabytes / matcher:.0f} MB/s), "
+          f"regex alternation {regex * 1000:.1f} ms ({megabytes / regex:.0f} MB/s), "
+          f"{'same' if hits == regex_hits else 'different'} hits")
+    print(f"Found {len(result['action_items'])} action items ({len(old['action_items'])} with substring matching), "
+          f"{len(result['questions'])} questions, "
+          f"urgency {result['urgency_level']} ({', '.join(result['urgency_terms']) or 'no terms'})")
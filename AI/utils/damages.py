@@ -0,0 +1,241 @@
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .case_facts import AMOUNT_PATTERN, _Interner, parse_amount_cents
+
+DAMAGE_CATEGORIES = ["medical_expenses", "property_damage", "lost_wages", "other_expenses"]
+CATEGORY_CODES = {category: code for code, category in enumerate(DAMAGE_CATEGORIES)}
+
+CONTEXT_CHARS = 40
+CONTEXT_WORDS = 3
+CONTEXT_WORD_PATTERN = re.compile(r'[a-z]+')
+# Context labels of lines restating or deriving from other amounts on the same document:
+# subtotals, tax lines and the steps of a vehicle valuation (list price, mileage and condition
+# adjustments, base/adjusted value, value before deductible, the deductible itself). The
+# valuation's final "Total" line is kept.
+DERIVED_LINE_PATTERN = re.compile(
+    r'\b(?:subtotal|taxable|tax|valuation|value|list price|adjustments?|options|mileage|condition|'
+    r'threshold|net loss)\b|\bdeductible$')
+
+
+def damage_category(document_type: str, source: str) -> str:
+    source = source.lower()
+    if document_type == 'medical':
+        return "medical_expenses"
+    if 'property' in document_type or 'damage' in source:
+        return "property_damage"
+    if 'wage' in source or 'pay' in source:
+        return "lost_wages"
+    return "other_expenses"
+
+
+def context_label(text: str, offset: int) -> str:
+    # Last few words before an amount ("total due", "balance forward"); the same bill quoted in
+    # several documents usually carries the same label
+    words = CONTEXT_WORD_PATTERN.findall(text[max(0, offset - CONTEXT_CHARS):offset].lower())
+    return " ".join(words[-CONTEXT_WORDS:])
+
+
+@lru_cache(maxsize=65536)  # Labels repeat across a bill's lines
+def is_derived_line(label: str) -> bool:
+    return DERIVED_LINE_PATTERN.search(label) is not None
+
+
+def damage_lines(mentions: List[Tuple[str, int, str, int]]) -> List[Tuple[str, int, str, int]]:
+    # The amount mentions that count towards damages
+    return [mention for mention in mentions if not is_derived_line(mention[2])]
+
+
+def amount_mentions(source: str, text: Optional[str], amounts: Optional[List[str]] = None) -> List[Tuple[str, int, str, int]]:
+    # (raw, cents, context, offset) for every amount in the full text; `amounts` (e.g. capped
+    # key_info) is the fallback, with offset -1. Unlabelled amounts get a per-document context
+    # so they only merge locally.
+    if text:
+        mentions = [(match.group(0), context_label(text, match.start()), match.start())
+                    for match in AMOUNT_PATTERN.finditer(text)]
+    else:
+        mentions = [(raw, "", -1) for raw in amounts or []]
+    return [(raw, parse_amount_cents(raw), label or f"@{source}", offset) for raw, label, offset in mentions]
+
+
+class DamageLedger:
+    # Every dollar amount in the case as int64 cents, one row per mention
+    def __init__(self):
+        self.sources = _Interner()
+        self.contexts = _Interner()
+        self.cents = np.empty(0, dtype=np.int64)
+        self.category = np.empty(0, dtype=np.int8)
+        self.source = np.empty(0, dtype=np.int32)
+        self.context = np.empty(0, dtype=np.int32)
+        self.raw: List[str] = []
+        self._pending: List[tuple] = []
+        self._unique: Optional[np.ndarray] = None
+        self.derived_lines: Dict[int, int] = {}  # Source code -> derived lines left out
+
+    def __len__(self):
+        return len(self.raw)
+
+    def add_document(self, source: str, text: Optional[str], category: str,
+                     amounts: Optional[List[str]] = None, mentions: Optional[List[Tuple[str, int, str, int]]] = None):
+        source_code = self.sources.intern(source)
+        category_code = CATEGORY_CODES[category]
+        if mentions is None:
+            mentions = amount_mentions(source, text, amounts)
+        lines = damage_lines(mentions)
+        if len(lines) < len(mentions):
+            self.derived_lines[source_code] = self.derived_lines.get(source_code, 0) + len(mentions) - len(lines)
+
+        for raw, cents, label, _ in lines:
+            self._pending.append((cents, category_code, source_code, self.contexts.intern(label)))
+            self.raw.append(raw)
+        if lines:
+            self._unique = None
+
+    def remove_document(self, source: str):
+        source_code = self.sources.lookup(source)
+        if source_code < 0:
+            return
+        self.derived_lines.pop(source_code, None)
+        self._flush()
+        keep = self.source != source_code
+        if keep.all():
+            return
+        self.cents, self.category = self.cents[keep], self.category[keep]
+        self.source, self.context = self.source[keep], self.context[keep]
+        self.raw = [raw for raw, kept in zip(self.raw, keep) if kept]
+        self._unique = None
+
+    def _flush(self):
+        if self._pending:
+            cents, category, source, context = zip(*self._pending)
+            self.cents = np.concatenate([self.cents, np.array(cents, dtype=np.int64)])
+            self.category = np.concatenate([self.category, np.array(category, dtype=np.int8)])
+            self.source = np.concatenate([self.source, np.array(source, dtype=np.int32)])
+            self.context = np.concatenate([self.context, np.array(context, dtype=np.int32)])
+            self._pending = []
+
+    def unique_rows(self) -> np.ndarray:
+        # Rows left after cross-document de-duplication, in document order. Mentions sharing a
+        # (value, context) key are the same bill; per key only the document quoting it most
+        # often is kept, so two identical copays in one statement still count twice.
+        self._flush()
+        if self._unique is None:
+            n = len(self.cents)
+            if n == 0:
+                self._unique = np.empty(0, dtype=np.int64)
+                return self._unique
+
+            order = np.lexsort((np.arange(n), self.source, self.context, self.cents))
+            cents, context, source = self.cents[order], self.context[order], self.source[order]
+            key_break = np.r_[True, (cents[1:] != cents[:-1]) | (context[1:] != context[:-1])]
+            group_break = key_break | np.r_[True, source[1:] != source[:-1]]
+
+            group_starts = np.flatnonzero(group_break)
+            group_sizes = np.diff(np.r_[group_starts, n])
+            group_key = np.cumsum(key_break)[group_starts] - 1
+            # Largest group per key; ties go to the earliest source
+            ranked = np.lexsort((-group_sizes, group_key))
+            chosen = np.zeros(len(group_starts), dtype=bool)
+            chosen[ranked[np.r_[True, group_key[ranked][1:] != group_key[ranked][:-1]]]] = True
+
+            keep = chosen[np.cumsum(group_break) - 1]
+            self._unique = np.sort(order[keep])
+        return self._unique
+
+    def totals(self, dedupe: bool = True) -> Dict[str, int]:
+        self._flush()
+        rows = self.unique_rows() if dedupe else np.arange(len(self.cents))
+        cents, category = self.cents[rows], self.category[rows]
+        # Integer sums per category; exact regardless of how many bills are added
+        return {name: int(cents[category == code].sum()) for name, code in CATEGORY_CODES.items()}
+
+    def distributions(self) -> Dict[str, Dict[str, Any]]:
+        rows = self.unique_rows()
+        cents, category = self.cents[rows], self.category[rows]
+        result = {}
+        for name, code in CATEGORY_CODES.items():
+            values = cents[category == code]
+            if len(values) == 0:
+                result[name] = {"count": 0}
+                continue
+            result[name] = {
+                "count": int(len(values)),
+                "min": int(values.min()) / 100,
+                "max": int(values.max()) / 100,
+                "mean": round(float(values.mean()) / 100, 2),
+                "median": round(float(np.median(values)) / 100, 2),
+                "p90": round(float(np.percentile(values, 90)) / 100, 2)
+            }
+        return result
+
+    def items(self, category: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self.unique_rows()
+        rows = rows[self.category[rows] == CATEGORY_CODES[category]]
+        if limit is not None:
+            rows = rows[:limit]
+        items = []
+        for i in rows:
+            context = self.contexts.values[self.context[i]]
+            items.append({
+                'amount': self.raw[i],
+                'source': self.sources.values[self.source[i]],
+                'value': int(self.cents[i]) / 100,
+                'context': "" if context.startswith("@") else context
+            })
+        return items
+
+    def summary(self) -> Dict[str, Any]:
+        unique = len(self.unique_rows())
+        return {
+            "amounts_found": len(self.cents),
+            "unique_amounts": unique,
+            "duplicates_removed": len(self.cents) - unique,
+            "derived_lines_excluded": sum(self.derived_lines.values())
+        }
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("DAMAGES ENGINE BENCHMARK")
+    print("=" * 80)
+
+    rng = np.random.default_rng(5)
+    labels = ["total charges", "amount due", "patient balance", "insurance paid", "copay"]
+    pages = []
+    for page in range(2000):
+        lines = [f"{labels[i % 5].title()}: ${rng.integers(1, 500000) / 100:,.2f}" for i in range(50)]
+        pages.append("\n".join(lines))
+    bill_dump = "\n".join(pages)
+    # The same dump forwarded inside a demand package: every bill appears twice
+    documents = [("medical_bills.pdf", bill_dump), ("demand_package.pdf", bill_dump)]
+    single = DamageLedger()
+    single.add_document("medical_bills.pdf", bill_dump, "medical_expenses")
+    print(f"\nInput: {len(documents)} documents, {len(bill_dump) * 2 / 1_000_000:.1f} MB, "
+          f"{len(AMOUNT_PATTERN.findall(bill_dump)) * 2} amounts")
+
+    start = time.perf_counter()
+    float_total = 0.0
+    for _, text in documents:
+        for amount in AMOUNT_PATTERN.findall(text):
+            float_total += float(amount.replace('$', '').replace(',', ''))
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ledger = DamageLedger()
+    for source, text in documents:
+        ledger.add_document(source, text, "medical_expenses")
+    totals = ledger.totals()
+    raw_totals = ledger.totals(dedupe=False)
+    engine = time.perf_counter() - start
+
+    print(f"Float loop (no dedupe):   ${float_total:,.2f}  repr {float_total!r}  in {legacy * 1000:.0f} ms")
+    print(f"Cents engine (no dedupe): ${raw_totals['medical_expenses'] / 100:,.2f}")
+    print(f"Cents engine (deduped):   ${totals['medical_expenses'] / 100:,.2f}  in {engine * 1000:.0f} ms (incl. context labels)")
+    print(f"Dedupe: {ledger.summary()}")
+    print(f"Deduped total equals a single copy of the dump: {totals == single.totals(dedupe=False)}")
+    start = time.perf_counter()
+    for _ in range(100):
+        ledger.totals()
+    print(f"Re-total from arrays: {(time.perf_counter() - start) * 10:.2f} ms")
@@ -0,0 +1,225 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .case_facts import _Interner
+from .damages import amount_mentions
+
+# Label -> cue words looked for just before an amount; the cue closest to the amount wins
+AMOUNT_LABELS = {
+    "offer": ["offer", "settle", "tender"],
+    "demand": ["demand"],
+    "lien": ["lien", "subrogation", "reimburse", "conditional payment"],
+    "limit": ["limit", "coverage", "policy max"],
+    "bill": ["bill", "charge", "balance", "amount due", "invoice", "total", "specials", "medical expenses"],
+    "wage": ["wage", "salary", "earnings", "lost pay"],
+}
+UNLABELLED = "other"
+LABEL_WINDOW_CHARS = 80
+CONTEXT_CHARS = 60
+DEFAULT_TOLERANCE_PCT = 10.0
+
+
+def amount_label(text: str, offset: int) -> str:
+    window = text[max(0, offset - LABEL_WINDOW_CHARS):offset].lower()
+    best, best_end = UNLABELLED, -1
+    for label, cues in AMOUNT_LABELS.items():
+        for cue in cues:
+            position = window.rfind(cue)
+            if position >= 0 and position + len(cue) > best_end:
+                best, best_end = label, position + len(cue)
+    return best
+
+
+class AmountIndex:
+    # Amount mentions as int64 cents sorted by (label, value, source), so near-equal amounts
+    # under the same label sit next to each other and are found with binary search
+    def __init__(self):
+        self.sources = _Interner()
+        self.labels = _Interner(list(AMOUNT_LABELS) + [UNLABELLED])
+        self.cents = np.empty(0, dtype=np.int64)
+        self.label = np.empty(0, dtype=np.int8)
+        self.source = np.empty(0, dtype=np.int32)
+        self.raw: List[str] = []
+        self.contexts: List[str] = []
+        self._pending: List[Tuple[int, int, int]] = []
+        self._order: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.raw)
+
+    def add_document(self, source: str, text: Optional[str],
+                     mentions: Optional[List[Tuple[str, int, str, int]]] = None):
+        source_code = self.sources.intern(source)
+        if mentions is None:
+            mentions = amount_mentions(source, text)
+        for raw, cents, _, offset in mentions:
+            if text and offset >= 0:
+                label = amount_label(text, offset)
+                context = " ".join(text[max(0, offset - CONTEXT_CHARS):offset + len(raw) + 20].split())
+            else:
+                label, context = UNLABELLED, raw
+            self._pending.append((cents, self.labels.lookup(label), source_code))
+            self.raw.append(raw)
+            self.contexts.append(context)
+        if mentions:
+            self._order = None
+
+    def remove_document(self, source: str):
+        source_code = self.sources.lookup(source)
+        if source_code < 0:
+            return
+        self._flush()
+        keep = self.source != source_code
+        if keep.all():
+            return
+        self.cents, self.label, self.source = self.cents[keep], self.label[keep], self.source[keep]
+        self.raw = [value for value, kept in zip(self.raw, keep) if kept]
+        self.contexts = [value for value, kept in zip(self.contexts, keep) if kept]
+        self._order = None
+
+    def _flush(self):
+        if self._pending:
+            cents, label, source = zip(*self._pending)
+            self.cents = np.concatenate([self.cents, np.array(cents, dtype=np.int64)])
+            self.label = np.concatenate([self.label, np.array(label, dtype=np.int8)])
+            self.source = np.concatenate([self.source, np.array(source, dtype=np.int32)])
+            self._pending = []
+
+    def _sorted(self) -> np.ndarray:
+        self._flush()
+        if self._order is None:
+            self._order = np.lexsort((np.arange(len(self.cents)), self.source, self.cents, self.label))
+        return self._order
+
+    def _mention(self, row: int) -> Dict[str, Any]:
+        return {"amount": self.raw[row], "source": self.sources.values[self.source[row]], "context": self.contexts[row]}
+
+    @staticmethod
+    def _window_counts(values: np.ndarray, allowed: np.ndarray, min_difference_cents: int) -> int:
+        # Pairs i < j in a sorted array with min_difference <= values[j] - values[i] <= allowed[i]
+        low = np.maximum(np.searchsorted(values, values + min_difference_cents, side='left'),
+                         np.arange(1, len(values) + 1))
+        high = np.searchsorted(values, values + allowed, side='right')
+        return int(np.maximum(high - low, 0).sum())
+
+    def conflicts(self, tolerance_pct: float = DEFAULT_TOLERANCE_PCT, min_difference_cents: int = 100,
+                  tolerances: Optional[Dict[str, float]] = None, cross_document_only: bool = True,
+                  include_unlabelled: bool = False, limit: int = 50) -> Dict[str, Any]:
+        # Pairs of distinct amounts under the same label that differ by at least
+        # `min_difference_cents` and at most the label's tolerance (% of the smaller amount).
+        # The total is counted with binary searches; the `limit` closest pairs are found by
+        # widening the neighbour offset until no farther pair can beat them. Never all-pairs.
+        order = self._sorted()
+        if len(order) == 0:
+            return {"total": 0, "by_label": {}, "pairs": []}
+        cents, label, source = self.cents[order], self.label[order], self.source[order]
+
+        # Collapse identical (label, value) mentions; a value seen in one document only keeps its source
+        value_break = np.r_[True, (cents[1:] != cents[:-1]) | (label[1:] != label[:-1])]
+        starts = np.flatnonzero(value_break)
+        ends = np.r_[starts[1:], len(order)]
+        source_break = value_break | np.r_[True, source[1:] != source[:-1]]
+        distinct_sources = np.add.reduceat(source_break.astype(np.int64), starts)
+        only_source = np.where(distinct_sources == 1, source[starts], -1)
+        values, value_labels = cents[starts], label[starts]
+
+        tolerances = tolerances or {}
+        percent = np.array([tolerances.get(name, tolerance_pct) for name in self.labels.values])
+        allowed = np.floor(values * percent[value_labels] / 100).astype(np.int64)
+        compared = np.ones(len(values), dtype=bool)
+        if not include_unlabelled:
+            compared = value_labels != self.labels.lookup(UNLABELLED)
+
+        by_label: Dict[str, int] = {}
+        for code in np.unique(value_labels[compared]):
+            group = np.flatnonzero(value_labels == code)
+            count = self._window_counts(values[group], allowed[group], min_difference_cents)
+            if cross_document_only:
+                # Pairs whose amounts both appear only in the same document are not conflicts
+                single = group[only_source[group] >= 0]
+                single = single[np.argsort(only_source[single], kind='stable')]
+                breaks = np.flatnonzero(np.diff(only_source[single])) + 1
+                for subset in np.split(single, breaks):
+                    count -= self._window_counts(values[subset], allowed[subset], min_difference_cents)
+            if count:
+                by_label[self.labels.values[code]] = count
+
+        best_first = np.empty(0, dtype=np.int64)
+        best_second = np.empty(0, dtype=np.int64)
+        best_relative = np.empty(0, dtype=np.float64)
+        offset = 1
+        while offset < len(values):
+            first = np.arange(len(values) - offset)
+            second = first + offset
+            difference = values[second] - values[first]
+            reachable = (value_labels[first] == value_labels[second]) & compared[first] & (difference <= allowed[first])
+            if not reachable.any():
+                break
+            relative = difference / np.maximum(values[first], 1)
+            if len(best_relative) >= limit and relative[reachable].min() > best_relative.max():
+                break
+            keep = reachable & (difference >= min_difference_cents)
+            if cross_document_only:
+                keep &= ~((only_source[first] >= 0) & (only_source[first] == only_source[second]))
+            best_first = np.r_[best_first, first[keep]]
+            best_second = np.r_[best_second, second[keep]]
+            best_relative = np.r_[best_relative, relative[keep]]
+            if len(best_relative) > limit:
+                top = np.argsort(best_relative, kind='stable')[:limit]
+                best_first, best_second, best_relative = best_first[top], best_second[top], best_relative[top]
+            offset += 1
+
+        ranked = np.argsort(best_relative, kind='stable')
+        pairs = []
+        for k in ranked:
+            a, b = int(best_first[k]), int(best_second[k])
+            rows_a, rows_b = order[starts[a]:ends[a]], order[starts[b]:ends[b]]
+            # Representative mentions from two different documents when possible
+            row_a, row_b = rows_a[0], rows_b[0]
+            if cross_document_only and self.source[row_a] == self.source[row_b]:
+                other = rows_b[self.source[rows_b] != self.source[row_a]]
+                if len(other):
+                    row_b = other[0]
+                else:
+                    row_a = rows_a[self.source[rows_a] != self.source[row_b]][0]
+            pairs.append({
+                "label": self.labels.values[value_labels[a]],
+                "difference": int(values[b] - values[a]) / 100,
+                "difference_pct": round(float(best_relative[k]) * 100, 2),
+                "lower": self._mention(row_a),
+                "higher": self._mention(row_b)
+            })
+        return {"total": sum(by_label.values()), "by_label": by_label, "pairs": pairs}
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("AMOUNT DISCREPANCY BENCHMARK")
+    print("=" * 80)
+
+    index = AmountIndex()
+    index.add_document("demand_letter.pdf", "Medical specials to date total $24,000.00. We demand $120,000.")
+    index.add_document("adjuster_letter.pdf", "We have reviewed medical specials of $24,500.00 and offer $18,000.")
+    index.add_document("medicare_2019.pdf", "The conditional payment lien amount is $3,412.50.")
+    index.add_document("medicare_2020.pdf", "Updated lien amount: $3,655.10 as of this notice.")
+    for pair in index.conflicts()["pairs"]:
+        print(f"\n{pair['label']}: {pair['lower']['amount']} ({pair['lower']['source']}) vs "
+              f"{pair['higher']['amount']} ({pair['higher']['source']}), {pair['difference_pct']}%")
+
+    rng = np.random.default_rng(3)
+    labels = ["Total charges", "Balance due", "Lien amount", "Settlement offer", "Policy limit", "Lost wages"]
+    for count in (10_000, 100_000, 1_000_000):
+        # Log-uniform amounts from $10 to $1M spread over 500 documents
+        values = np.exp(rng.uniform(np.log(1_000), np.log(100_000_000), size=count)).astype(np.int64)
+        index = AmountIndex()
+        docs = 500
+        for d in range(docs):
+            chunk = values[d::docs]
+            text = "\n".join(f"{labels[(d + i) % len(labels)]}: ${v / 100:,.2f}" for i, v in enumerate(chunk))
+            index.add_document(f"document_{d}.pdf", text)
+        index._sorted()
+        start = time.perf_counter()
+        result = index.conflicts(tolerance_pct=0.5, limit=50)
+        elapsed = time.perf_counter() - start
+        print(f"\n{count:>9,} amounts -> {result['total']:,} near-matches within 0.5% in {elapsed * 1000:.0f} ms "
+              f"(closest {result['pairs'][0]['difference_pct']}%)")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TYPES = [
+    "medical", "police_report", "insurance", "financial",
+    "legal", "correspondence", "evidence", "general"
+]
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "primary_type": {"type": "STRING", "enum": DOCUMENT_TYPES},
+            "confidence": {"type": "NUMBER"}
+        },
+        "required": ["id", "primary_type"]
+    }
+}
+
+
+def document_hash(text: str, filename: str = "") -> str:
+    return hashlib.sha256(f"{filename}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def _clamp_confidence(value: Any) -> float:
+    # The schema cannot bound a NUMBER; keep the field a probability
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return 0.8
+    return min(max(confidence, 0.0), 1.0)
+
+
+class HybridClassifier:
+    # keyword_classifier(text, filename) -> dict is the local scorer (DocuAgent.classify_document);
+    # backend is anything with generate(prompt, response_schema=None) -> str, or None for keyword-only.
+    # Documents may carry their "keyword_result" already, so nothing is scored twice.
+    # Keyword confidence is cue hits / 3, so the default threshold accepts two cues as a local match.
+    # All low-confidence documents of a batch go out in one request; only a batch whose excerpts
+    # exceed max_prompt_chars (~250 documents at the default excerpt size) is split into several.
+    def __init__(self, keyword_classifier: Callable[[str, str], Dict[str, Any]], backend=None,
+                 confidence_threshold: float = 2 / 3, excerpt_chars: int = 1500, max_cache_entries: int = 10000,
+                 max_prompt_chars: int = 400_000):
+        self.keyword_classifier = keyword_classifier
+        self.backend = backend
+        self.confidence_threshold = confidence_threshold
+        self.excerpt_chars = excerpt_chars
+        self.max_prompt_chars = max_prompt_chars
+        self.max_cache_entries = max_cache_entries
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"cache_hits": 0, "keyword": 0, "llm": 0, "llm_requests": 0}
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key: str, result: Dict[str, Any]):
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    def _build_prompt(self, pending: List[Dict[str, Any]]) -> str:
+        documents = "\n\n".join(
+            f"[Document {item['id']}] filename: {item['filename']}\n{item['text'][:self.excerpt_chars]}"
+            for item in pending
+        )
+        return f"""Classify each legal case document below into exactly one type: {", ".join(DOCUMENT_TYPES)}.
+Return one entry per document with its id, primary_type and a confidence between 0 and 1.
+
+{documents}"""
+
+    def _prompt_batches(self, pending: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        # Consecutive documents packed into prompts of at most max_prompt_chars (at least one each)
+        batches: List[List[Dict[str, Any]]] = [[]]
+        size = 0
+        for item in pending:
+            item_chars = len(item['filename']) + min(len(item['text']), self.excerpt_chars) + 40
+            if batches[-1] and size + item_chars > self.max_prompt_chars:
+                batches.append([])
+                size = 0
+            batches[-1].append(item)
+            size += item_chars
+        return batches if batches[0] else []
+
+    def _classify_with_llm(self, pending: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        self.stats['llm_requests'] += 1
+        try:
+            response = self.backend.generate(self._build_prompt(pending), response_schema=BATCH_RESPONSE_SCHEMA)
+            entries = json.loads(response)
+        except Exception as e:
+            logger.warning(f"Batch classification failed, keeping keyword results: {str(e)}")
+            return {}
+
+        labels = {}
+        for entry in entries:
+            if entry.get('primary_type') in DOCUMENT_TYPES and isinstance(entry.get('id'), int):
+                labels[entry['id']] = entry
+        return labels
+
+    def classify_batch(self, documents: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+        pending = []
+
+        for index, document in enumerate(documents):
+            text = document.get('text', '')
+            filename = document.get('filename', '')
+            key = document_hash(text, filename)
+
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                results[index] = dict(cached)
+                continue
+
+            keyword_result = dict(document.get('keyword_result') or self.keyword_classifier(text, filename))
+            keyword_result['method'] = 'keyword'
+            results[index] = keyword_result
+
+            if keyword_result['confidence'] >= self.confidence_threshold or self.backend is None:
+                self.stats['keyword'] += 1
+                self._cache_put(key, keyword_result)
+            else:
+                pending.append({"id": len(pending), "index": index, "key": key, "text": text, "filename": filename})
+
+        for items in self._prompt_batches(pending):
+            batch = [dict(item, id=i) for i, item in enumerate(items)]
+            labels = self._classify_with_llm(batch)
+            for item in batch:
+                entry = labels.get(item['id'])
+                if entry is None:
+                    # Leave the keyword result uncached so the next batch retries the LLM
+                    self.stats['keyword'] += 1
+                    continue
+
+                primary_type = entry['primary_type']
+                llm_result = {
+                    "primary_type": primary_type,
+                    "confidence": _clamp_confidence(entry.get('confidence', 0.8)),
+                    "filename": item['filename'],
+                    "suggested_category": primary_type.replace("_", " ").title(),
+                    "method": "llm"
+                }
+                self.stats['llm'] += 1
+                results[item['index']] = llm_result
+                self._cache_put(item['key'], llm_result)
+
+        return results
@@ -0,0 +1,277 @@
+import re
+import time
+from collections import Counter
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .case_similarity import INSURERS
+from .page_index import PageIndex
+
+INSURER_DISPLAY = {"geico": "GEICO", "usaa": "USAA"}
+# Capitalised or upper-case forms only, so "progressive pain" or "local farmers" are not insurers
+INSURER_PATTERN = re.compile(r'\b(' + '|'.join(
+    re.escape(form) for name in INSURERS
+    for form in {name.title(), name.upper(), INSURER_DISPLAY.get(name, name.title())}
+) + r')\b')
+NAME = r"[A-Z][a-z]+(?:\s[A-Z]\.)?\s[A-Z][a-zA-Z'\-]+"
+# Words that show a "name" is really a form label ("Claim Reference", "Loss Type")
+LABEL_WORDS = {
+    "number", "reference", "information", "type", "date", "name", "address", "policy", "claim", "loss",
+    "insurance", "phone", "report", "total", "amount", "page", "street", "department", "unit", "office"
+}
+PERSON_TYPES = {"adjuster", "party"}
+
+
+def _cases(*words: str) -> str:
+    # Literal alternatives in lower, Title and UPPER case; unlike (?i:...) this keeps the
+    # regex engine's first-character scan, which is several times faster on long texts
+    return "|".join(sorted({form for word in words for form in (word, word.title(), word.upper())}, key=len, reverse=True))
+
+
+# (type, pattern): the label comes first and group 1 is the value
+FORWARD_PATTERNS = [
+    ("claim_number", re.compile(r"(?:" + _cases("claim") + r")\s*(?:" + _cases("number", "no.", "no", "num", "#") +
+                                r")?\s*[:#.]?\s*([A-Z0-9\-]*\d[A-Z0-9\-]{3,})")),
+    ("policy_number", re.compile(r"(?:" + _cases("policy") + r")\s*(?:" + _cases("number", "no.", "no", "num", "#") +
+                                 r")?\s*[:#.]?\s*([A-Z0-9\-]*\d[A-Z0-9\-]{3,})")),
+    ("adjuster", re.compile(r"(?:" + _cases("adjuster", "claims specialist", "claim specialist", "claims representative",
+                                           "claim representative", "claims professional", "claims examiner") +
+                            r")[ \t]*[:\-]?\s*(?:Mr\.|Ms\.|Mrs\.)?\s*(" + NAME + r")")),
+    ("provider", re.compile(r"\b((?:Dr|DR)\.?\s+" + NAME + r")")),
+    ("party", re.compile(r"(?:" + _cases("insured", "claimant", "injured party", "plaintiff", "defendant", "patient") +
+                         r")(?:\s+(?:" + _cases("name") + r"))?\s*:\s*([A-Z][a-zA-Z'\-]+(?:,?[ \t][A-Z][a-zA-Z'\-\.]+){1,2})")),
+]
+# (type, cue, name pattern matched against the text just before the cue, whether the cue is part of the name)
+PROVIDER_SUFFIXES = _cases("hospital", "medical center", "medical group", "clinic", "chiropractic", "orthopedics",
+                           "orthopedic", "orthopaedics", "imaging", "radiology", "physical therapy", "rehabilitation",
+                           "urgent care", "health system", "healthcare")
+BACKWARD_PATTERNS = [
+    ("provider", re.compile(r"\b(?:" + PROVIDER_SUFFIXES + r")(?:[ \t]+(?:" + PROVIDER_SUFFIXES + r"))*\b"),
+     re.compile(r"((?:[A-Z][A-Za-z'&.\-]+[ \t]+){1,3})$"), True),
+    ("law_firm", re.compile(r"(?:P\.A\.|LLP|PLLC|P\.C\.|" + _cases("law firm", "law group", "law offices", "law office") + r")"),
+     re.compile(r"((?:[A-Z][A-Za-z'.\-]*(?:[ \t]+&)?[ \t]+){0,3}[A-Z][A-Za-z'.\-]*)(?:,[ \t]*|[ \t]+)$"), True),
+    ("adjuster", re.compile(r"\b(?:" + _cases("adjuster") + r")\b"),
+     re.compile(r"(" + NAME + r"),?\s+(?:" + _cases("claims", "claim") + r")?\s*$"), False),
+    ("provider", re.compile(r"\b(?:M\.D\.|MD|D\.O\.|D\.C\.)"),
+     re.compile(r"(" + NAME + r"),?[ \t]+$"), True),
+]
+LOOKBACK_CHARS = 80
+HONORIFIC = re.compile(r'^(?:dr|mr|mrs|ms)\.?\s+')
+CREDENTIAL = re.compile(r',?\s*(?:m\.?d|d\.?o|d\.?c)\.?$')
+MAX_ENTITIES_PER_DOCUMENT = 200
+
+
+def normalize_entity(name: str) -> str:
+    # Lookup key: case, punctuation, spacing, honorifics and credentials ignored
+    # ("Dr. Jane Smith" ~ "Jane Smith, M.D." ~ "jane smith")
+    return re.sub(r'[^a-z0-9]', '', CREDENTIAL.sub('', HONORIFIC.sub('', name.strip().lower())))
+
+
+def _is_label(name: str) -> bool:
+    return any(word.lower().strip(".,") in LABEL_WORDS for word in name.split())
+
+
+def extract_entities(text: str) -> List[Tuple[str, str, int]]:
+    # (type, display name, offset) for every mention
+    found = [("insurer", INSURER_DISPLAY.get(m.group(1).lower(), m.group(1).title()), m.start())
+             for m in INSURER_PATTERN.finditer(text)]
+    for entity_type, pattern in FORWARD_PATTERNS:
+        for match in pattern.finditer(text):
+            found.append((entity_type, match.group(1), match.start(1)))
+    for entity_type, cue, pattern, keep_cue in BACKWARD_PATTERNS:
+        for match in cue.finditer(text):
+            window_start = max(0, match.start() - LOOKBACK_CHARS)
+            name = pattern.search(text, window_start, match.start())
+            if name:
+                end = match.end() if keep_cue else name.end(1)
+                found.append((entity_type, text[name.start(1):end], name.start(1)))
+
+    # Overlapping cues ("Law Group, PLLC") can yield several names at one offset; keep the longest
+    entities: Dict[Tuple[str, int], str] = {}
+    for entity_type, name, offset in found:
+        name = " ".join(name.split()).strip(",-")
+        if entity_type in PERSON_TYPES and _is_label(name):
+            continue
+        if len(name) > len(entities.get((entity_type, offset), "")):
+            entities[(entity_type, offset)] = name
+    return [(entity_type, name, offset) for (entity_type, offset), name in entities.items()]
+
+
+class EntityGraph:
+    # Entities with per-document / per-page mention lists and co-occurrence edges, all kept as
+    # adjacency maps so "where is X mentioned" and "what is X linked to" are dictionary lookups
+    def __init__(self):
+        self.ids: Dict[Tuple[str, str], int] = {}
+        self.types: List[str] = []
+        self.names: List[str] = []
+        self.by_name: Dict[str, Set[int]] = {}
+        # entity -> {document: pages}; document -> {entity: pages}
+        self.mentions: List[Dict[str, List[int]]] = []
+        self.document_entities: Dict[str, Dict[int, List[int]]] = {}
+        # entity -> Counter(neighbour -> documents / pages in which both appear)
+        self.document_edges: List[Counter] = []
+        self.page_edges: List[Counter] = []
+
+    def __len__(self):
+        return sum(1 for documents in self.mentions if documents)
+
+    def _entity(self, entity_type: str, name: str) -> int:
+        key = (entity_type, normalize_entity(name))
+        entity = self.ids.get(key)
+        if entity is None:
+            entity = self.ids[key] = len(self.names)
+            self.types.append(entity_type)
+            self.names.append(name)
+            self.mentions.append({})
+            self.document_edges.append(Counter())
+            self.page_edges.append(Counter())
+            self.by_name.setdefault(key[1], set()).add(entity)
+        return entity
+
+    def add_document(self, document: str, text: str, page_index: Optional[PageIndex] = None) -> bool:
+        # Returns whether the document mentions any entity
+        self.remove_document(document)
+        pages: Dict[int, List[int]] = {}
+        for entity_type, name, offset in extract_entities(text or ""):
+            if not normalize_entity(name):
+                continue
+            entity = self._entity(entity_type, name)
+            if entity not in pages and len(pages) >= MAX_ENTITIES_PER_DOCUMENT:
+                continue
+            page = page_index.page_of(offset) if page_index is not None and len(page_index) else 1
+            entity_pages = pages.setdefault(entity, [])
+            if page not in entity_pages:
+                entity_pages.append(page)
+        if not pages:
+            return False
+
+        self.document_entities[document] = pages
+        for entity, entity_pages in pages.items():
+            self.mentions[entity][document] = sorted(entity_pages)
+        self._update_edges(pages, 1)
+        return True
+
+    def remove_document(self, document: str) -> bool:
+        pages = self.document_entities.pop(document, None)
+        if pages is None:
+            return False
+        for entity in pages:
+            self.mentions[entity].pop(document, None)
+        self._update_edges(pages, -1)
+        return True
+
+    def _update_edges(self, pages: Dict[int, List[int]], sign: int):
+        by_page: Dict[int, List[int]] = {}
+        for entity, entity_pages in pages.items():
+            for page in entity_pages:
+                by_page.setdefault(page, []).append(entity)
+        for edges, groups in ((self.document_edges, [list(pages)]), (self.page_edges, by_page.values())):
+            for group in groups:
+                for a, b in combinations(group, 2):
+                    for source, target in ((a, b), (b, a)):
+                        edges[source][target] += sign
+                        if edges[source][target] <= 0:
+                            del edges[source][target]
+
+    def lookup(self, name: str) -> List[int]:
+        return sorted(entity for entity in self.by_name.get(normalize_entity(name), ()) if self.mentions[entity])
+
+    def describe(self, entity: int, related_limit: int = 10) -> Dict[str, Any]:
+        related = self.document_edges[entity].most_common(related_limit)
+        return {
+            "name": self.names[entity],
+            "type": self.types[entity],
+            "documents": [{"document": document, "pages": pages} for document, pages in self.mentions[entity].items()],
+            "related": [{
+                "name": self.names[other],
+                "type": self.types[other],
+                "shared_documents": count,
+                "shared_pages": self.page_edges[entity][other]
+            } for other, count in related]
+        }
+
+    def _ranked(self) -> List[int]:
+        live = [entity for entity, documents in enumerate(self.mentions) if documents]
+        return sorted(live, key=lambda entity: (-len(self.mentions[entity]), entity))
+
+    def summary(self, max_entities: int = 40, max_relationships: int = 40) -> Dict[str, Any]:
+        # Compact enough to hand to the model in place of the documents themselves
+        ranked = self._ranked()
+        shown = ranked[:max_entities]
+        shown_set = set(shown)
+        entities: Dict[str, List[Dict[str, Any]]] = {}
+        for entity in shown:
+            entities.setdefault(self.types[entity], []).append(
+                {"name": self.names[entity], "documents": len(self.mentions[entity])})
+
+        edges = sorted(((count, self.page_edges[a][b], a, b) for a in shown for b, count in self.document_edges[a].items()
+                        if a < b and b in shown_set), key=lambda edge: (-edge[0], -edge[1], edge[2], edge[3]))
+        relationships = [{
+            "between": [self.names[a], self.names[b]],
+            "shared_documents": count,
+            "shared_pages": page_count
+        } for count, page_count, a, b in edges[:max_relationships]]
+
+        lines = []
+        for entity in shown:
+            links = ", ".join(f"{self.names[other]} ({count})" for other, count in
+                              self.document_edges[entity].most_common(5) if other in shown_set)
+            line = f"{self.types[entity]}: {self.names[entity]} [{len(self.mentions[entity])} docs]"
+            lines.append(f"{line} -> {links}" if links else line)
+
+        return {
+            "total_entities": len(ranked),
+            "total_relationships": sum(len(edges) for edges in self.document_edges) // 2,
+            "documents_with_entities": len(self.document_entities),
+            "entities": entities,
+            "relationships": relationships,
+            "prompt_text": "\n".join(lines)
+        }
+
+
+if __name__ == "__main__":
+    import json
+    from pathlib import Path
+
+    print("=" * 80)
+    print("ENTITY GRAPH BENCHMARK")
+    print("=" * 80)
+
+    results_path = Path(__file__).parent.parent / "data" / "out" / "docu_agent_test_results.json"
+    with open(results_path) as f:
+        all_results = json.load(f)
+
+    for case_name, case in all_results.items():
+        graph = EntityGraph()
+        for file_result in case['files_processed']:
+            if file_result.get('success'):
+                graph.add_document(file_result.get('relative_path') or file_result.get('filename'),
+                                   file_result.get('text', ''), PageIndex.from_result(file_result))
+        summary = graph.summary(max_entities=8)
+        print(f"\n{case_name}: {summary['total_entities']} entities, {summary['total_relationships']} relationships")
+        print("  " + summary['prompt_text'].replace("\n", "\n  "))
+
+    files = [fr for case in all_results.values() for fr in case['files_processed'] if fr.get('success')]
+    corpus = [(f"{i}/{fr.get('filename')}", fr.get('text', ''), PageIndex.from_result(fr)) for i, fr in enumerate(files * 25)]
+    size_mb = sum(len(text) for _, text, _ in corpus) / 1_000_000
+    start = time.perf_counter()
+    graph = EntityGraph()
+    for document, text, pages in corpus:
+        graph.add_document(document, text, pages)
+    build = time.perf_counter() - start
+
+    largest = max(corpus, key=lambda document: len(document[1]))
+    start = time.perf_counter()
+    graph.add_document(*largest)
+    update = time.perf_counter() - start
+
+    name = graph.names[graph._ranked()[0]]
+    start = time.perf_counter()
+    for _ in range(1000):
+        graph.describe(graph.lookup(name)[0])
+    lookup = (time.perf_counter() - start) / 1000
+    prompt = graph.summary()['prompt_text']
+
+    print(f"\nCorpus: {len(corpus)} documents, {size_mb:.1f} MB of text")
+    print(f"Full build: {build * 1000:.0f} ms; re-adding one document: {update * 1000:.2f} ms")
+    print(f"Lookup '{name}' with its documents and neighbours: {lookup * 1000:.3f} ms")
+    print(f"Prompt summary: {len(prompt):,} characters vs {size_mb * 1_000_000:,.0f} characters of raw text")
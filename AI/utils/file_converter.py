@@ -1,4 +1,6 @@
 import os
+import json
+import hashlib
 import tempfile
 import requests
 from pathlib import Path
@@ -10,15 +12,25 @@ import speech_recognition as sr
 from pydub import AudioSegment
 from urllib.parse import urlparse
 import logging
+from .page_index import extract_pdf_pages
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+CACHE_VERSION = 1
+
+
 class FileConverter:
-    def __init__(self, temp_dir: Optional[str] = None):
+    def __init__(self, temp_dir: Optional[str] = None, cache_dir: Optional[str] = None, with_layout: bool = False):
         self.temp_dir = temp_dir or tempfile.gettempdir()
         Path(self.temp_dir).mkdir(parents=True, exist_ok=True)
+        
+        # Conversions (text plus page index) are cached by file content hash
+        self.cache_dir = cache_dir
+        if cache_dir:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.with_layout = with_layout
     
     def convert_to_text(self, source: str) -> Dict[str, Any]:
         logger.info(f"Converting: {source}")
@@ -98,15 +110,24 @@ class FileConverter:
         
         file_ext = Path(file_path).suffix.lower()
         
+        cache_path = self._cache_path(file_path)
+        result = self._read_cache(cache_path) if cache_path else None
+        if result is not None:
+            result['file_path'] = file_path
+            result['filename'] = os.path.basename(file_path)
+            result['cached'] = True
+            logger.info(f"Loaded cached conversion: {file_path}")
+            return result
+        
         # Route to appropriate converter based on extension
         if file_ext == '.pdf':
-            return self._convert_pdf(file_path)
+            result = self._convert_pdf(file_path)
         elif file_ext in ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']:
-            return self._convert_image(file_path)
+            result = self._convert_image(file_path)
         elif file_ext in ['.m4a', '.mp3', '.wav', '.flac']:
-            return self._convert_audio(file_path)
+            result = self._convert_audio(file_path)
         elif file_ext in ['.txt', '.csv', '.log', '.docx']:
-            return self._convert_text(file_path)
+            result = self._convert_text(file_path)
         else:
             return {
                 "success": False,
@@ -114,17 +135,52 @@ class FileConverter:
                 "file_type": "unsupported",
                 "text": ""
             }
+        
+        if cache_path and result.get('success'):
+            self._write_cache(cache_path, result)
+        
+        return result
+    
+    def _read_cache(self, cache_path: str) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # Unreadable entry (e.g. torn by an older non-atomic write); convert again and overwrite it
+            logger.warning(f"Ignoring unreadable conversion cache entry: {cache_path}")
+            return None
+    
+    def _write_cache(self, cache_path: str, result: Dict[str, Any]):
+        # Written to a temp file and renamed, so a crash never leaves a truncated entry behind;
+        # mkstemp keeps concurrent writers (threads or portfolio worker processes) apart
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _cache_path(self, file_path: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}:{self.with_layout}:{Path(file_path).suffix.lower()}:".encode())
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.json")
     
     def _convert_pdf(self, file_path: str) -> Dict[str, Any]:
         try:
-            text = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 num_pages = len(pdf_reader.pages)
-                
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
+                text, page_index = extract_pdf_pages(pdf_reader, with_layout=self.with_layout)
             
             return {
                 "success": True,
@@ -133,7 +189,8 @@ class FileConverter:
                 "file_path": file_path,
                 "filename": os.path.basename(file_path),
                 "num_pages": num_pages,
-                "word_count": len(text.split())
+                "word_count": len(text.split()),
+                "page_index": page_index.to_dict()
             }
         except Exception as e:
             logger.error(f"PDF conversion error: {str(e)}")
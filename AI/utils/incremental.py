@@ -0,0 +1,194 @@
+import heapq
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .damages import DAMAGE_CATEGORIES, damage_lines
+
+
+class CaseAggregates:
+    # Case-level counters kept current one document at a time. add/remove only touch the
+    # document's own keys, and reads never go back to the text.
+    def __init__(self, keyword_groups: Optional[Dict[str, List[str]]] = None,
+                 evidence_tags: Optional[Dict[str, List[str]]] = None):
+        self.keyword_groups = keyword_groups or {}
+        self.evidence_tags = evidence_tags or {}
+        self.type_counts: Counter = Counter()
+        self.evidence_counts: Counter = Counter()
+        # group -> {seq: filename} for successful documents hitting any of the group's keywords
+        self.group_documents: Dict[str, Dict[int, str]] = {group: {} for group in self.keyword_groups}
+        # key_info amount -> {seq: (first index in the document, mentions, filename)}
+        self.amount_documents: Dict[str, Dict[int, Tuple[int, int, str]]] = {}
+        self.amount_mentions = 0
+        # (cents, context) -> {relative path: Counter(category -> mentions)}; see DamageLedger.unique_rows
+        self.damage_groups: Dict[Tuple[int, str], Dict[str, Counter]] = {}
+        self.damage_totals = {category: 0 for category in DAMAGE_CATEGORIES}
+
+    def _evidence(self, doc) -> Set[str]:
+        tags = {doc.classification} if doc.has_classification else set()
+        tags.update(tag for tag, words in self.evidence_tags.items()
+                    if any(word in doc.filename_lower for word in words))
+        return tags
+
+    def _damage_contribution(self, key: Tuple[int, str]) -> Counter:
+        # Only the source quoting the key most often counts; ties go to the earliest source
+        sources = self.damage_groups.get(key)
+        if not sources:
+            return Counter()
+        winner = max(sources.values(), key=lambda categories: sum(categories.values()))
+        return Counter({category: key[0] * count for category, count in winner.items()})
+
+    def _update(self, doc, sign: int) -> Set[str]:
+        changes = {"documents"}
+        if doc.has_classification:
+            self.type_counts[doc.classification] += sign
+            changes.add("types")
+
+        for tag in self._evidence(doc):
+            self.evidence_counts[tag] += sign
+            # Only a tag appearing or disappearing changes the checklist
+            if self.evidence_counts[tag] == (1 if sign > 0 else 0):
+                changes.add("evidence")
+
+        if not doc.success:
+            return changes
+
+        for group, keywords in self.keyword_groups.items():
+            if doc.has_any(keywords):
+                if sign > 0:
+                    self.group_documents[group][doc.seq] = doc.filename
+                else:
+                    self.group_documents[group].pop(doc.seq, None)
+                changes.add(f"keywords:{group}")
+
+        if doc.has_key_info:
+            if doc.raw_dates:
+                changes.add("dates")
+            counts = Counter(doc.raw_amounts)
+            for raw, count in counts.items():
+                documents = self.amount_documents.setdefault(raw, {})
+                if sign > 0:
+                    documents[doc.seq] = (doc.raw_amounts.index(raw), count, doc.filename)
+                else:
+                    documents.pop(doc.seq, None)
+                    if not documents:
+                        del self.amount_documents[raw]
+            if counts:
+                self.amount_mentions += sign * len(doc.raw_amounts)
+                changes.add("amounts")
+
+        mentions = Counter((cents, context) for _, cents, context, _ in damage_lines(doc.amount_mentions))
+        for key, count in mentions.items():
+            before = self._damage_contribution(key)
+            sources = self.damage_groups.setdefault(key, {})
+            categories = sources.setdefault(doc.key, Counter())
+            categories[doc.damage_category] += sign * count
+            if categories[doc.damage_category] <= 0:
+                del categories[doc.damage_category]
+                if not categories:
+                    del sources[doc.key]
+                    if not sources:
+                        del self.damage_groups[key]
+            after = self._damage_contribution(key)
+            for category in set(before) | set(after):
+                self.damage_totals[category] += after[category] - before[category]
+        if mentions:
+            changes.add("damages")
+        return changes
+
+    def add(self, doc) -> Set[str]:
+        # Names of the aggregates the document changed
+        return self._update(doc, 1)
+
+    def remove(self, doc) -> Set[str]:
+        return self._update(doc, -1)
+
+    @property
+    def document_types(self) -> Set[str]:
+        return {doc_type for doc_type, count in self.type_counts.items() if count > 0}
+
+    def evidence_found(self) -> Set[str]:
+        return {tag for tag, count in self.evidence_counts.items() if count > 0}
+
+    def documents_in_group(self, group: str) -> List[str]:
+        return list(self.group_documents.get(group, {}).values())
+
+    def first_documents(self, groups: List[str]) -> List[Tuple[str, str]]:
+        # (group, first matching document) ordered as a document-by-document scan would find them
+        found = []
+        for position, group in enumerate(groups):
+            documents = self.group_documents.get(group)
+            if documents:
+                seq = next(iter(documents))
+                found.append(((seq, position), group, documents[seq]))
+        return [(group, filename) for _, group, filename in sorted(found)]
+
+    def amount_sources(self, limit: Optional[int] = None) -> Dict[str, List[str]]:
+        # Amount -> one filename per mention, amounts in order of first appearance
+        def first_seen(raw):
+            seq, (index, _, _) = next(iter(self.amount_documents[raw].items()))
+            return seq, index
+
+        amounts = self.amount_documents
+        ordered = heapq.nsmallest(limit, amounts, key=first_seen) if limit is not None \
+            else sorted(amounts, key=first_seen)
+        return {
+            raw: [filename for _, count, filename in amounts[raw].values() for _ in range(count)]
+            for raw in ordered
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "document_types": dict(+self.type_counts),
+            "evidence_found": sorted(self.evidence_found()),
+            "amount_mentions": self.amount_mentions,
+            "distinct_amounts": len(self.amount_documents),
+            "damage_totals_cents": dict(self.damage_totals)
+        }
+
+
+if __name__ == "__main__":
+    import json
+    import time
+    from pathlib import Path
+    from .case_features import CaseFeatures
+
+    print("=" * 80)
+    print("INCREMENTAL CASE UPDATE BENCHMARK")
+    print("=" * 80)
+
+    results_path = Path(__file__).parent.parent / "data" / "out" / "docu_agent_test_results.json"
+    with open(results_path) as f:
+        all_results = json.load(f)
+    files = [file_result for case in all_results.values() for file_result in case['files_processed']]
+    keyword_groups = {
+        "clear_fault": ['at fault', 'negligent', 'violated', 'failed to', 'breach'],
+        "disputed": ['dispute', 'deny', 'contest', 'disagree'],
+        "damages": ["injury", "harm", "loss", "suffering"],
+    }
+    corpus = [dict(file_result, relative_path=f"{i}/{file_result.get('filename')}")
+              for i, file_result in enumerate(files * 50)]
+    richest = max((fr for fr in files if fr.get('success')), key=lambda fr: len(fr.get('key_info', {}).get('amounts', [])))
+    new_letter = dict(richest, relative_path="new/letter.txt")
+    print(f"\nCase: {len(corpus)} documents; adding and removing one")
+
+    start = time.perf_counter()
+    features = CaseFeatures({"files_processed": corpus}, keyword_groups)
+    features.timeline.events()
+    features.damage_ledger.totals()
+    rebuild = time.perf_counter() - start
+
+    start = time.perf_counter()
+    added = features.add_document(new_letter)
+    features.timeline.events()
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    removed = features.remove_document("new/letter.txt")
+    features.timeline.events()
+    remove_time = time.perf_counter() - start
+
+    fresh = CaseFeatures({"files_processed": corpus}, keyword_groups)
+    print(f"Full rebuild: {rebuild * 1000:.0f} ms")
+    print(f"Add one document: {add_time * 1000:.1f} ms, changed {sorted(added)}")
+    print(f"Remove it again: {remove_time * 1000:.1f} ms, changed {sorted(removed)}")
+    print(f"Aggregates match a rebuild: {features.aggregates.summary() == fresh.aggregates.summary()}")
+    print(f"Totals match the ledger: {features.aggregates.damage_totals == fresh.damage_ledger.totals()}")
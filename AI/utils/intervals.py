@@ -0,0 +1,145 @@
+import re
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .case_facts import DATE_PATTERN, parse_date
+
+# "01/01/2019 to 07/01/2019", "Jan 1, 2019 - Jul 1, 2019", "from 1/1/19 through 6/30/19"
+DATE_RANGE_PATTERN = re.compile(
+    rf'({DATE_PATTERN.pattern})\s*(?:-|–|to|through|thru|until)\s*({DATE_PATTERN.pattern})',
+    re.IGNORECASE
+)
+
+
+class IntervalIndex:
+    # Closed day intervals [start, end] kept sorted by start; every query is O(n log n) or better
+    def __init__(self, intervals: Iterable[Tuple[np.datetime64, np.datetime64, Any]] = ()):
+        intervals = list(intervals)
+        starts = np.array([start for start, _, _ in intervals], dtype='datetime64[D]')
+        ends = np.array([end for _, end, _ in intervals], dtype='datetime64[D]')
+        self._build(np.minimum(starts, ends), np.maximum(starts, ends), [label for _, _, label in intervals])
+
+    def _build(self, starts: np.ndarray, ends: np.ndarray, labels: List[Any]):
+        valid = np.flatnonzero(~(np.isnat(starts) | np.isnat(ends)))
+        order = valid[np.lexsort((ends[valid], starts[valid]))]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.labels = [labels[i] for i in order]
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_days(cls, days: Iterable[np.datetime64], labels: Optional[Iterable[Any]] = None) -> "IntervalIndex":
+        days = np.array(list(days), dtype='datetime64[D]')
+        labels = list(labels) if labels is not None else [None] * len(days)
+        index = cls()
+        index._build(days, days, labels)
+        return index
+
+    def covering(self, day: np.datetime64) -> List[int]:
+        # Only intervals starting on or before `day` can cover it
+        limit = int(np.searchsorted(self.starts, day, side='right'))
+        return [int(i) for i in np.flatnonzero(self.ends[:limit] >= day)]
+
+    def overlapping(self, start: np.datetime64, end: np.datetime64) -> List[int]:
+        limit = int(np.searchsorted(self.starts, end, side='right'))
+        return [int(i) for i in np.flatnonzero(self.ends[:limit] >= start)]
+
+    def overlaps(self) -> List[Tuple[int, int]]:
+        # Sweep by start, keeping the intervals still open; output-sensitive
+        pairs = []
+        active: List[int] = []
+        for i in range(len(self.starts)):
+            active = [j for j in active if self.ends[j] >= self.starts[i]]
+            pairs.extend((j, i) for j in active)
+            active.append(i)
+        return pairs
+
+    def _span_breaks(self) -> Tuple[np.ndarray, np.ndarray]:
+        # reach[i] is the furthest end among intervals 0..i; a new merged span starts wherever
+        # the next interval begins more than one day after everything before it has ended
+        reach = np.maximum.accumulate(self.ends)
+        breaks = np.flatnonzero(self.starts[1:] > reach[:-1] + np.timedelta64(1, 'D')) + 1
+        return reach, breaks
+
+    def merged(self) -> List[Tuple[np.datetime64, np.datetime64, Tuple[int, int]]]:
+        # (start, end, (first, last + 1) member range) for each run of touching intervals
+        if not len(self.starts):
+            return []
+        reach, breaks = self._span_breaks()
+        firsts = np.r_[0, breaks]
+        lasts = np.r_[breaks, len(self.starts)]
+        return [(self.starts[a], reach[b - 1], (int(a), int(b))) for a, b in zip(firsts, lasts)]
+
+    def gaps(self, min_days: int = 1) -> List[Dict[str, Any]]:
+        # Uncovered stretches between merged intervals that last at least `min_days`
+        if not len(self.starts):
+            return []
+        reach, breaks = self._span_breaks()
+        lengths = (self.starts[breaks] - reach[breaks - 1]).astype(np.int64) - 1
+        keep = lengths >= min_days
+        return [{
+            "gap_start": str(reach[i - 1] + np.timedelta64(1, 'D')),
+            "gap_end": str(self.starts[i] - np.timedelta64(1, 'D')),
+            "days": int(length),
+            "last_before": self.labels[i - 1],
+            "first_after": self.labels[i]
+        } for i, length in zip(breaks[keep], lengths[keep])]
+
+
+def extract_date_ranges(text: str) -> List[Tuple[np.datetime64, np.datetime64, str]]:
+    ranges = []
+    for match in DATE_RANGE_PATTERN.finditer(text or ""):
+        start, end = parse_date(match.group(1)), parse_date(match.group(2))
+        if not np.isnat(start) and not np.isnat(end):
+            ranges.append((start, end, match.group(0)))
+    return ranges
+
+
+def deadline_status(due: np.datetime64, as_of: np.datetime64, warn_days: int = 90) -> Dict[str, Any]:
+    remaining = int((due - as_of).astype(int))
+    if remaining < 0:
+        status = "expired"
+    elif remaining <= warn_days:
+        status = "urgent"
+    else:
+        status = "upcoming"
+    return {"due_date": str(due), "days_remaining": remaining, "status": status}
+
+
+def add_years(day: np.datetime64, years: int) -> np.datetime64:
+    when = day.astype(object)
+    try:
+        return np.datetime64(when.replace(year=when.year + years), 'D')
+    except ValueError:
+        # Feb 29 -> Feb 28
+        return np.datetime64(when.replace(year=when.year + years, day=28), 'D')
+
+
+def today() -> np.datetime64:
+    return np.datetime64(date.today(), 'D')
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("INTERVAL INDEX BENCHMARK")
+    print("=" * 80)
+
+    rng = np.random.default_rng(11)
+    for count in (1_000, 10_000, 100_000):
+        days = np.datetime64('2018-01-01') + np.sort(rng.integers(0, count * 8, size=count))
+        start = time.perf_counter()
+        index = IntervalIndex.from_days(days, [f"visit_{i}" for i in range(count)])
+        gaps = index.gaps(min_days=30)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>7} treatment dates -> {len(gaps)} gaps >= 30 days in {elapsed * 1000:.1f} ms")
+
+    coverage = IntervalIndex([
+        (parse_date("01/01/2019"), parse_date("07/01/2019"), "Policy A"),
+        (parse_date("06/15/2019"), parse_date("12/31/2019"), "Policy B"),
+        (parse_date("03/01/2020"), parse_date("03/01/2021"), "Policy C"),
+    ])
+    print(f"\nCoverage overlaps: {[(coverage.labels[a], coverage.labels[b]) for a, b in coverage.overlaps()]}")
+    print(f"Coverage gaps: {coverage.gaps()}")
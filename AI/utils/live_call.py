@@ -0,0 +1,266 @@
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .comms_text import TERM_KINDS, TERM_MATCHER, URGENCY_LEVELS, analyze_text, top_keywords, urgency_level
+from .sentiment import LABEL_SCORES, SentimentAnalyzer, get_sentiment_analyzer
+
+ROLLING_SEGMENTS = 6  # Segments in the rolling sentiment window (~30-60 s of conversation)
+NEGATIVE_MEAN_THRESHOLD = -1.0  # Rolling mean at or below "Negative" raises an event
+NEGATIVE_REARM_MARGIN = 0.5  # The mean has to recover this far before the event can fire again
+MIN_SENTIMENT_SEGMENTS = 3  # One curt sentence is not a trend
+ATTORNEY_REVIEW_QUESTIONS = 3  # Same rule as analyze_call_transcript: more than this many questions
+MAX_SEGMENT_CHARS = 2000  # Longer segments are analyzed in pieces, so per-piece work stays bounded
+# Enough of the previous segment to finish any multi-word term split across segments
+TAIL_CHARS = max(len(term) for term in TERM_KINDS)
+
+
+class LiveCallAnalyzer:
+    # Rolling analysis of a call while it is still going on. Feed transcript segments as the
+    # recognizer produces them; add_segment() returns the events that segment triggered:
+    #   urgency           urgency level went up (normal -> high -> urgent)
+    #   escalation        client talks about another lawyer, a bar complaint, ...
+    #   negative_trend    rolling sentiment fell to "Negative" or below
+    #   attorney_review   the call now meets the attorney-review rule
+    # Each segment costs one term scan of the segment (plus a short tail of the previous one, so
+    # "another | lawyer" split across segments still matches) and one sentiment inference.
+    def __init__(self, call_id: str = "", sentiment: Optional[SentimentAnalyzer] = None,
+                 score_sentiment: bool = True, rolling_segments: int = ROLLING_SEGMENTS):
+        self.call_id = call_id
+        self.sentiment = (sentiment or get_sentiment_analyzer()) if score_sentiment else None
+        self.segments = 0
+        self.chars = 0
+        self.duration_seconds = 0.0
+        self.urgency = "normal"
+        self.urgency_terms: Dict[str, None] = {}
+        self.action_items: List[Dict[str, Any]] = []
+        self.questions: List[Dict[str, Any]] = []
+        self.keyword_counts: Counter = Counter()
+        self.words = 0
+        self.trajectory: List[Dict[str, Any]] = []
+        self.rolling: "deque[Tuple[float, float]]" = deque(maxlen=rolling_segments)
+        self.opening: List[float] = []
+        self.negative_active = False
+        self.review_flagged = False
+        self.events: List[Dict[str, Any]] = []
+        self._tail = ""
+        self.processing_seconds = 0.0
+        self.max_segment_ms = 0.0
+        self.last_activity = time.monotonic()  # For servers dropping calls that were never ended
+
+    def add_segment(self, text: str, start_seconds: Optional[float] = None,
+                    end_seconds: Optional[float] = None, speaker: Optional[str] = None) -> List[Dict[str, Any]]:
+        # A segment over MAX_SEGMENT_CHARS is analyzed as several consecutive segments
+        started = time.perf_counter()
+        self.last_activity = time.monotonic()
+        if end_seconds is not None:
+            self.duration_seconds = max(self.duration_seconds, end_seconds)
+        at = end_seconds if end_seconds is not None else self.duration_seconds
+        pieces = split_segment((text or "").strip())
+        if not pieces:
+            self.segments += 1
+            return []
+
+        events: List[Dict[str, Any]] = []
+        for piece in pieces:
+            events.extend(self._add_piece(piece, at, speaker))
+        self.events.extend(events)
+        elapsed = time.perf_counter() - started
+        self.processing_seconds += elapsed
+        self.max_segment_ms = max(self.max_segment_ms, elapsed * 1000)
+        return events
+
+    def _add_piece(self, text: str, at: float, speaker: Optional[str]) -> List[Dict[str, Any]]:
+        index = self.segments
+        self.segments += 1
+        events: List[Dict[str, Any]] = []
+
+        # Each segment is one line of the running transcript
+        result = analyze_text(text, first_line=index, first_char=self.chars)
+        self.chars += len(text) + 1
+        self.words += result['word_count']
+        self.keyword_counts.update(text.lower().split())
+        for item in result['action_items']:
+            self.action_items.append(dict(item, seconds=at, speaker=speaker))
+        for question in result['questions']:
+            self.questions.append(dict(question, seconds=at, speaker=speaker))
+
+        terms = dict.fromkeys(result['urgency_terms'])
+        terms.update(dict.fromkeys(self._boundary_terms(text)))
+        new_terms = [term for term in terms if term not in self.urgency_terms]
+        self.urgency_terms.update(dict.fromkeys(new_terms))
+        escalations = [term for term in new_terms if TERM_KINDS[term] == "escalation"]
+        if escalations:
+            events.append(self._event("escalation", index, at, speaker, text, terms=escalations))
+        level = urgency_level(self.urgency_terms)
+        if URGENCY_LEVELS.index(level) > URGENCY_LEVELS.index(self.urgency):
+            events.append(self._event("urgency", index, at, speaker, text, level=level, previous=self.urgency,
+                                      terms=[term for term in new_terms if TERM_KINDS[term] != "action"]))
+            self.urgency = level
+
+        if self.sentiment is not None:
+            events.extend(self._score(text, index, at, speaker))
+
+        if not self.review_flagged and (self.urgency == "urgent" or len(self.questions) > ATTORNEY_REVIEW_QUESTIONS):
+            self.review_flagged = True
+            reason = "urgent" if self.urgency == "urgent" else f"{len(self.questions)} questions"
+            events.append(self._event("attorney_review", index, at, speaker, text, reason=reason))
+        return events
+
+    def _boundary_terms(self, text: str) -> List[str]:
+        # Terms that start in the previous segment's tail and end in this one
+        tail = self._tail
+        joined = f"{tail} {text}".lower() if tail else ""
+        self._tail = text[-TAIL_CHARS:].split(" ", 1)[-1] if len(text) > TAIL_CHARS else text
+        if not joined:
+            return []
+        return [term for offset, term in TERM_MATCHER.find_all(joined)
+                if offset < len(tail) < offset + len(term) and TERM_KINDS[term] != "action"]
+
+    def _score(self, text: str, index: int, at: float, speaker: Optional[str]) -> List[Dict[str, Any]]:
+        emotion = self.sentiment.analyze(text)
+        score = LABEL_SCORES.get(emotion['primary_emotion'], 0.0)
+        self.trajectory.append({"segment": index, "seconds": at, "speaker": speaker, "score": score, **emotion})
+        self.rolling.append((score, emotion['confidence']))
+        if len(self.opening) < self.rolling.maxlen:
+            self.opening.append(score)
+
+        mean = self.rolling_mean
+        if len(self.rolling) < MIN_SENTIMENT_SEGMENTS:
+            return []
+        if not self.negative_active and mean <= NEGATIVE_MEAN_THRESHOLD:
+            self.negative_active = True
+            return [self._event("negative_trend", index, at, speaker, text, rolling_mean=round(mean, 3),
+                                trend=round(mean - self.opening_mean, 3))]
+        if self.negative_active and mean > NEGATIVE_MEAN_THRESHOLD + NEGATIVE_REARM_MARGIN:
+            self.negative_active = False
+        return []
+
+    @property
+    def rolling_mean(self) -> float:
+        # Confidence-weighted, like the whole-transcript trajectory
+        total = sum(confidence for _, confidence in self.rolling) or 1.0
+        return sum(score * confidence for score, confidence in self.rolling) / total
+
+    @property
+    def opening_mean(self) -> float:
+        return sum(self.opening) / len(self.opening) if self.opening else 0.0
+
+    def _event(self, kind: str, index: int, at: float, speaker: Optional[str], text: str, **detail) -> Dict[str, Any]:
+        return {"type": kind, "call_id": self.call_id, "segment": index, "seconds": round(at, 2),
+                "speaker": speaker, "text": text, **detail}
+
+    def snapshot(self, keyword_limit: int = 10) -> Dict[str, Any]:
+        # Current state in the shape of analyze_call_transcript's result, plus the event log
+        emotion: Dict[str, Any] = {"primary_emotion": "Neutral", "confidence": 0.0}
+        if self.trajectory:
+            mean = self.rolling_mean
+            emotion = {
+                "primary_emotion": min(LABEL_SCORES, key=lambda name: abs(LABEL_SCORES[name] - mean)),
+                "confidence": round(sum(confidence for _, confidence in self.rolling) / len(self.rolling), 4),
+                "rolling_score": round(mean, 3),
+                "opening_score": round(self.opening_mean, 3),
+                "trend": round(mean - self.opening_mean, 3),
+                "trajectory": self.trajectory
+            }
+        return {
+            "call_id": self.call_id,
+            "segments": self.segments,
+            "seconds": round(self.duration_seconds, 2),
+            "emotion_analysis": emotion,
+            "key_topics": top_keywords(self.keyword_counts, keyword_limit),
+            "questions_asked": [question['text'] for question in self.questions],
+            "action_items": [item['text'] for item in self.action_items],
+            "urgency_level": self.urgency,
+            "urgency_terms": list(self.urgency_terms),
+            "follow_up_required": bool(self.action_items) or self.urgency in ["high", "urgent"],
+            "summary_length": self.words,
+            "requires_attorney_review": self.review_flagged,
+            "events": self.events,
+            "processing_ms": round(self.processing_seconds * 1000, 1),
+            "max_segment_ms": round(self.max_segment_ms, 2)
+        }
+
+
+def split_segment(text: str, limit: int = MAX_SEGMENT_CHARS) -> List[str]:
+    # Pieces of at most `limit` characters, cut at the last space before the limit where there is one
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def replay_segments(transcript: str, duration_seconds: float,
+                    words_per_segment: int = 12) -> Iterator[Tuple[str, float, float]]:
+    # Splits a finished transcript into evenly timed (text, start, end) segments, the way a
+    # streaming recognizer would deliver it, for tests and demos
+    words = transcript.split()
+    if not words:
+        return
+    seconds_per_word = duration_seconds / len(words) if duration_seconds else 0.0
+    for begin in range(0, len(words), words_per_segment):
+        chunk = words[begin:begin + words_per_segment]
+        yield " ".join(chunk), begin * seconds_per_word, (begin + len(chunk)) * seconds_per_word
+
+
+def replay(analyzer: LiveCallAnalyzer, segments, realtime: bool = False) -> List[Dict[str, Any]]:
+    # Feeds (text, start, end) segments to the analyzer; with realtime=True it waits for each
+    # segment's end time, so events appear when they would on a live call
+    started = time.perf_counter()
+    events = []
+    for text, start, end in segments:
+        if realtime:
+            time.sleep(max(0.0, end - (time.perf_counter() - started)))
+        events.extend(analyzer.add_segment(text, start, end))
+    return events
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+
+    parser = argparse.ArgumentParser(description="Replay the sample call transcripts as live calls")
+    parser.add_argument("--no-sentiment", action="store_true", help="Skip the sentiment model (terms only)")
+    parser.add_argument("--realtime", action="store_true", help="Pace segments at the recording's speed")
+    parser.add_argument("--words-per-segment", type=int, default=12)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("LIVE CALL ANALYSIS REPLAY")
+    print("=" * 80)
+
+    results_path = os.path.join(os.path.dirname(__file__), "..", "data", "out", "docu_agent_test_results.json")
+    with open(results_path, 'r') as f:
+        processed = json.load(f)
+    calls = [entry for case in processed.values() for entry in case.get('files_processed', [])
+             if entry.get('audio_path') and entry.get('text')]
+    # A call that goes wrong halfway through, built from the same material
+    calls.append({
+        "filename": "escalating call (synthetic)",
+        "duration_seconds": 60.0,
+        "text": calls[0]['text'] + " honestly this is taking way too long and nobody calls me back I'm "
+                "thinking of getting another lawyer if I don't hear something this week"
+    })
+
+    per_segment = []
+    for call in calls:
+        analyzer = LiveCallAnalyzer(call['filename'], score_sentiment=not args.no_sentiment)
+        segments = list(replay_segments(call['text'], call['duration_seconds'], args.words_per_segment))
+        events = replay(analyzer, segments, realtime=args.realtime)
+        state = analyzer.snapshot()
+        per_segment.append(analyzer.processing_seconds / max(analyzer.segments, 1))
+        print(f"\n{call['filename']} ({call['duration_seconds']:.0f} s, {len(segments)} segments): "
+              f"urgency {state['urgency_level']}, {len(state['action_items'])} action items, "
+              f"{len(state['questions_asked'])} questions, max {state['max_segment_ms']:.2f} ms/segment")
+        for event in events:
+            detail = {key: value for key, value in event.items()
+                      if key not in ("type", "call_id", "segment", "seconds", "speaker", "text")}
+            print(f"  {event['seconds']:6.1f} s  {event['type']:<16} {detail}  \"{event['text'][:60]}\"")
+
+    print(f"\nMean work per segment: {sum(per_segment) / len(per_segment) * 1000:.2f} ms")
@@ -0,0 +1,39 @@
+import os
+from typing import Any, Dict, Optional
+from google import genai
+from google.genai import types
+from .redaction import Redactor
+
+MODEL_ID = "gemini-2.5-flash"
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+
+class GeminiBackend:
+    def __init__(self, api_key: Optional[str] = None, model_id: str = MODEL_ID, redactor: Optional[Redactor] = None,
+                 timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable or api_key parameter required")
+
+        # Per-request HTTP timeout (the SDK takes milliseconds), so a hung call cannot block a tool forever
+        self.client = genai.Client(api_key=self.api_key,
+                                   http_options=types.HttpOptions(timeout=int(timeout_seconds * 1000)))
+        self.model_id = model_id
+        # Every outbound prompt is redacted and every answer restored with the same token map,
+        # which stays in this process. Pass the caller's redactor so both sides share one vault.
+        self.redactor = redactor if redactor is not None else Redactor()
+
+    def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]] = None) -> str:
+        config = None
+        if response_schema is not None:
+            config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema
+            )
+
+        response = self.client.models.generate_content(
+            model=self.model_id,
+            contents=self.redactor.redact(prompt),
+            config=config
+        )
+        return self.redactor.restore(response.text or "")
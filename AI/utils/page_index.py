@@ -0,0 +1,126 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PageIndex:
+    # Offset table for text concatenated from pages: page_starts[i] is the offset of page i + 1.
+    # `lines` optionally holds, per page, flat [offset, x, y, offset, x, y, ...] runs taken from
+    # the PDF text layer so a hit can be located on the page as well.
+    def __init__(self, page_starts: List[int], text_length: int, lines: Optional[List[List[float]]] = None):
+        self.page_starts = array('q', page_starts)
+        self.text_length = text_length
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.page_starts)
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.page_starts)
+
+    def page_of(self, offset: int) -> int:
+        # 1-based page number, O(log n)
+        if offset < 0 or not self.page_starts:
+            return 0
+        return bisect_right(self.page_starts, offset)
+
+    def page_span(self, page: int) -> Tuple[int, int]:
+        if page < 1 or page > len(self.page_starts):
+            raise ValueError(f"Page {page} out of range (1-{len(self.page_starts)})")
+        end = self.page_starts[page] if page < len(self.page_starts) else self.text_length
+        return self.page_starts[page - 1], end
+
+    def slice_pages(self, text: str, first: int, last: Optional[int] = None) -> str:
+        start, _ = self.page_span(first)
+        _, end = self.page_span(last or first)
+        return text[start:end]
+
+    def locate(self, offset: int) -> Dict[str, Any]:
+        page = self.page_of(offset)
+        location: Dict[str, Any] = {"page": page}
+        if self.lines and 0 < page <= len(self.lines):
+            runs = self.lines[page - 1]
+            run_offsets = runs[0::3]
+            index = bisect_right(run_offsets, offset) - 1
+            if index >= 0:
+                location["line"] = index + 1
+                location["x"] = runs[index * 3 + 1]
+                location["y"] = runs[index * 3 + 2]
+        return location
+
+    def transform_pages(self, text: str, transform) -> Tuple[str, "PageIndex"]:
+        # Applies transform(page_text) page by page (e.g. redaction) and rebuilds the offsets.
+        # Layout runs keep their position relative to the start of their page.
+        pieces: List[str] = []
+        page_starts: List[int] = []
+        lines: Optional[List[List[float]]] = [] if self.lines is not None else None
+        offset = 0
+
+        for page in range(1, len(self.page_starts) + 1):
+            start, end = self.page_span(page)
+            page_text = transform(text[start:end])
+            page_starts.append(offset)
+            if lines is not None:
+                runs = list(self.lines[page - 1]) if page <= len(self.lines) else []
+                shift = offset - start
+                for i in range(0, len(runs), 3):
+                    runs[i] = min(runs[i] + shift, offset + max(len(page_text) - 1, 0))
+                lines.append(runs)
+            pieces.append(page_text)
+            offset += len(page_text)
+
+        return "".join(pieces), PageIndex(page_starts, offset, lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"page_starts": list(self.page_starts), "text_length": self.text_length}
+        if self.lines is not None:
+            result["lines"] = self.lines
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PageIndex":
+        return cls(data["page_starts"], data["text_length"], data.get("lines"))
+
+    @classmethod
+    def from_result(cls, file_result: Dict[str, Any]) -> Optional["PageIndex"]:
+        data = file_result.get('page_index')
+        return cls.from_dict(data) if data else None
+
+
+def extract_pdf_pages(pdf_reader, with_layout: bool = False) -> Tuple[str, PageIndex]:
+    # Same text as joining page.extract_text() + "\n", plus the per-page offset table
+    pieces: List[str] = []
+    page_starts: List[int] = []
+    lines: Optional[List[List[float]]] = [] if with_layout else None
+    offset = 0
+
+    for page in pdf_reader.pages:
+        runs: List[Tuple[str, float, float]] = []
+        if with_layout:
+            def visitor(run_text, cm, tm, font_dict, font_size):
+                if run_text and run_text.strip():
+                    # Text-space origin mapped through the current transformation matrix
+                    x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                    y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                    runs.append((run_text.strip(), round(x, 1), round(y, 1)))
+            page_text = page.extract_text(visitor_text=visitor)
+        else:
+            page_text = page.extract_text()
+
+        page_starts.append(offset)
+        if with_layout:
+            flat: List[float] = []
+            cursor = 0
+            for run_text, x, y in runs:
+                found = page_text.find(run_text, cursor)
+                if found < 0:
+                    continue
+                flat.extend((offset + found, x, y))
+                cursor = found + len(run_text)
+            lines.append(flat)
+
+        pieces.append(page_text + "\n")
+        offset += len(page_text) + 1
+
+    return "".join(pieces), PageIndex(page_starts, offset, lines)
@@ -0,0 +1,283 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from .redaction import Redactor
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # Statutes and case law change slowly; a week keeps results fresh enough
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_COMPACT_EVERY = 200  # Journal lines before the snapshot is rewritten and the journal dropped
+JOURNAL_SUFFIX = ".journal"
+CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+QUERY_STOPWORDS = {
+    "a", "an", "and", "are", "for", "how", "in", "is", "of", "on", "or", "the", "to", "what", "when", "which", "with"
+}
+
+
+def normalize_query(query: str) -> str:
+    # Case, punctuation and filler words do not change what a legal search returns:
+    # "What is the Florida PIP exhaustion statute?" ~ "florida pip exhaustion statute".
+    # Word order does ("insurer sued by the insured" is not "insured sued by the insurer"), so it is kept.
+    tokens = re.findall(r"[a-z0-9]+(?:\.[0-9]+)*", query.lower())
+    return " ".join(token for token in tokens if token not in QUERY_STOPWORDS)
+
+
+class OfflineSearchBackend:
+    # Canned results keyed by normalized query, for tests and offline runs. `results` maps a
+    # query (any phrasing) to [{"title", "link", "snippet"}, ...]; `path` is a JSON file of the same
+    def __init__(self, results: Optional[Dict[str, List[Dict[str, str]]]] = None, path: Optional[str] = None,
+                 latency_seconds: float = 0.0):
+        if path:
+            with open(path, 'r') as f:
+                results = {**json.load(f), **(results or {})}
+        self.results = {normalize_query(query): items for query, items in (results or {}).items()}
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict[str, str]]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return list(self.results.get(normalize_query(query), []))[:num_results]
+
+
+class CustomSearchBackend:
+    # Google Programmable Search JSON API. Queries are redacted first, so client names or claim
+    # numbers typed into a research question never leave the process.
+    def __init__(self, api_key: Optional[str] = None, engine_id: Optional[str] = None,
+                 redactor: Optional[Redactor] = None, timeout: float = 10.0):
+        import requests
+
+        self.api_key = api_key or os.getenv("GOOGLE_SEARCH_API_KEY")
+        self.engine_id = engine_id or os.getenv("GOOGLE_SEARCH_ENGINE_ID")
+        if not self.api_key or not self.engine_id:
+            raise ValueError("GOOGLE_SEARCH_API_KEY and GOOGLE_SEARCH_ENGINE_ID environment variables required")
+        self.session = requests.Session()
+        self.redactor = redactor if redactor is not None else Redactor()
+        self.timeout = timeout
+        self.calls = 0
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict[str, str]]:
+        self.calls += 1
+        response = self.session.get(CUSTOM_SEARCH_URL, timeout=self.timeout, params={
+            "key": self.api_key,
+            "cx": self.engine_id,
+            "q": self.redactor.redact(query),
+            "num": max(1, min(num_results, 10))
+        })
+        response.raise_for_status()
+        return [{
+            "title": item.get("title", ""),
+            "link": item.get("link", ""),
+            "snippet": item.get("snippet", "")
+        } for item in response.json().get("items", [])]
+
+
+def search_backend_from_env():
+    # LEXILOOP_SEARCH_FIXTURES (a JSON file of canned results) wins over the live API keys
+    fixtures = os.getenv("LEXILOOP_SEARCH_FIXTURES")
+    if fixtures:
+        return OfflineSearchBackend(path=fixtures)
+    if os.getenv("GOOGLE_SEARCH_API_KEY") and os.getenv("GOOGLE_SEARCH_ENGINE_ID"):
+        return CustomSearchBackend()
+    return None
+
+
+class SearchCache:
+    # LRU of search results keyed by normalized query, with a TTL and an optional JSON file so
+    # results survive restarts. `backend` is anything with search(query, num_results) -> list.
+    # A miss appends one line to `<path>.journal`; the snapshot at `path` is only rewritten every
+    # `compact_every` misses (and on save()), so a miss costs one small write, not the whole file.
+    def __init__(self, backend, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, stale_on_error: bool = True,
+                 compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.backend = backend
+        self.path = path
+        self.journal_path = f"{path}{JOURNAL_SUFFIX}" if path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stale_on_error = stale_on_error
+        self.compact_every = compact_every
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()  # Journal appends vs. snapshot rewrites
+        self._journal_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stale_served = 0
+        self.evictions = 0
+        self.snapshots = 0
+        self.backend_seconds = 0.0
+
+        if path:
+            self._load()
+
+    def _load(self):
+        stored: List[Dict[str, Any]] = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                stored.extend(json.load(f).values())
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        stored.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from an interrupted write
+                    self._journal_lines += 1
+        now = time.time()
+        # Keys are re-derived from the stored query, so entries survive changes to normalize_query
+        for entry in stored:
+            if now - entry['fetched_at'] < self.ttl_seconds:
+                key = normalize_query(entry['query'])
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query: str, num_results: int = 5) -> Dict[str, Any]:
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['fetched_at'] >= self.ttl_seconds:
+                self.expired += 1
+            elif entry is not None and (entry['requested'] >= num_results or len(entry['results']) < entry['requested']):
+                # Reusable unless more results are wanted than were asked for and the backend had more
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._response(query, key, entry, num_results, cached=True)
+            self.misses += 1
+
+        start = time.perf_counter()
+        try:
+            results = self.backend.search(query, num_results)
+        except Exception:
+            if entry is None or not self.stale_on_error:
+                raise
+            # Backend down: an old answer beats none
+            self.stale_served += 1
+            return dict(self._response(query, key, entry, num_results, cached=True), stale=True)
+        finally:
+            self.backend_seconds += time.perf_counter() - start
+
+        entry = {"query": query, "results": results, "requested": num_results, "fetched_at": time.time()}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        self._append(entry)
+        return self._response(query, key, entry, num_results, cached=False)
+
+    def _response(self, query: str, key: str, entry: Dict[str, Any], num_results: int, cached: bool) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "normalized_query": key,
+            "results": entry['results'][:num_results],
+            "cached": cached,
+            "age_seconds": round(time.time() - entry['fetched_at'], 1)
+        }
+
+    def _append(self, entry: Dict[str, Any]):
+        if not self.path:
+            return
+        with self._file_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+            self._journal_lines += 1
+            compact = self._journal_lines >= self.compact_every
+        if compact:
+            self.save()
+
+    def save(self):
+        # Rewrites the snapshot from memory and drops the journal it now contains
+        if not self.path:
+            return
+        with self._file_lock:
+            with self._lock:
+                snapshot = dict(self._entries)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_lines = 0
+            self.snapshots += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.save()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "stale_served": self.stale_served,
+            "evictions": self.evictions,
+            "snapshots_written": self.snapshots,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "backend_ms": round(self.backend_seconds * 1000, 1)
+        }
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    print("=" * 80)
+    print("SEARCH CACHE BENCHMARK")
+    print("=" * 80)
+
+    topics = [
+        "Florida PIP exhaustion statute", "Florida statute of limitations negligence 2023",
+        "comparative fault Florida 768.81", "Medicare conditional payment lien reimbursement",
+        "bad faith failure to tender policy limits Florida", "permanent injury threshold 627.737",
+        "collateral source rule Florida", "letter of protection medical bills admissibility"
+    ]
+    phrasings = ["{}", "{} ", "the {}", "{} statute", "What is the {}?", "{} case law"]
+    canned = {f"{phrasing.format(topic)}": [{"title": topic, "link": f"https://example.com/{i}", "snippet": topic}]
+              for i, topic in enumerate(topics) for phrasing in phrasings}
+
+    random.seed(4)
+    workload = [random.choice(phrasings).format(random.choice(topics)) for _ in range(200)]
+    backend = OfflineSearchBackend(canned, latency_seconds=0.05)  # a fast real search round trip
+
+    start = time.perf_counter()
+    for query in workload[:40]:
+        backend.search(query)
+    uncached = (time.perf_counter() - start) / 40 * len(workload)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search_cache.json")
+        backend.calls = 0
+        cache = SearchCache(backend, path=path)
+        start = time.perf_counter()
+        for query in workload:
+            cache.search(query)
+        cached = time.perf_counter() - start
+        print(f"\n{len(workload)} research queries over {len(topics)} topics")
+        print(f"Uncached: {uncached * 1000:.0f} ms (estimated, {len(workload)} backend calls)")
+        print(f"Cached:   {cached * 1000:.0f} ms ({backend.calls} backend calls), stats {cache.stats}")
+
+        restarted = SearchCache(backend, path=path)
+        backend.calls = 0
+        for query in workload:
+            restarted.search(query)
+        print(f"After a restart: {backend.calls} backend calls, hit rate {restarted.stats['hit_rate']}")
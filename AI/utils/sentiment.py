@@ -0,0 +1,477 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SENTIMENT_MODEL = "tabularisai/multilingual-sentiment-analysis"
+MAX_MESSAGE_CHARS = 1600  # ~400 tokens, safely under the model's 512-token limit
+DEFAULT_BATCH_SIZE = 32
+WINDOW_TOKENS = 256
+WINDOW_STRIDE_TOKENS = 192  # 64 tokens of overlap so a sentence cut at one edge is whole in the next window
+CHARS_PER_TOKEN = 4  # Window sizing when the pipeline has no tokenizer to ask
+# The model's five classes on a signed scale, so windows can be averaged and compared
+LABEL_SCORES = {"Very Negative": -2.0, "Negative": -1.0, "Neutral": 0.0, "Positive": 1.0, "Very Positive": 2.0}
+RESULT_CACHE_SIZE = 10_000
+# Saved int8 models, one file per model and torch version (see export_quantized_model)
+QUANTIZED_MODEL_DIR = os.getenv("SENTIMENT_INT8_DIR",
+                                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             "data", "sentiment_int8"))
+
+_pipelines: Dict[Tuple[str, bool], Any] = {}
+_pipelines_lock = threading.Lock()
+
+
+def set_inference_threads(threads: Optional[int]):
+    # Intra-op threads for torch on this process. Several uvicorn workers on one node should
+    # split the cores between them rather than each spinning up one thread per core.
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def quantized_model_path(model: str = SENTIMENT_MODEL) -> str:
+    # The pickled int8 module is tied to the torch version that wrote it
+    import torch
+
+    name = f"{model.strip('/').replace('/', '--')}.torch-{torch.__version__}.int8.pt"
+    return os.path.join(QUANTIZED_MODEL_DIR, name)
+
+
+def _quantize_and_save(model: str, path: str):
+    # Runs in a throwaway process: the fp32 weights it loads are gone when the process exits
+    import tempfile
+
+    import torch
+    from torch.ao.quantization import default_dynamic_qconfig, float_qparams_weight_only_qconfig
+    from transformers import AutoModelForSequenceClassification
+
+    classifier = AutoModelForSequenceClassification.from_pretrained(model)
+    classifier.eval()
+    # Linear layers get dynamic int8 matmuls; the embedding table, most of this model's
+    # weights, is stored as per-row int8
+    classifier = torch.ao.quantization.quantize_dynamic(
+        classifier, {torch.nn.Linear: default_dynamic_qconfig, torch.nn.Embedding: float_qparams_weight_only_qconfig},
+        dtype=torch.qint8)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save(classifier, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def export_quantized_model(model: str = SENTIMENT_MODEL) -> str:
+    # Builds the int8 model once per model and torch version. Quantizing in the serving process
+    # would leave its peak RSS at fp32 plus int8; a spawned child pays that peak and exits.
+    # Not callable from a daemonic process (e.g. a multiprocessing.Pool worker).
+    import multiprocessing
+
+    path = quantized_model_path(model)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        process = multiprocessing.get_context("spawn").Process(target=_quantize_and_save, args=(model, path))
+        process.start()
+        process.join()
+        if process.exitcode != 0 or not os.path.exists(path):
+            raise RuntimeError(f"Quantizing {model} failed (exit code {process.exitcode})")
+    return path
+
+
+def get_sentiment_pipeline(model: str = SENTIMENT_MODEL, quantize: bool = False, threads: Optional[int] = None):
+    # One pipeline per model and precision per process; loading the tokenizer and weights takes seconds.
+    # quantize=True serves the int8 model from export_quantized_model: Linear layers run on int8
+    # kernels (~3x lower single-message latency) and the embedding table is int8 as well. fp32 weights
+    # are mmapped from safetensors and grow resident as vocabulary rows are used, to ~600 MB over the
+    # import baseline once all of them have been; the int8 model holds ~240 MB from load onwards.
+    # The fp32 weights never enter this process, so load does not peak above that either.
+    key = (model, quantize)
+    with _pipelines_lock:
+        set_inference_threads(threads)
+        if key not in _pipelines:
+            from transformers import AutoTokenizer, pipeline
+
+            if quantize:
+                import torch
+
+                # Our own cache file, written by _quantize_and_save, so unpickling it is safe
+                classifier = torch.load(export_quantized_model(model), weights_only=False)
+                classifier.eval()
+                _pipelines[key] = pipeline("text-classification", model=classifier,
+                                           tokenizer=AutoTokenizer.from_pretrained(model), device=-1,
+                                           truncation=True, max_length=512)
+            else:
+                _pipelines[key] = pipeline("text-classification", model=model, truncation=True, max_length=512)
+        return _pipelines[key]
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+class SentimentAnalyzer:
+    # Shared front end to the sentiment model: results are cached by text hash and cache misses
+    # are sorted by length and run in batches, so similar-length texts share padding.
+    # `pipe` is anything called as pipe(texts, batch_size=n) -> [{"label", "score"}, ...];
+    # by default the process-wide transformers pipeline, int8-quantized when `quantize` is set.
+    def __init__(self, model: str = SENTIMENT_MODEL, batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache_size: int = RESULT_CACHE_SIZE, pipe: Optional[Callable] = None,
+                 quantize: bool = False, threads: Optional[int] = None):
+        self.model = model
+        self.quantize = quantize
+        self.threads = threads
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._pipe = pipe
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._inference_lock = threading.Lock()  # pipelines are not safe to call concurrently
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.inference_seconds = 0.0
+
+    @property
+    def pipe(self):
+        if self._pipe is None:
+            self._pipe = get_sentiment_pipeline(self.model, quantize=self.quantize, threads=self.threads)
+        return self._pipe
+
+    def warm_up(self):
+        # Loads the model and runs one tiny batch so the first real request pays nothing extra
+        start = time.perf_counter()
+        with self._inference_lock:
+            self.pipe(["warm up"], batch_size=1)
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def _infer(self, texts: List[str]) -> List[Dict[str, Any]]:
+        # Length-sorted batches; results come back in input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        start = time.perf_counter()
+        with self._inference_lock:
+            for begin in range(0, len(order), self.batch_size):
+                batch = order[begin:begin + self.batch_size]
+                outputs = self.pipe([texts[i] for i in batch], batch_size=len(batch))
+                self.batches += 1
+                for i, output in zip(batch, outputs):
+                    results[i] = {"primary_emotion": output['label'], "confidence": float(output['score'])}
+        self.inference_seconds += time.perf_counter() - start
+        return results
+
+    def analyze_many(self, messages: List[str], max_chars: Optional[int] = MAX_MESSAGE_CHARS) -> List[Dict[str, Any]]:
+        # max_chars=None leaves length to the pipeline's own 512-token truncation
+        texts = [(message or "")[:max_chars] for message in messages]
+        keys = [text_key(text) for text in texts]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending: Dict[str, Tuple[str, List[int]]] = {}
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = dict(cached)
+                    self.hits += 1
+                else:
+                    # Duplicates within one call are inferred once
+                    pending.setdefault(key, (texts[i], []))[1].append(i)
+                    self.misses += 1
+
+        if pending:
+            pending_keys = list(pending)
+            inferred = self._infer([pending[key][0] for key in pending_keys])
+            with self._cache_lock:
+                for key, result in zip(pending_keys, inferred):
+                    for i in pending[key][1]:
+                        results[i] = dict(result)
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def analyze(self, message: str) -> Dict[str, Any]:
+        return self.analyze_many([message])[0]
+
+    def windows(self, text: str, window_tokens: int = WINDOW_TOKENS,
+                stride_tokens: int = WINDOW_STRIDE_TOKENS) -> List[Tuple[int, int]]:
+        # (start, end) character spans of overlapping token windows covering the whole text
+        tokenizer = getattr(self.pipe, "tokenizer", None)
+        if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+            offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        else:
+            offsets = [(i, min(i + CHARS_PER_TOKEN, len(text))) for i in range(0, len(text), CHARS_PER_TOKEN)]
+        if not offsets:
+            return []
+        spans = []
+        for begin in range(0, len(offsets), stride_tokens):
+            last = min(begin + window_tokens, len(offsets)) - 1
+            spans.append((offsets[begin][0], offsets[last][1]))
+            if last == len(offsets) - 1:
+                break
+        return spans
+
+    def analyze_transcripts(self, transcripts: List[str], window_tokens: int = WINDOW_TOKENS,
+                            stride_tokens: int = WINDOW_STRIDE_TOKENS) -> List[Dict[str, Any]]:
+        # Every window of every transcript goes through one analyze_many call, so throughput is
+        # set by the batch size rather than by one model call per window
+        spans = [self.windows(text, window_tokens, stride_tokens) for text in transcripts]
+        flat = [text[start:end] for text, text_spans in zip(transcripts, spans) for start, end in text_spans]
+        results = iter(self.analyze_many(flat, max_chars=None))
+        return [self._trajectory(text, text_spans, [next(results) for _ in text_spans])
+                for text, text_spans in zip(transcripts, spans)]
+
+    def analyze_transcript(self, transcript: str, **kwargs) -> Dict[str, Any]:
+        return self.analyze_transcripts([transcript], **kwargs)[0]
+
+    @staticmethod
+    def _trajectory(text: str, spans: List[Tuple[int, int]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not results:
+            return {"primary_emotion": "Neutral", "confidence": 0.0, "windows": 0, "trajectory": []}
+        length = max(len(text), 1)
+        trajectory = [{
+            "position": round(start / length, 3),
+            "start_char": start,
+            "end_char": end,
+            "primary_emotion": result['primary_emotion'],
+            "confidence": round(result['confidence'], 4),
+            "score": LABEL_SCORES.get(result['primary_emotion'], 0.0)
+        } for (start, end), result in zip(spans, results)]
+
+        # Confidence-weighted mean on the signed scale, mapped back to the nearest label
+        weights = [point['confidence'] for point in trajectory]
+        total_weight = sum(weights) or 1.0
+        mean = sum(point['score'] * weight for point, weight in zip(trajectory, weights)) / total_weight
+        label = min(LABEL_SCORES, key=lambda name: abs(LABEL_SCORES[name] - mean))
+        third = max(1, len(trajectory) // 3)
+        opening = sum(point['score'] for point in trajectory[:third]) / third
+        closing = sum(point['score'] for point in trajectory[-third:]) / third
+        lowest = min(trajectory, key=lambda point: (point['score'], -point['confidence']))
+        distribution: Dict[str, int] = {}
+        for point in trajectory:
+            distribution[point['primary_emotion']] = distribution.get(point['primary_emotion'], 0) + 1
+
+        return {
+            "primary_emotion": label,
+            "confidence": round(total_weight / len(trajectory), 4),
+            "mean_score": round(mean, 3),
+            "opening_score": round(opening, 3),
+            "closing_score": round(closing, 3),
+            "trend": round(closing - opening, 3),
+            "closing_emotion": trajectory[-1]['primary_emotion'],
+            "most_negative": {key: lowest[key] for key in ("position", "primary_emotion", "confidence")},
+            "distribution": distribution,
+            "windows": len(trajectory),
+            "trajectory": trajectory
+        }
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "quantized": self.quantize,
+            "cached_results": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "batches": self.batches,
+            "inference_ms": round(self.inference_seconds * 1000, 1)
+        }
+
+
+_analyzer: Optional[SentimentAnalyzer] = None
+_analyzer_lock = threading.Lock()
+
+
+def get_sentiment_analyzer() -> SentimentAnalyzer:
+    # Process-wide analyzer so every agent instance shares the model and the result cache.
+    # SENTIMENT_QUANTIZE=1 serves the int8 model; SENTIMENT_THREADS caps torch's intra-op threads.
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            threads = os.getenv("SENTIMENT_THREADS")
+            _analyzer = SentimentAnalyzer(quantize=os.getenv("SENTIMENT_QUANTIZE", "0") == "1",
+                                          threads=int(threads) if threads else None)
+        return _analyzer
+
+
+# Client messages the model was never tuned or spot-checked on, for comparing inference modes
+HELD_OUT_MESSAGES = [
+    "Hi, just checking in. Any news on the settlement offer?",
+    "I can't sleep because of the pain in my neck and nobody seems to care.",
+    "The physical therapist said I'm making good progress, thought you'd want to know!",
+    "Why did the insurance company deny my claim?? I did everything you told me to do.",
+    "Please call me back when you get a chance, it's about my car rental.",
+    "I'm so grateful for your help. My family and I feel like we finally have someone on our side.",
+    "My boss is threatening to fire me if I keep missing work for doctor appointments.",
+    "Ok.",
+    "Did you get the photos I sent of the car? The bumper is completely smashed.",
+    "This is ridiculous. I was promised a call last Friday and I'm still waiting.",
+    "The MRI results came back and the doctor says I have a herniated disc. I'm scared about surgery.",
+    "Thanks for explaining the lien process, that makes a lot more sense now.",
+    "Can I still go to my chiropractor if the PIP money has run out?",
+    "I feel like I'm being ignored. I've left three voicemails this week.",
+    "Great news about the policy limits! When do I sign the release?",
+    "The other driver's insurance keeps calling me directly. Should I answer?",
+    "I'm a little confused about the paperwork but I'll figure it out.",
+    "You guys are amazing, thank you for fighting for me.",
+    "Honestly I'm starting to regret signing with your firm.",
+    "My medical bills are piling up and collections agencies are calling every day.",
+    "Lo siento, no entiendo la carta que me enviaron. ¿Me pueden llamar?",
+    "Estoy muy agradecida por todo lo que han hecho por mi caso.",
+    "Appointment confirmed for Tuesday at 3pm.",
+    "I don't think $15,000 is fair after everything I've been through.",
+]
+
+
+def _resident_mb() -> Optional[float]:
+    # Current resident set size (Linux); ru_maxrss is the lifetime peak of the process
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _benchmark_mode(quantize: bool, threads: Optional[int], texts: List[str], rounds: int = 3) -> Dict[str, Any]:
+    # Runs in a fresh process, so both RSS figures belong to this mode alone
+    import gc
+    import resource
+
+    # torch and the pipeline machinery count toward the baseline, not the model
+    import torch
+    from transformers import pipeline
+
+    baseline_mb = _resident_mb()
+    analyzer = SentimentAnalyzer(quantize=quantize, threads=threads, cache_size=0)
+    start = time.perf_counter()
+    analyzer.warm_up()
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        analyzer._infer([text])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        labels = analyzer._infer(texts)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    return {
+        "load_s": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "throughput": len(texts) * rounds / elapsed,
+        "rss_mb": _resident_mb(),
+        "baseline_mb": baseline_mb,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "labels": [result['primary_emotion'] for result in labels]
+    }
+
+
+def compare_inference_modes(texts: List[str], threads: Optional[int] = None):
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    # Pool workers are daemonic and cannot spawn the export process themselves
+    start = time.perf_counter()
+    existed = os.path.exists(quantized_model_path())
+    export_quantized_model()
+    export = "cached" if existed else f"{time.perf_counter() - start:.1f} s"
+    runs = {}
+    for name, quantize in (("fp32", False), ("int8", True)):
+        with context.Pool(1) as pool:
+            runs[name] = pool.apply(_benchmark_mode, (quantize, threads, texts))
+
+    baseline = runs["fp32"]['labels']
+    print(f"\n{len(texts)} held-out client messages, {threads or 'default'} intra-op threads, one process per mode")
+    print(f"int8 model: {quantized_model_path()} (export {export})")
+    # fp32 weights are mmapped and only the rows these messages touch are resident, so its
+    # model MB here is a floor; it grows toward the full table over a long-running worker
+    print(f"{'mode':<6}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'msgs/s':>9}{'RSS MB':>8}{'model MB':>10}"
+          f"{'peak RSS MB':>13}{'agreement':>11}")
+    for name, run in runs.items():
+        agreement = sum(a == b for a, b in zip(run['labels'], baseline)) / len(baseline)
+        measured = run['rss_mb'] is not None and run['baseline_mb'] is not None
+        rss = f"{run['rss_mb']:.0f}" if measured else "n/a"
+        model_mb = f"{run['rss_mb'] - run['baseline_mb']:.0f}" if measured else "n/a"
+        print(f"{name:<6}{run['load_s']:>8.1f}{run['p50_ms']:>9.1f}{run['p95_ms']:>9.1f}{run['throughput']:>9.1f}"
+              f"{rss:>8}{model_mb:>10}{run['peak_rss_mb']:>13.0f}{agreement:>11.1%}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the client sentiment pipeline")
+    parser.add_argument("--compare-quantized", action="store_true",
+                        help="Compare fp32 and int8 inference on held-out client messages")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads per process")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("SENTIMENT PIPELINE BENCHMARK")
+    print("=" * 80)
+
+    if args.compare_quantized:
+        compare_inference_modes(HELD_OUT_MESSAGES, threads=args.threads)
+        raise SystemExit(0)
+
+    messages = [
+        "I'm really frustrated. It's been 3 weeks and I haven't heard anything about my case :(",
+        "Thank you so much for the update, I really appreciate everything your team is doing.",
+        "Can you tell me when my next appointment with the chiropractor is?",
+        "The adjuster called again and I don't know what to say to them. I'm worried.",
+        "Got the check today. Thanks!",
+        "Why is this taking so long? Nobody returns my calls and I'm about to find another lawyer.",
+    ]
+    workload = [f"{message} (ref {i % 40})" for i, message in enumerate(messages * 40)]
+
+    from transformers import pipeline
+
+    start = time.perf_counter()
+    for message in workload[:3]:
+        pipe = pipeline("text-classification", model=SENTIMENT_MODEL, truncation=True, max_length=512)
+        pipe(message[:MAX_MESSAGE_CHARS])
+    per_call_reload = (time.perf_counter() - start) / 3
+
+    analyzer = SentimentAnalyzer()
+    print(f"\nWarm-up (model load + first batch): {analyzer.warm_up():.0f} ms")
+
+    start = time.perf_counter()
+    for message in workload[:24]:
+        analyzer._infer([message[:MAX_MESSAGE_CHARS]])
+    one_at_a_time = (time.perf_counter() - start) / 24
+
+    start = time.perf_counter()
+    analyzer.analyze_many(workload)
+    batched = (time.perf_counter() - start) / len(workload)
+
+    start = time.perf_counter()
+    for message in workload:
+        analyzer.analyze(message)
+    cached = (time.perf_counter() - start) / len(workload)
+
+    print(f"Per message, reloading the pipeline each call: {per_call_reload * 1000:.0f} ms")
+    print(f"Per message, shared pipeline, one at a time:   {one_at_a_time * 1000:.1f} ms")
+    print(f"Per message, length-bucketed batches of {analyzer.batch_size}:   {batched * 1000:.1f} ms")
+    print(f"Per message, result cache hit:                 {cached * 1000:.3f} ms")
+    print(f"Stats: {analyzer.stats}")
+
+    # A 30-minute call is ~4,500 words; the old path scored only the first 1,600 characters
+    call = " ".join(workload[i % len(workload)] for i in range(300)) + " " + messages[5] * 3
+    calls = [call.replace("(ref", f"(call {n}, ref") for n in range(20)]
+    start = time.perf_counter()
+    scored = analyzer.analyze_transcripts(calls)
+    elapsed = time.perf_counter() - start
+    windows = sum(result['windows'] for result in scored)
+    print(f"\n{len(calls)} call transcripts ({len(call):,} characters each): {windows} windows in {elapsed:.2f} s "
+          f"({windows / elapsed:.0f} windows/s)")
+    print(f"First call: {scored[0]['primary_emotion']}, trend {scored[0]['trend']}, closing {scored[0]['closing_emotion']}")
@@ -0,0 +1,114 @@
+import time
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+
+# Beta(a, b) priors for the probability of establishing liability
+LIABILITY_PRIORS = {
+    "strong": (8.0, 2.0),
+    "moderate": (5.0, 5.0),
+    "weak": (2.0, 6.0)
+}
+COMPARATIVE_FAULT_PRIOR = (2.0, 8.0)   # mean 20% of fault on the client
+COLLECTABILITY_PRIOR = (9.0, 1.0)      # mean 90% of an award actually collected
+NON_ECONOMIC_MULTIPLIER = (1.5, 2.5, 5.0)  # triangular(low, mode, high) on economic damages
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+SENSITIVITY_QUANTILES = (10, 90)
+
+
+class SettlementSimulator:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    def sample_inputs(self, draws: int, liability_strength: str = "strong",
+                      comparative_fault: Sequence[float] = COMPARATIVE_FAULT_PRIOR,
+                      collectability: Sequence[float] = COLLECTABILITY_PRIOR,
+                      multiplier: Sequence[float] = NON_ECONOMIC_MULTIPLIER,
+                      policy_limits: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+        rng = self.rng
+        a, b = LIABILITY_PRIORS.get(liability_strength, LIABILITY_PRIORS["moderate"])
+        inputs = {
+            "liability_probability": rng.beta(a, b, draws),
+            "comparative_fault": rng.beta(*comparative_fault, draws),
+            "collectability": rng.beta(*collectability, draws),
+            "non_economic_multiplier": rng.triangular(*multiplier, draws),
+            # Drawn separately so fixing the liability probability keeps the same coin flips
+            "liability_roll": rng.random(draws)
+        }
+        if policy_limits:
+            inputs["policy_limit"] = rng.choice(np.asarray(policy_limits, dtype=np.float64), draws)
+        return inputs
+
+    @staticmethod
+    def recovery(economic_damages: float, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        award = economic_damages * (1.0 + inputs["non_economic_multiplier"])
+        award *= 1.0 - inputs["comparative_fault"]
+        if "policy_limit" in inputs:
+            np.minimum(award, inputs["policy_limit"], out=award)
+        award *= inputs["collectability"]
+        award[inputs["liability_roll"] >= inputs["liability_probability"]] = 0.0
+        return award
+
+    def simulate(self, economic_damages: float, draws: int = 1_000_000, liability_strength: str = "strong",
+                 policy_limits: Optional[Sequence[float]] = None, **priors) -> Dict[str, Any]:
+        if draws < 1:
+            raise ValueError(f"draws must be at least 1, got {draws}")
+        start = time.perf_counter()
+        inputs = self.sample_inputs(draws, liability_strength, policy_limits=policy_limits, **priors)
+        outcomes = self.recovery(economic_damages, inputs)
+        expected = float(outcomes.mean())
+        percentiles = np.percentile(outcomes, PERCENTILES)
+        recovered = outcomes[outcomes > 0]
+        conditional = np.percentile(recovered, PERCENTILES) if len(recovered) else np.zeros(len(PERCENTILES))
+
+        # Tornado-style sensitivity: hold one input at its 10th / 90th percentile, keep the other draws
+        sensitivity = {}
+        for name, values in inputs.items():
+            if name == "liability_roll":
+                continue
+            low_value, high_value = np.percentile(values, SENSITIVITY_QUANTILES)
+            swings = []
+            for fixed in (low_value, high_value):
+                held = dict(inputs)
+                held[name] = np.full(draws, fixed)
+                swings.append(float(self.recovery(economic_damages, held).mean()))
+            sensitivity[name] = {
+                "input_p10": round(float(low_value), 4),
+                "input_p90": round(float(high_value), 4),
+                "expected_at_p10": round(swings[0], 2),
+                "expected_at_p90": round(swings[1], 2),
+                "swing": round(abs(swings[1] - swings[0]), 2)
+            }
+
+        return {
+            "draws": draws,
+            "economic_damages": economic_damages,
+            "liability_strength": liability_strength,
+            "expected_value": round(expected, 2),
+            "std_dev": round(float(outcomes.std()), 2),
+            "probability_of_zero": round(float((outcomes == 0).mean()), 4),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, percentiles)},
+            # Outcomes are bimodal (liability fails -> 0), so report the spread of the wins separately
+            "if_liability_established": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, conditional)},
+            "sensitivity": dict(sorted(sensitivity.items(), key=lambda item: -item[1]["swing"])),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("SETTLEMENT MONTE CARLO BENCHMARK")
+    print("=" * 80)
+
+    simulator = SettlementSimulator(seed=42)
+    for limits in (None, [25_000, 50_000, 100_000]):
+        result = simulator.simulate(71_112.00, draws=1_000_000, liability_strength="moderate", policy_limits=limits)
+        print(f"\nPolicy limits: {limits}")
+        print(f"  {result['draws']:,} draws in {result['elapsed_ms']} ms (incl. sensitivity)")
+        print(f"  Expected value: ${result['expected_value']:,.2f}, P(zero): {result['probability_of_zero']:.1%}")
+        print(f"  Percentiles: {result['percentiles']}")
+        for name, entry in result["sensitivity"].items():
+            print(f"  {name:<24} swing ${entry['swing']:,.2f}")
+
+    repeat = SettlementSimulator(seed=42).simulate(71_112.00, draws=100_000)
+    again = SettlementSimulator(seed=42).simulate(71_112.00, draws=100_000)
+    print(f"\nSeeded runs reproducible: {repeat['percentiles'] == again['percentiles']}")
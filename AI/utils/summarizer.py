@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TIMEOUT_SECONDS = 60.0  # Whole-document budget; chunks still pending after it get an extractive fallback
+FALLBACK_SENTENCES = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def extractive_summary(text: str, max_sentences: int = FALLBACK_SENTENCES) -> str:
+    # No-LLM stand-in used when the backend fails or runs out of time: the first sentences,
+    # as bullets so the result parses like a model summary
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', text) if len(s.strip()) > 3]
+    return "\n".join(f"- {sentence}" for sentence in sentences[:max_sentences])
+
+
+class OfflineLLMBackend:
+    # Deterministic stand-in for GeminiBackend in tests and offline runs. `responses` maps a prompt
+    # substring to the reply; other prompts get the bullet lines already in the prompt (a reduce
+    # step) or the first sentences of the excerpt. `fail_on` makes prompts containing it raise.
+    def __init__(self, responses: Optional[Dict[str, str]] = None, latency_seconds: float = 0.0,
+                 fail_on: Optional[str] = None):
+        self.responses = responses or {}
+        self.latency_seconds = latency_seconds
+        self.fail_on = fail_on
+        self.prompts: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]] = None) -> str:
+        with self._lock:
+            self.prompts.append(prompt)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("offline backend: simulated failure")
+        for needle, response in self.responses.items():
+            if needle in prompt:
+                return response
+        if response_schema is not None:
+            return "[]"
+        bullets = [line for line in prompt.split("\n") if line.startswith("- ")]
+        if bullets:
+            return "Combined summary.\n" + "\n".join(bullets)
+        body = prompt.split("\n\n", 1)[-1]
+        return extractive_summary(body.split("Excerpt:\n", 1)[-1], max_sentences=2)
+
+
+class SummaryCache:
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries.update(json.load(f))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self._entries)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DocumentSummarizer:
+    # `backend` is anything with generate(prompt) -> str, e.g. utils.llm_backend.GeminiBackend
+    # or OfflineLLMBackend. A failed or timed-out call falls back to an extractive summary of
+    # that piece, which is never cached, so the next run asks the model again.
+    def __init__(self, backend, max_chunk_tokens: int = 2000, max_concurrency: int = 4,
+                 reduce_fan_in: int = 8, anchor_every: int = 4, cache: Optional[SummaryCache] = None,
+                 timeout_seconds: Optional[float] = DEFAULT_TIMEOUT_SECONDS):
+        if max_chunk_tokens < 1:
+            raise ValueError("max_chunk_tokens must be positive")
+        if reduce_fan_in < 2:
+            raise ValueError("reduce_fan_in must be at least 2")
+
+        self.backend = backend
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.reduce_fan_in = reduce_fan_in
+        self.anchor_every = max(1, anchor_every)
+        self.cache = cache if cache is not None else SummaryCache()
+        self.timeout_seconds = timeout_seconds
+
+    def split_units(self, text: str, pages: Optional[List[str]] = None) -> List[str]:
+        if pages is None:
+            pages = text.split('\f') if '\f' in text else [text]
+
+        units = []
+        for page in pages:
+            if not page.strip():
+                continue
+            if estimate_tokens(page) <= self.max_chunk_tokens and len(pages) > 1:
+                units.append(page.strip())
+                continue
+            for paragraph in re.split(r'\n\s*\n', page):
+                if paragraph.strip():
+                    units.extend(self._split_oversized(paragraph.strip()))
+        return units
+
+    def _split_oversized(self, text: str) -> List[str]:
+        max_chars = self.max_chunk_tokens * CHARS_PER_TOKEN
+        pieces = []
+        while len(text) > max_chars:
+            cut = text.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(text[:cut].strip())
+            text = text[cut:].strip()
+        if text:
+            pieces.append(text)
+        return pieces
+
+    def chunk_document(self, text: str, pages: Optional[List[str]] = None) -> List[str]:
+        # Chunk boundaries are content-defined: a chunk closes after any unit whose
+        # hash hits the anchor modulus, so editing one page only disturbs its own chunk
+        # instead of shifting every boundary after it.
+        chunks = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for unit in self.split_units(text, pages):
+            unit_tokens = estimate_tokens(unit)
+            if current and current_tokens + unit_tokens > self.max_chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+
+            current.append(unit)
+            current_tokens += unit_tokens
+
+            if int(content_hash(unit)[:8], 16) % self.anchor_every == 0:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _map_prompt(self, chunk: str, document_type: str) -> str:
+        return f"""Summarize the following excerpt of a {document_type} document for an attorney.
+Keep every date, dollar amount, party name and deadline that appears. Use at most 5 bullet points.
+
+Excerpt:
+{chunk}"""
+
+    def _reduce_prompt(self, summaries: List[str], document_type: str) -> str:
+        joined = "\n\n".join(f"Part {i + 1}:\n{s}" for i, s in enumerate(summaries))
+        return f"""Combine these partial summaries of one {document_type} document into a single summary.
+Start with a one-paragraph overview, then list the key points as bullet points starting with "- ".
+Keep every date, dollar amount, party name and deadline. Do not invent facts.
+
+{joined}"""
+
+    def _final_prompt(self, text: str, document_type: str) -> str:
+        # Single-chunk documents skip the map step and get the final summary format directly
+        return f"""Summarize the following {document_type} document for an attorney.
+Start with a one-paragraph overview, then list the key points as bullet points starting with "- ".
+Keep every date, dollar amount, party name and deadline. Do not invent facts.
+
+{text}"""
+
+    def _generate_cached(self, key_prefix: str, payload: str, prompt: str, stats: Dict[str, int]) -> str:
+        key = f"{key_prefix}:{content_hash(payload)}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            stats['cache_hits'] += 1
+            return cached
+
+        summary = self.backend.generate(prompt).strip()
+        stats['llm_calls'] += 1
+        self.cache.put(key, summary)
+        return summary
+
+    def summarize(self, text: str, document_type: str = "general", pages: Optional[List[str]] = None) -> Dict[str, Any]:
+        chunks = self.chunk_document(text, pages)
+        stats = {'cache_hits': 0, 'llm_calls': 0, 'fallbacks': 0}
+        stats_lock = threading.Lock()
+        deadline = None if self.timeout_seconds is None else time.monotonic() + self.timeout_seconds
+
+        def run(key_prefix, payload, prompt):
+            local = {'cache_hits': 0, 'llm_calls': 0}
+            result = self._generate_cached(key_prefix, payload, prompt, local)
+            with stats_lock:
+                stats['cache_hits'] += local['cache_hits']
+                stats['llm_calls'] += local['llm_calls']
+            return result
+
+        def run_all(pool, jobs):
+            # jobs: (key_prefix, payload, prompt, fallback text); results in job order
+            if deadline is not None and time.monotonic() >= deadline:
+                stats['fallbacks'] += len(jobs)
+                return [job[3] for job in jobs]
+            futures = [pool.submit(run, *job[:3]) for job in jobs]
+            results = []
+            for future, job in zip(futures, jobs):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    results.append(future.result(timeout=remaining))
+                except Exception:
+                    future.cancel()
+                    stats['fallbacks'] += 1
+                    results.append(job[3])
+            return results
+
+        if not chunks:
+            return {"summary": "", "chunk_count": 0, "reduce_levels": 0, **stats}
+
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            levels = 0
+            if len(chunks) == 1:
+                summaries = run_all(pool, [("final", f"{document_type}\n{chunks[0]}",
+                                            self._final_prompt(chunks[0], document_type),
+                                            extractive_summary(chunks[0]))])
+            else:
+                summaries = run_all(pool, [("map", f"{document_type}\n{chunk}", self._map_prompt(chunk, document_type),
+                                            extractive_summary(chunk)) for chunk in chunks])
+
+            while len(summaries) > 1:
+                groups = [summaries[i:i + self.reduce_fan_in] for i in range(0, len(summaries), self.reduce_fan_in)]
+                summaries = run_all(pool, [("reduce", f"{document_type}\n" + "\x1e".join(group),
+                                            self._reduce_prompt(group, document_type), "\n".join(group))
+                                           for group in groups])
+                levels += 1
+        finally:
+            # A call still stuck in the backend after the deadline is abandoned, not waited for
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if stats['llm_calls']:
+            self.cache.save()
+        return {
+            "summary": summaries[0],
+            "chunk_count": len(chunks),
+            "reduce_levels": levels,
+            **stats
+        }
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("=" * 80)
+    print("SUMMARIZER CHECKS (offline backend)")
+    print("=" * 80)
+
+    pages = [f"Page {n}. Treatment on 0{n % 9 + 1}/1{n % 9}/2023 at Orlando Orthopedics cost ${n * 137}.45. "
+             f"The adjuster requested records by 12/{n % 28 + 1}/2023. " + "Narrative filler text. " * 60
+             for n in range(24)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "summaries.json")
+
+        backend = OfflineLLMBackend()
+        first = DocumentSummarizer(backend, cache=SummaryCache(path=path)).summarize("\f".join(pages), "medical")
+        assert first['llm_calls'] == backend.calls and first['cache_hits'] == 0
+        print(f"Cold run: {first['chunk_count']} chunks, {first['llm_calls']} LLM calls")
+
+        # A new process with the same cache file re-summarizes nothing
+        backend = OfflineLLMBackend()
+        again = DocumentSummarizer(backend, cache=SummaryCache(path=path)).summarize("\f".join(pages), "medical")
+        assert backend.calls == 0 and again['summary'] == first['summary']
+        print(f"After a restart: {backend.calls} LLM calls, {again['cache_hits']} cache hits")
+
+        # Editing one page re-summarizes only its chunk and the reduce path above it
+        edited = list(pages)
+        edited[5] = edited[5].replace("Narrative", "Amended narrative", 1)
+        backend = OfflineLLMBackend()
+        changed = DocumentSummarizer(backend, cache=SummaryCache(path=path)).summarize("\f".join(edited), "medical")
+        assert changed['cache_hits'] > 0 and changed['llm_calls'] < first['llm_calls'] / 2
+        print(f"One page edited: {changed['llm_calls']} LLM calls, {changed['cache_hits']} cache hits")
+
+    # A single chunk goes straight to the final-summary prompt
+    backend = OfflineLLMBackend(responses={"Summarize the following": "Overview.\n- Key point"})
+    single = DocumentSummarizer(backend).summarize("Short letter dated 01/02/2023 about $500.", "correspondence")
+    assert backend.calls == 1 and single['summary'] == "Overview.\n- Key point", single
+    assert "Start with a one-paragraph overview" in backend.prompts[0]
+    print("Single chunk: one final-summary call")
+
+    # A failing backend degrades to extractive text instead of raising, and nothing is cached
+    cache = SummaryCache()
+    failed = DocumentSummarizer(OfflineLLMBackend(fail_on="Excerpt"), cache=cache).summarize("\f".join(pages), "medical")
+    assert failed['fallbacks'] == failed['chunk_count'] and failed['summary'].startswith(("Combined", "- "))
+    assert all(not key.startswith("map:") for key in cache._entries)
+    print(f"Backend errors: {failed['fallbacks']} extractive fallbacks")
+
+    # A slow backend is abandoned at the deadline
+    start = time.monotonic()
+    slow = DocumentSummarizer(OfflineLLMBackend(latency_seconds=2.0), timeout_seconds=0.3).summarize(
+        "\f".join(pages), "medical")
+    elapsed = time.monotonic() - start
+    assert elapsed < 1.5 and slow['fallbacks'] > 0, (elapsed, slow)
+    print(f"Slow backend: returned after {elapsed:.2f} s with {slow['fallbacks']} fallbacks")
+    print("\nAll summarizer checks passed")
@@ -0,0 +1,338 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .page_index import PageIndex
+
+INDEX_VERSION = 1
+TEXT_INDEX_FILENAME = ".case_index.json.gz"  # Where earlier versions wrote the index, inside the case folder
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+FUZZY_MIN_SIMILARITY = 0.3
+FUZZY_MAX_EXPANSIONS = 5
+SNIPPET_CONTEXT = 100
+
+
+def text_index_path(case_folder: str, index_dir: str) -> str:
+    # The index holds full unredacted text, so it lives in index_dir rather than the client's
+    # case folder. Named by a hash of the folder's absolute path: two clients' folders with the
+    # same name never share an index.
+    folder = os.path.abspath(case_folder)
+    digest = hashlib.sha256(folder.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(index_dir, f"{os.path.basename(folder) or 'case'}-{digest}.json.gz")
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    # Tokens are matched on the original text so offsets stay valid for snippets
+    return [(match.group(0).lower(), match.start()) for match in TOKEN_PATTERN.finditer(text)]
+
+
+def trigrams(term: str) -> Set[str]:
+    # Padded like pg_trgm so short words still share their leading trigrams
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CaseTextIndex:
+    # Positional inverted index over one case's documents: term -> {doc_id: token positions}.
+    # Documents can be added one at a time while the case folder is being converted.
+    def __init__(self):
+        self.documents: List[Optional[Dict[str, Any]]] = []
+        self.doc_ids: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, array]] = defaultdict(dict)
+        self.total_tokens = 0
+        self._trigrams: Optional[Dict[str, Set[str]]] = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __contains__(self, name: str):
+        return name in self.doc_ids
+
+    def add_document(self, name: str, text: str, document_type: Optional[str] = None,
+                     page_index: Optional[Dict[str, Any]] = None) -> bool:
+        # Returns False when the same content is already indexed under this name
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if name in self.doc_ids:
+            existing = self.documents[self.doc_ids[name]]
+            if existing['hash'] == content_hash:
+                if document_type:
+                    existing['document_type'] = document_type
+                return False
+            self.remove_document(name)
+
+        tokens = tokenize(text)
+        doc_id = len(self.documents)
+        positions: Dict[str, array] = defaultdict(lambda: array('I'))
+        for position, (term, _) in enumerate(tokens):
+            positions[term].append(position)
+        for term, term_positions in positions.items():
+            if self._trigrams is not None and term not in self.postings:
+                for gram in trigrams(term):
+                    self._trigrams.setdefault(gram, set()).add(term)
+            self.postings[term][doc_id] = term_positions
+
+        self.documents.append({
+            "name": name,
+            "document_type": document_type,
+            "hash": content_hash,
+            "text": text,
+            "token_starts": array('I', (start for _, start in tokens)),
+            "page_index": page_index,
+        })
+        self.doc_ids[name] = doc_id
+        self.total_tokens += len(tokens)
+        return True
+
+    def add_file_result(self, file_result: Dict[str, Any]) -> bool:
+        if not file_result.get('success') or not file_result.get('text'):
+            return False
+        return self.add_document(
+            file_result.get('relative_path') or file_result.get('filename', 'Unknown'),
+            file_result['text'],
+            file_result.get('classification', {}).get('primary_type'),
+            file_result.get('page_index')
+        )
+
+    def set_document_type(self, name: str, document_type: str):
+        if name in self.doc_ids:
+            self.documents[self.doc_ids[name]]['document_type'] = document_type
+
+    def remove_document(self, name: str):
+        doc_id = self.doc_ids.pop(name)
+        document = self.documents[doc_id]
+        for term in {term for term, _ in tokenize(document['text'])}:
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                if self._trigrams is not None:
+                    for gram in trigrams(term):
+                        self._trigrams.get(gram, set()).discard(term)
+        self.total_tokens -= len(document['token_starts'])
+        self.documents[doc_id] = None
+
+    @classmethod
+    def from_case_data(cls, case_data: Dict[str, Any]) -> "CaseTextIndex":
+        index = cls()
+        for file_result in case_data.get('files_processed', []):
+            index.add_file_result(file_result)
+        return index
+
+    def _similar_terms(self, term: str) -> List[Tuple[str, float]]:
+        # Trigram Jaccard similarity against the vocabulary, for OCR-garbled names
+        if self._trigrams is None:
+            self._trigrams = {}
+            for known in self.postings:
+                for gram in trigrams(known):
+                    self._trigrams.setdefault(gram, set()).add(known)
+
+        grams = trigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for known in self._trigrams.get(gram, ()):
+                shared[known] += 1
+
+        scored = []
+        for known, overlap in shared.items():
+            similarity = overlap / (len(grams) + len(trigrams(known)) - overlap)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((known, similarity))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:FUZZY_MAX_EXPANSIONS]
+
+    def _phrase_matches(self, terms: List[str]) -> Dict[int, List[int]]:
+        # doc_id -> token positions where the whole phrase starts
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return {}
+        candidates = set.intersection(*(set(p) for p in postings))
+        matches = {}
+        for doc_id in candidates:
+            followers = [set(p[doc_id]) for p in postings[1:]]
+            starts = [position for position in postings[0][doc_id]
+                      if all(position + offset + 1 in positions for offset, positions in enumerate(followers))]
+            if starts:
+                matches[doc_id] = starts
+        return matches
+
+    def _parse_query(self, query: str, phrase: bool) -> List[List[str]]:
+        if phrase:
+            clauses = [[term for term, _ in tokenize(query)]]
+        else:
+            clauses = [[term for term, _ in tokenize(quoted or bare)]
+                       for quoted, bare in QUERY_PATTERN.findall(query)]
+        return [clause for clause in clauses if clause]
+
+    def search(self, query: str, limit: Optional[int] = 10, phrase: bool = False, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        # Quoted parts (and multi-token words) are phrases; clauses are OR-ed and ranked with BM25.
+        # A single term with no exact postings falls back to its closest vocabulary terms.
+        live = len(self.doc_ids)
+        if not live:
+            return []
+        average_length = self.total_tokens / live
+
+        scores: Dict[int, float] = defaultdict(float)
+        first_hit: Dict[int, Tuple[int, int]] = {}
+        fuzzy_docs: Set[int] = set()
+
+        for clause in self._parse_query(query, phrase):
+            if len(clause) == 1 and clause[0] not in self.postings and fuzzy:
+                expansions = self._similar_terms(clause[0])
+            else:
+                expansions = [(clause, 1.0)] if len(clause) > 1 else [(clause[0], 1.0)]
+
+            for expansion, weight in expansions:
+                if isinstance(expansion, list):
+                    matches = self._phrase_matches(expansion)
+                    span = len(expansion)
+                else:
+                    matches = {doc_id: list(positions) for doc_id, positions in self.postings.get(expansion, {}).items()}
+                    span = 1
+                if not matches:
+                    continue
+
+                idf = math.log(1 + (live - len(matches) + 0.5) / (len(matches) + 0.5))
+                for doc_id, starts in matches.items():
+                    frequency = len(starts)
+                    length = len(self.documents[doc_id]['token_starts'])
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] += weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    if doc_id not in first_hit or starts[0] < first_hit[doc_id][0]:
+                        first_hit[doc_id] = (starts[0], span)
+                    if weight < 1.0:
+                        fuzzy_docs.add(doc_id)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [self._hit(doc_id, score, *first_hit[doc_id], doc_id in fuzzy_docs) for doc_id, score in ranked]
+
+    def _hit(self, doc_id: int, score: float, position: int, span: int, fuzzy: bool) -> Dict[str, Any]:
+        document = self.documents[doc_id]
+        text = document['text']
+        start = document['token_starts'][position]
+        last = document['token_starts'][position + span - 1]
+        end = TOKEN_PATTERN.match(text, last).end()
+        page_index = PageIndex.from_dict(document['page_index']) if document['page_index'] else None
+
+        return {
+            "name": document['name'],
+            "document_type": document['document_type'],
+            "score": round(score, 4),
+            "position": start,
+            "match": text[start:end],
+            "snippet": text[max(0, start - SNIPPET_CONTEXT):min(len(text), end + SNIPPET_CONTEXT)],
+            "page": page_index.page_of(start) if page_index else None,
+            "fuzzy": fuzzy,
+        }
+
+    def save(self, path: str):
+        documents = []
+        for document in self.documents:
+            if document is None:
+                continue
+            documents.append({**document, "token_starts": document['token_starts'].tolist()})
+        remap = {self.doc_ids[document['name']]: new_id for new_id, document in enumerate(documents)}
+
+        payload = {
+            "version": INDEX_VERSION,
+            "documents": documents,
+            "postings": {
+                term: [[remap[doc_id], positions.tolist()] for doc_id, positions in postings.items()]
+                for term, postings in self.postings.items()
+            },
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=3) as f:
+            json.dump(payload, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CaseTextIndex"]:
+        # None when the file was written by an incompatible version
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != INDEX_VERSION:
+            return None
+
+        index = cls()
+        for doc_id, document in enumerate(payload['documents']):
+            document['token_starts'] = array('I', document['token_starts'])
+            index.documents.append(document)
+            index.doc_ids[document['name']] = doc_id
+            index.total_tokens += len(document['token_starts'])
+        for term, postings in payload['postings'].items():
+            index.postings[term] = {doc_id: array('I', positions) for doc_id, positions in postings}
+        return index
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    print("=" * 80)
+    print("CASE TEXT INDEX BENCHMARK")
+    print("=" * 80)
+
+    results_path = Path(__file__).parent.parent / "data" / "out" / "docu_agent_test_results.json"
+    with open(results_path) as f:
+        all_results = json.load(f)
+
+    files = [file_result for case in all_results.values() for file_result in case['files_processed']]
+    corpus = []
+    for copy in range(25):
+        for file_result in files:
+            corpus.append({**file_result, "relative_path": f"{copy}/{file_result.get('relative_path')}"})
+    size_mb = sum(len(fr.get('text', '')) for fr in corpus) / 1_000_000
+    print(f"\nCorpus: {len(corpus)} documents, {size_mb:.1f} MB of text")
+
+    start = time.perf_counter()
+    index = CaseTextIndex()
+    for file_result in corpus:
+        index.add_file_result(file_result)
+    print(f"Incremental build: {time.perf_counter() - start:.2f} s ({len(index.postings)} terms)")
+
+    queries = ["medical", "police report", "insurance", "settlement demand", "injury"]
+
+    def linear_scan(term):
+        term = term.lower()
+        return [fr for fr in corpus if fr.get('success') and term in fr.get('text', '').lower()]
+
+    start = time.perf_counter()
+    for query in queries:
+        linear_scan(query)
+    linear = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, phrase=True)
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    print(f"\nLinear scan per query: {linear * 1000:.1f} ms")
+    print(f"Index search per query: {indexed * 1000:.1f} ms")
+
+    top = index.search('"police report"', limit=1)
+    if top:
+        print(f"\nTop hit for \"police report\": {top[0]['name']} (score {top[0]['score']}, page {top[0]['page']})")
+    garbled = index.search("insurence", limit=1)
+    if garbled:
+        print(f"Fuzzy hit for 'insurence': matched '{garbled[0]['match']}' in {garbled[0]['name']}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, TEXT_INDEX_FILENAME)
+        start = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        reloaded = CaseTextIndex.load(path)
+        loaded = time.perf_counter() - start
+        print(f"\nSave: {saved:.2f} s, load: {loaded:.2f} s, {os.path.getsize(path) / 1_000_000:.1f} MB on disk")
+        print(f"Reloaded results identical: {reloaded.search('medical bills') == index.search('medical bills')}")
@@ -0,0 +1,204 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from .case_facts import NAT, parse_date
+
+Anchor = Union[str, np.datetime64, None]
+
+
+class CaseTimeline:
+    # Date mentions parsed once into datetime64 columns. Mentions of the same day from any number
+    # of documents collapse into one event; the sort order is recomputed only after inserts.
+    def __init__(self):
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.raw: List[str] = []
+        self.sources: List[str] = []
+        self.document_types: List[str] = []
+        self.unparsed: List[Dict[str, str]] = []
+        self._pending: List[np.datetime64] = []
+        self._order: Optional[np.ndarray] = None
+        self._events: Optional[List[Dict[str, Any]]] = None
+        self._event_days = np.empty(0, dtype='datetime64[D]')
+
+    def __len__(self):
+        return len(self.raw)
+
+    def add_document(self, source: str, raw_dates: Iterable[str], document_type: str = "general",
+                     parsed: Optional[np.ndarray] = None):
+        raw_dates = list(raw_dates)
+        if parsed is None:
+            parsed = [parse_date(raw) for raw in raw_dates]
+
+        for raw, when in zip(raw_dates, parsed):
+            if np.isnat(when):
+                self.unparsed.append({'date': raw, 'source': source})
+                continue
+            self._pending.append(when)
+            self.raw.append(raw)
+            self.sources.append(source)
+            self.document_types.append(document_type)
+
+        if self._pending:
+            self._events = None
+
+    def remove_document(self, source: str):
+        self._sorted()
+        self.unparsed = [entry for entry in self.unparsed if entry['source'] != source]
+        keep = np.array([value != source for value in self.sources], dtype=bool)
+        if keep.all():
+            return
+        # Dropping mentions leaves the rest sorted; only their indices shift
+        new_index = np.cumsum(keep) - 1
+        self._order = new_index[self._order[keep[self._order]]]
+        self.dates = self.dates[keep]
+        self.raw = [value for value, kept in zip(self.raw, keep) if kept]
+        self.sources = [value for value, kept in zip(self.sources, keep) if kept]
+        self.document_types = [value for value, kept in zip(self.document_types, keep) if kept]
+        self._events = None
+
+    def _sorted(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._pending:
+            added = np.array(self._pending, dtype='datetime64[D]')
+            offset = len(self.dates)
+            self.dates = np.concatenate([self.dates, added])
+            self._pending = []
+            if self._order is not None:
+                # Merge the new mentions into the existing order instead of re-sorting everything;
+                # side='right' keeps them after same-day mentions from earlier documents
+                added_order = np.argsort(added, kind='stable') + offset
+                positions = np.searchsorted(self.dates[self._order], self.dates[added_order], side='right')
+                self._order = np.insert(self._order, positions, added_order)
+        if self._order is None:
+            # Stable, so mentions of the same day keep document order
+            self._order = np.argsort(self.dates, kind='stable')
+        return self._order, self.dates[self._order]
+
+    def events(self) -> List[Dict[str, Any]]:
+        if self._events is not None:
+            return self._events
+
+        order, dates = self._sorted()
+        if len(dates) == 0:
+            self._events = []
+            self._event_days = np.empty(0, dtype='datetime64[D]')
+            return self._events
+
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+        ends = np.r_[starts[1:], len(dates)]
+        events = []
+        for start, end in zip(starts, ends):
+            mentions = order[start:end]
+            sources = list(dict.fromkeys(self.sources[i] for i in mentions))
+            document_types = list(dict.fromkeys(self.document_types[i] for i in mentions))
+            first = mentions[0]
+            events.append({
+                'date': self.raw[first],
+                'iso_date': str(dates[start]),
+                'source': self.sources[first],
+                'document_type': self.document_types[first],
+                'sources': sources,
+                'document_types': document_types,
+                'mentions': int(end - start)
+            })
+        self._events = events
+        self._event_days = dates[starts]
+        return events
+
+    def resolve_anchor(self, anchor: Anchor, latest: bool = False) -> np.datetime64:
+        # A date ("9/30/2019", "2019-09-30") or a keyword matched against event sources and
+        # document types ("accident", "demand"); keywords pick the earliest (or latest) match.
+        if anchor is None or anchor == "":
+            return NAT
+        if isinstance(anchor, np.datetime64):
+            return anchor.astype('datetime64[D]')
+
+        when = parse_date(anchor)
+        if np.isnat(when):
+            try:
+                when = np.datetime64(anchor.strip(), 'D')
+            except ValueError:
+                when = NAT
+        if not np.isnat(when):
+            return when
+
+        keyword = anchor.lower()
+        matches = [event for event in self.events()
+                   if any(keyword in value.lower() for value in event['sources'] + event['document_types'])]
+        if not matches:
+            return NAT
+        return np.datetime64(matches[-1 if latest else 0]['iso_date'], 'D')
+
+    def between(self, start: Anchor = None, end: Anchor = None) -> List[Dict[str, Any]]:
+        # Inclusive range query; a missing bound is open. Raises ValueError for unknown anchors.
+        events = self.events()
+        if not events:
+            return []
+        days = self._event_days
+
+        low = 0
+        if start not in (None, ""):
+            start_day = self.resolve_anchor(start)
+            if np.isnat(start_day):
+                raise ValueError(f"Could not resolve timeline anchor: {start}")
+            low = int(np.searchsorted(days, start_day, side='left'))
+
+        high = len(events)
+        if end not in (None, ""):
+            end_day = self.resolve_anchor(end, latest=True)
+            if np.isnat(end_day):
+                raise ValueError(f"Could not resolve timeline anchor: {end}")
+            high = int(np.searchsorted(days, end_day, side='right'))
+
+        return events[low:high]
+
+    def summary(self) -> Dict[str, Any]:
+        events = self.events()
+        return {
+            "timeline": events,
+            "total_events": len(events),
+            "total_mentions": len(self.raw),
+            "date_range": {
+                "earliest": events[0]['date'] if events else None,
+                "latest": events[-1]['date'] if events else None
+            },
+            "documents_with_dates": len(set(self.sources)),
+            "unparsed_dates": self.unparsed
+        }
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("CASE TIMELINE BENCHMARK")
+    print("=" * 80)
+
+    sample = ["10/2/2019", "9/30/2019", "Oct 1, 2019", "September 29, 2019", "1/5/2020", "10/02/2019"]
+    string_sorted = sorted(sample)
+    timeline = CaseTimeline()
+    timeline.add_document("sample.pdf", sample)
+    print(f"\nString sort: {string_sorted}")
+    print(f"Timeline:    {[event['date'] for event in timeline.events()]}")
+
+    rng = np.random.default_rng(7)
+    days = rng.integers(0, 3650, size=200_000)
+    base = np.datetime64('2015-01-01')
+    raw_dates = [f"{d.astype(object).month}/{d.astype(object).day}/{d.astype(object).year}"
+                 for d in base + days]
+    sources = [f"document_{i % 2000}.pdf" for i in range(len(raw_dates))]
+
+    start = time.perf_counter()
+    timeline = CaseTimeline()
+    for i in range(0, len(raw_dates), 100):
+        timeline.add_document(sources[i], raw_dates[i:i + 100], "medical")
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = timeline.events()
+    grouped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(100):
+        timeline.between("3/1/2018", "6/30/2018")
+    query = (time.perf_counter() - start) / 100
+
+    print(f"\n{len(raw_dates)} mentions -> {len(events)} events")
+    print(f"Parse + insert: {built * 1000:.0f} ms, sort + dedupe: {grouped * 1000:.0f} ms, range query: {query * 1000:.2f} ms")
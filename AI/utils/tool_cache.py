@@ -0,0 +1,225 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Per-document fields left out of the document signature: the text is compared by identity
+# (strings are immutable, so an edit always means a new object) and the page index is derived
+# from the text
+_SIGNATURE_SKIP = ('text', 'page_index')
+
+
+_FIELD_ENCODER = json.JSONEncoder(default=str, check_circular=False)
+
+
+def _fields(value: Dict[str, Any], skip: Tuple[str, ...]) -> str:
+    # Key order is not normalised: a reordered dict only costs one full fingerprint
+    return _FIELD_ENCODER.encode({key: item for key, item in value.items() if key not in skip})
+
+
+def _signature(value: Any) -> Tuple:
+    # Recomputed on every call to notice edits of a case dict we have already fingerprinted.
+    # Holds the text objects themselves, so comparing signatures is an identity check when the
+    # text is unchanged and a content comparison otherwise; every other field is serialised.
+    if isinstance(value, dict):
+        files = value.get('files_processed')
+        if isinstance(files, list):
+            return (_fields(value, ('files_processed',)), tuple(
+                (f.get('text'), _fields(f, _SIGNATURE_SKIP)) if isinstance(f, dict) else fingerprint(f)
+                for f in files
+            ))
+        return (len(value),)
+    if isinstance(value, (list, tuple)):
+        return (len(value),)
+    return ()
+
+
+def _update_hash(digest, value: Any):
+    # Canonical, order-independent for dict keys; long strings are fed to the hash directly
+    # instead of going through json.dumps
+    if isinstance(value, dict):
+        digest.update(b'{')
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode('utf-8', 'surrogatepass'))
+            digest.update(b':')
+            _update_hash(digest, value[key])
+            digest.update(b',')
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'[')
+        for item in value:
+            _update_hash(digest, item)
+            digest.update(b',')
+        digest.update(b']')
+    elif isinstance(value, str):
+        digest.update(b's%d:' % len(value))
+        digest.update(value.encode('utf-8', 'surrogatepass'))
+    else:
+        digest.update(json.dumps(value, default=str).encode('utf-8'))
+
+
+def fingerprint(value: Any) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    _update_hash(digest, value)
+    return digest.hexdigest()
+
+
+class ToolCache:
+    # LRU memo for tool calls keyed by (tool, fingerprint of every argument).
+    # Changed case data produces a new fingerprint, so stale results are never returned:
+    # Sherlock's add/remove/update paths re-key the case through update_fingerprint, and any
+    # other edit shows up in _signature. Callers get their own copy of each result, so
+    # mutating one can never change what the next call returns.
+    def __init__(self, max_entries: int = 256, max_tracked_objects: int = 8):
+        self.max_entries = max_entries
+        self.max_tracked_objects = max_tracked_objects
+        self.entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        # id(obj) -> (obj, shallow signature, fingerprint); holding obj keeps its id from being reused
+        self._object_fingerprints: "OrderedDict[int, Tuple[Any, Tuple, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fingerprint_seconds = 0.0
+
+    def _fingerprint_argument(self, value: Any) -> str:
+        if not isinstance(value, (dict, list)):
+            return fingerprint(value)
+
+        start = time.perf_counter()
+        signature = _signature(value)
+        with self._lock:
+            known = self._object_fingerprints.get(id(value))
+        if known is not None and known[0] is value and known[1] == signature:
+            result = known[2]
+        else:
+            result = fingerprint(value)
+            with self._lock:
+                self._object_fingerprints[id(value)] = (value, signature, result)
+                self._object_fingerprints.move_to_end(id(value))
+                while len(self._object_fingerprints) > self.max_tracked_objects:
+                    self._object_fingerprints.popitem(last=False)
+        with self._lock:
+            self.fingerprint_seconds += time.perf_counter() - start
+        return result
+
+    def key_for(self, name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        digest = hashlib.blake2b(digest_size=16)
+        for argument, value in sorted(arguments.items()):
+            digest.update(argument.encode('utf-8'))
+            digest.update(self._fingerprint_argument(value).encode('ascii'))
+        return name, digest.hexdigest()
+
+    def memoize(self, fn: Callable, name: Optional[str] = None) -> Callable:
+        # functools.wraps keeps __name__, __doc__ and the signature that ADK reads for tool schemas
+        name = name or fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = self.key_for(name, bound.arguments)
+
+            with self._lock:
+                hit = key in self.entries
+                if hit:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    cached = self.entries[key]
+                else:
+                    self.misses += 1
+            if hit:
+                return copy.deepcopy(cached)
+
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self.entries[key] = copy.deepcopy(result)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            return result
+
+        wrapper.cache = self
+        return wrapper
+
+    def update_fingerprint(self, value: Any, change: Any):
+        # For an object edited in place: derive its new fingerprint from the previous one and a
+        # description of the edit instead of rehashing everything on the next call
+        with self._lock:
+            known = self._object_fingerprints.get(id(value))
+            if known is None or known[0] is not value:
+                return
+            self._object_fingerprints[id(value)] = (value, _signature(value), fingerprint([known[2], change]))
+
+    def invalidate(self, name: Optional[str] = None):
+        # Drop every entry, or only those of one tool
+        with self._lock:
+            if name is None:
+                self.entries.clear()
+                self._object_fingerprints.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == name]:
+                    del self.entries[key]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        calls = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / calls, 3) if calls else 0.0,
+            "fingerprint_ms": round(self.fingerprint_seconds * 1000, 2)
+        }
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    print("=" * 80)
+    print("TOOL CACHE BENCHMARK")
+    print("=" * 80)
+
+    results_path = Path(__file__).parent.parent / "data" / "out" / "docu_agent_test_results.json"
+    with open(results_path) as f:
+        all_results = json.load(f)
+    files = [file_result for case in all_results.values() for file_result in case['files_processed']]
+    case_data = {"case_name": "benchmark", "files_processed": files * 25}
+
+    def rescan(case_data: Dict[str, Any], search_term: str = "medical") -> int:
+        return sum(fr.get('text', '').lower().count(search_term) for fr in case_data['files_processed'])
+
+    cache = ToolCache()
+    cached_rescan = cache.memoize(rescan)
+
+    start = time.perf_counter()
+    cached_rescan(case_data)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(20):
+        cached_rescan(case_data)
+    repeat = (time.perf_counter() - start) / 20
+
+    # A copy of the same data (as when tool arguments are re-sent) is fingerprinted in full once
+    start = time.perf_counter()
+    cached_rescan(json.loads(json.dumps(case_data)))
+    copied = time.perf_counter() - start
+
+    case_data['files_processed'] = case_data['files_processed'][:-1]
+    cached_rescan(case_data)
+
+    print(f"\nFirst call: {first * 1000:.1f} ms")
+    print(f"Repeated call (same object): {repeat * 1000:.3f} ms")
+    print(f"Equal copy (full fingerprint, cache hit): {copied * 1000:.1f} ms")
+    print(f"Stats after an in-place edit: {cache.stats}")